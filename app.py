@@ -1,10 +1,19 @@
 import streamlit as st
 import json
 import logging
+import time
+from types import SimpleNamespace
 
-from openai import OpenAI
 from config.financial_analysis_config import *
-from utils.function_registry import FunctionsRegistry
+from utils.chat_history import HistoryManager
+from utils.function_registry import get_registry
+from utils.llm_client import get_client
+from utils.metrics import metrics, start_metrics_server
+from utils.model_router import ANSWER, ModelRoute, ModelRouter
+from utils.prefetch import prefetch_prices
+from utils.response_cache import get_response_cache
+from utils.tickers import extract_tickers
+from utils.tokens import estimate_tokens
 
 # Initialize session state
 if "messages" not in st.session_state:
@@ -14,99 +23,293 @@ if "messages" not in st.session_state:
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Keeps the history replayed to the model within HISTORY_TOKEN_BUDGET
+history = HistoryManager()
+# Answers to recent questions, shared by every session
+response_cache = get_response_cache()
+
 def process_user_input(client, user_input, tools):
     """Processes user input and generates AI response."""
     try:
         # Append user message
         st.session_state["messages"].append({"role": "user", "content": user_input})
+        st.session_state["messages"] = history.compact(st.session_state["messages"])
         st.session_state["display_messages"].append({"role": "user", "content": user_input})
 
         # Display user message in chat message container
         with st.chat_message("user"):
             st.markdown(user_input)
 
-        tools = FunctionsRegistry()
+        # Serve the answer to the same or a similar recent question while its data is fresh
+        model = st.session_state["llm_model"]
+        question = list(st.session_state["messages"])
+        turn_started = time.perf_counter()
+        if serve_cached_response(model, question):
+            return None
+
+        # Download the prices of the tickers mentioned while the model decides which tools to call
+        if PREFETCH_MAX_TICKERS:
+            prefetch_prices(extract_tickers(user_input, PREFETCH_MAX_TICKERS))
 
-        # Get response from OpenAI API
-        response = client.chat.completions.create(
-            model=st.session_state["llm_model"],
-            messages=st.session_state["messages"],
-            tools=tools.mapped_functions(),
-            tool_choice="auto",
-        )
+        # Offer only the tools relevant to the message, for this turn and its follow-ups
+        tool_names = tools.route(user_input)
+        schemas = tools.mapped_functions(tool_names)
+        log_tool_routing(tools, schemas)
 
-        response_message = response.choices[0].message
+        # Stream the response from OpenAI API; tool calls start running as soon as they are complete
+        tool_calls, dispatched = [], {}
+        route = ModelRouter(model).for_selection(user_input)
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_completion(client, tools, tool_names, tool_calls, dispatched, route))
+        content = response if isinstance(response, str) else ""
 
         # Check if a tool (function) is called
-        if hasattr(response_message, "tool_calls") and response_message.tool_calls:
-            return handle_tool_call(response_message, tools)
+        if tool_calls:
+            results = handle_tool_call(SimpleNamespace(content=content, tool_calls=tool_calls), tools, tool_names, dispatched)
         else:
-            return display_response(response_message.content)
+            results = []
+            display_response(content)
+        cache_response(tools, model, question, results, time.perf_counter() - turn_started)
 
     except Exception as e:
         logging.error(f"Error processing input: {e}")
         st.error("An error occurred while processing your request. Please try again.")
         return None
 
-def handle_tool_call(response_message, tools):
-    """Handles function calls from the AI response."""
+def serve_cached_response(model, messages):
+    """Displays the cached answer to the history's last question, if any; returns whether it did."""
+    started = time.perf_counter()
+    layer, entry = response_cache.get(model, messages)
+    if entry is None:
+        metrics.record_response_cache("miss")
+        return False
+
+    with st.chat_message("assistant"):
+        st.markdown(entry.answer)
+    display_response(entry.answer)
+    saved = max(0.0, entry.seconds - (time.perf_counter() - started))
+    metrics.record_response_cache(layer, saved)
+    logging.info(f"Answered from the {layer} response cache, saving ~{saved:.2f}s")
+    return True
+
+def cache_response(tools, model, messages, results, seconds):
+    """
+    Caches the answer just given to the history's last question. It stays valid for the shortest
+    cache TTL of the tools it was written from, capped at RESPONSE_CACHE_TTL_SECONDS; answers
+    relying on a failed call or on a tool without caching policy (e.g. a chart) are not cached.
+    """
+    answer = st.session_state["messages"][-1]
+    if answer["role"] != "assistant" or not answer["content"]:
+        return
+    ttls = [RESPONSE_CACHE_TTL_SECONDS]
+    for result in results:
+        policy = getattr(tools.import_function(result.name), "cache_policy", None) if result.ok else None
+        if policy is None:
+            return
+        ttls.append(policy.ttl)
+    response_cache.put(model, messages, answer["content"], min(ttls), seconds)
+
+def log_tool_routing(tools, schemas):
+    """Logs how many prompt tokens the routed tool subset saves over offering every tool."""
+    offered = estimate_tokens(json.dumps(schemas))
+    available = estimate_tokens(json.dumps(tools.mapped_functions()))
+    logging.info(f"Offering {len(schemas)} tools (~{offered} tokens, {available - offered} fewer than all tools)")
+
+def handle_tool_call(response_message, tools, tool_names=None, dispatched=None):
+    """
+    Handles function calls from the AI response.
+
+    All tool calls of a round run together and are answered by paired `tool` messages, then a
+    single follow-up completion sees every result. The follow-up may call tools again, up to
+    MAX_TOOL_ROUNDS rounds, after which it is sent without tools so the model has to answer.
+    Follow-ups are offered the `tool_names` routed for the user message (every tool by default).
+    Calls already started while their completion streamed are passed in `dispatched`, by id.
+    Each follow-up is routed to the small or the large model by the question and the results.
+
+    :return: The results of every tool call of the turn
+    """
+    dispatched = {} if dispatched is None else dispatched
+    router = ModelRouter(st.session_state["llm_model"])
+    question = next((message["content"] for message in reversed(st.session_state["messages"]) if message["role"] == "user"), "")
     tool_calls = response_message.tool_calls
-    function_map = tools.get_function_callable()
-
-    for tool_call in tool_calls:
-        function_name = tool_call.function.name
-        if function_name in function_map:
-            function_args = json.loads(tool_call.function.arguments)
-
-            logging.info(f"Calling function [{function_name}] with arguments as {function_args}")
-
-            try:
-                function_response = function_map[function_name](**function_args)
-
-                # Handle function-specific responses
-                if function_name == "plot_stock_price":
-                    st.image("assets/stock.png")
-                else:
-                    append_tool_response(tool_call.id, function_name, function_response)
-                    logging.info(f"Function response: {function_response}")
-                    
-                    # Display assistant response in chat message container
-                    with st.chat_message("assistant"):
-                        response = st.write_stream(generate_follow_up_response())
-                    
-                    st.session_state.messages.append({"role": "assistant", "content": response})
-                    st.session_state["display_messages"].append({"role": "assistant", "content": response})
-
-            except Exception as e:
-                logging.error(f"Error executing {function_name}: {e}")
+    content = response_message.content
+    pending_charts = []
+    results = []
+
+    for depth in range(1, MAX_TOOL_ROUNDS + 1):
+        st.session_state["messages"].append(tool_call_message(content, tool_calls))
+
+        # The calls of one turn are independent, so they run concurrently and come back in call order
+        batch = tools.execute_tool_calls(tool_calls, dispatched=dispatched)
+        results.extend(batch.results)
+        for result in batch.results:
+            function_name = result.name
+            logging.info(f"Called function [{function_name}] with arguments as {result.arguments} in {result.seconds:.2f}s")
+
+            if not result.ok:
                 st.error(f"Failed to execute {function_name}. Please try again.")
+                append_tool_response(result.tool_call_id, function_name, result.error)
+            elif function_name.endswith("plot_stock_price"):
+                # Charts render on the worker pool; show them once the answer is written
+                pending_charts.append((function_name, result.content))
+                append_tool_response(result.tool_call_id, function_name, "The chart is displayed to the user.")
+            else:
+                append_tool_response(result.tool_call_id, function_name, result.content)
+                logging.info(f"Function response: {result.content}")
+
+        # Display assistant response in chat message container
+        tool_calls = []
+        route = router.for_answer(question, [result.content if result.ok else result.error for result in results])
+        with st.chat_message("assistant"):
+            response = st.write_stream(generate_follow_up_response(tools if depth < MAX_TOOL_ROUNDS else None, tool_calls, tool_names, dispatched, route))
+        content = response if isinstance(response, str) else ""
+
+        if not tool_calls:
+            st.session_state.messages.append({"role": "assistant", "content": content})
+            st.session_state["display_messages"].append({"role": "assistant", "content": content})
+            break
+        logging.info(f"Follow-up requested {len(tool_calls)} more tool calls (round {depth + 1})")
+
+    for function_name, chart in pending_charts:
+        try:
+            with st.spinner("Rendering chart..."):
+                st.image(chart.result())
+        except Exception as e:
+            logging.error(f"Error rendering {function_name}: {e}")
+            st.error(f"Failed to execute {function_name}. Please try again.")
+    return results
+
+def tool_call_message(content, tool_calls):
+    """Returns the assistant message requesting the tool calls, which must precede their `tool` messages."""
+    return {
+        "role": "assistant",
+        "content": content or "",
+        "tool_calls": [
+            {
+                "id": tool_call.id,
+                "type": "function",
+                "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments},
+            }
+            for tool_call in tool_calls
+        ],
+    }
 
 def append_tool_response(tool_id, function_name, function_response):
     """Appends the tool response to the chat history."""
-    st.session_state["messages"].append({"role": "assistant", "content": "Here is the result:"})
     st.session_state["messages"].append({
         "tool_call_id": tool_id,
         "role": "tool",
         "name": function_name,
-        "content": function_response
+        "content": function_response if isinstance(function_response, str) else json.dumps(function_response, default=str)
     })
 
-def generate_follow_up_response():
-    """Generates a follow-up response after executing a function."""
-    follow_up_response = client.chat.completions.create(
-        model=st.session_state["llm_model"],
-        messages=st.session_state["messages"],
-        stream=True, # Streaming enabled
-    )
+def generate_follow_up_response(tools=None, tool_calls=None, tool_names=None, dispatched=None, route=None):
+    """Generates a follow-up response after executing the functions of a round."""
+    yield from stream_completion(client, tools, tool_names, tool_calls, dispatched, route)
+
+def stream_completion(client, tools=None, tool_names=None, tool_calls=None, dispatched=None, route=None):
+    """
+    Streams the text of a completion on the chat history.
+
+    The completion is served by the model of `route` (by default the model selected in the
+    sidebar), or by its fallback when the request to that model fails.
+
+    When `tools` are offered, the tool calls the model streams instead are assembled into
+    `tool_calls`. With `dispatched`, each call is also started on the tool pool as soon as its
+    arguments form a complete JSON object, so the tool runs while the model is still streaming
+    the rest of its output; its future is stored in `dispatched` under the call id. No valid
+    piece can follow the closing brace of an object, so the arguments of a dispatched call are
+    final. A turn with a single call only gains the end of the stream, after that brace.
+    """
+    options = {"tools": tools.mapped_functions(tool_names), "tool_choice": "auto"} if tools is not None else {}
+    route = route or ModelRoute(ANSWER, st.session_state["llm_model"], None, "selected model")
+    for model in route.models:
+        logging.info(f"Routing the {route.stage} completion to {model} ({route.reason})")
+        started = time.perf_counter()
+        first_token = None
+        try:
+            stream = client.chat.completions.create(
+                model=model,
+                messages=st.session_state["messages"],
+                stream=True, # Streaming enabled
+                **options,
+            )
+            break
+        except Exception as e:
+            metrics.record_llm_failure(model, route.stage)
+            if model == route.models[-1]:
+                raise
+            logging.warning(f"Completion with {model} failed, falling back to {route.fallback}: {e}")
+
+    partial_calls = {}
+
+    def dispatch(index):
+        partial = partial_calls[index]
+        if dispatched is None or partial["id"] is None or partial["id"] in dispatched or not partial["name"]:
+            return
+        try:
+            complete = isinstance(json.loads(partial["arguments"] or "null"), dict)
+        except ValueError:
+            complete = False
+        if complete:
+            dispatched[partial["id"]] = tools.dispatch_tool_call(as_tool_call(partial))
+            logging.info(f"Dispatched {partial['name']} after {(time.perf_counter() - started) * 1000:.0f} ms of streaming")
 
-    for chunk in follow_up_response:
-        if hasattr(chunk.choices[0].delta, "content"):
-            yield chunk.choices[0].delta.content
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if first_token is None and (getattr(delta, "content", None) or getattr(delta, "tool_calls", None)):
+            first_token = time.perf_counter() - started
+        for call in getattr(delta, "tool_calls", None) or []:
+            partial = partial_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
+            partial["id"] = call.id or partial["id"]
+            if call.function is not None:
+                more = call.function.arguments or ""
+                if more.strip() and dispatched is not None and partial["id"] in dispatched:
+                    # Pieces after a complete object, from a malformed stream: run the final version instead
+                    if not dispatched.pop(partial["id"]).cancel():
+                        logging.warning(f"{partial['name']} kept streaming arguments after it started, its first run is wasted")
+                partial["name"] += call.function.name or ""
+                partial["arguments"] += more
+            if tools is not None:
+                dispatch(call.index)
+        if getattr(delta, "content", None):
+            yield delta.content
+
+    if tools is not None:
+        for index in partial_calls:
+            dispatch(index)
+    total = time.perf_counter() - started
+    metrics.record_llm(model, route.stage, total if first_token is None else first_token, total)
+
+    if tool_calls is not None:
+        tool_calls.extend(as_tool_call(partial) for _, partial in sorted(partial_calls.items()))
+
+def as_tool_call(partial):
+    """Returns a streamed tool call in the shape of the `tool_calls` of a non-streamed message."""
+    return SimpleNamespace(id=partial["id"], function=SimpleNamespace(name=partial["name"], arguments=partial["arguments"]))
+
+def show_metrics():
+    """Shows the latency and payload of each tool and LLM stage in the sidebar."""
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("Performance"):
+        if not snapshot["tools"] and not snapshot["llm"]:
+            st.caption("No calls yet.")
+        if snapshot["llm"]:
+            st.caption("LLM completions (ms)")
+            st.dataframe(snapshot["llm"], hide_index=True)
+        if snapshot["tools"]:
+            st.caption("Tool calls (ms, average result size)")
+            st.dataframe(snapshot["tools"], hide_index=True)
+        if snapshot["response_cache"]:
+            st.caption("Response cache (lookups, hit rate, seconds saved)")
+            st.dataframe(snapshot["response_cache"], hide_index=True)
 
 def display_response(response_content):
-    """Displays AI response and updates the chat history."""
-    st.text(response_content)
+    """Updates the chat history with the AI response, which was displayed as it streamed."""
     st.session_state["messages"].append({"role": "assistant", "content": response_content})
+    st.session_state["display_messages"].append({"role": "assistant", "content": response_content})
 
 if __name__ == '__main__':
     # --- Streamlit UI ---
@@ -121,14 +324,19 @@ if __name__ == '__main__':
     models = ["qwen2.5:14b", "mistral:7b"]
 
     # Create a select box for the models
+    # With MODEL_ROUTING, this model writes the answers that need it and ROUTING_SMALL_MODEL the rest
     st.session_state["llm_model"] = st.sidebar.selectbox("Select OpenAI model", models, index=0)
 
-    client = OpenAI(
-        base_url=base_url,
-        api_key=api_key
-    )
+    # Shared by every session and rerun, so connections to the inference server stay open between turns
+    client = get_client()
+
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
 
-    tools = FunctionsRegistry()
+    # Built once per process and shared by all sessions, only changed service modules are re-executed
+    started = time.perf_counter()
+    tools = get_registry()
+    logging.info(f"Tool registry ready in {(time.perf_counter() - started) * 1000:.1f} ms")
 
     # Display chat messages from history on app rerun
     for message in st.session_state["display_messages"]:
@@ -138,4 +346,10 @@ if __name__ == '__main__':
     # User input field
     user_input = st.chat_input("Your input:")
     if user_input:
-        process_user_input(client, user_input, tools)
\ No newline at end of file
+        process_user_input(client, user_input, tools)
+        try:
+            metrics.write_prometheus(METRICS_PROMETHEUS_PATH)
+        except OSError as e:
+            logging.error(f"Error writing metrics to {METRICS_PROMETHEUS_PATH}: {e}")
+
+    show_metrics()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -7,6 +8,78 @@ base_url = os.getenv("BASE_URL")
 ollama_base_url = os.getenv("OLLAMA_BASE_URL")
 api_key = os.getenv("API_KEY")
 
+# Connection pool shared by every client of the inference server: connections kept open between
+# turns, and HTTP/2 when the h2 package is installed (pip install "httpx[http2]")
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 16))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", 300))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+# Seconds to connect, to wait for a free connection, to send a request, and between two chunks
+# of a response (a local model may take long to start on a long prompt)
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 5))
+LLM_POOL_TIMEOUT_SECONDS = float(os.getenv("LLM_POOL_TIMEOUT_SECONDS", 10))
+LLM_WRITE_TIMEOUT_SECONDS = float(os.getenv("LLM_WRITE_TIMEOUT_SECONDS", 30))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", 120))
+
+# Serve tool schemas from src/services/function_schemas.json and import service modules on first use
+TOOL_MANIFEST = os.getenv("TOOL_MANIFEST", "true").lower() in ("1", "true", "yes")
+
+# Tool calls of one assistant turn run concurrently on a bounded pool
+TOOL_CALL_WORKERS = int(os.getenv("TOOL_CALL_WORKERS", 8))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", 60))
+# Follow-up completions that may request more tools before the model has to answer
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", 3))
+# Only offer the model the tools most relevant to the user message (0 offers every tool)
+TOOL_ROUTING_TOP_K = int(os.getenv("TOOL_ROUTING_TOP_K", 4))
+
+# Two-tier model routing: the small model selects tools and answers simply, the model picked in
+# the sidebar writes answers that need analysis or digest large tool results
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+ROUTING_SMALL_MODEL = os.getenv("ROUTING_SMALL_MODEL", "mistral:7b")
+ROUTING_ANALYSIS_KEYWORDS = [keyword.strip() for keyword in os.getenv(
+    "ROUTING_ANALYSIS_KEYWORDS",
+    "analy,compar,explain,why,summar,outlook,recommend,should,forecast,predict,risk,thesis,valuation,report,pros,cons",
+).split(",") if keyword.strip()]
+ROUTING_LARGE_RESULT_TOKENS = int(os.getenv("ROUTING_LARGE_RESULT_TOKENS", 1500))
+
+# Chat history sent to the model: estimated token budget, turns kept verbatim, and the size
+# of the digests of older tool results and of the summary of evicted turns
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 6000))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", 3))
+HISTORY_DIGEST_TOKENS = int(os.getenv("HISTORY_DIGEST_TOKENS", 150))
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", 600))
+
+# Final answers reused for the same or a similar question: entries, the cosine similarity a
+# similar question needs, and the lifetime of answers that used no tool (answers built on tool
+# results live as long as the shortest cache TTL of those tools)
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 512))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.8))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600))
+
+# Tool and LLM latency metrics, written in the Prometheus text format after every turn
+METRICS_PROMETHEUS_PATH = os.getenv("METRICS_PROMETHEUS_PATH", str(Path(__file__).resolve().parent.parent / "data" / "metrics.prom"))
+# Also serve them at http://<host>:<port>/metrics when set
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# Price history cache
+PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", 300))
+PRICE_CACHE_MAX_BYTES = int(os.getenv("PRICE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Histories of the tickers a message mentions are downloaded while the model decides on tools
+PREFETCH_MAX_TICKERS = int(os.getenv("PREFETCH_MAX_TICKERS", 5))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", 4))
+# Incremental EMA, RSI and MACD states, one per (ticker, indicator, parameters)
+INDICATOR_STATE_MAX_ENTRIES = int(os.getenv("INDICATOR_STATE_MAX_ENTRIES", 4096))
+
+# Local DuckDB price warehouse
+PRICE_DB_PATH = os.getenv("PRICE_DB_PATH", str(Path(__file__).resolve().parent.parent / "data" / "prices.duckdb"))
+PRICE_STORE_REFRESH_SECONDS = float(os.getenv("PRICE_STORE_REFRESH_SECONDS", 900))
+
+# Rendered charts ("png" or "webp")
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png")
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CHART_WIDTH_PX = int(os.getenv("CHART_WIDTH_PX", 1000))
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", 2))
+
 FUNDAMENTAL_ANALYST_PROMPT = """
 You are a fundamental analyst specializing in evaluating company performance based on stock prices, technical indicators, and financial metrics. Your task is to provide a comprehensive summary for {company}.
 
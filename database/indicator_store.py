@@ -0,0 +1,255 @@
+import logging
+import math
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from database.price_store import ADJUSTMENT_TOLERANCE, PriceStore, get_price_store
+
+logger = logging.getLogger(__name__)
+
+SMA_WINDOWS = (20, 50, 200)
+EMA_SPANS = (20, 50)
+RSI_WINDOW = 14
+VOLATILITY_WINDOW = 20
+TRADING_DAYS = 252
+
+# Exponential averages are truncated once the dropped weights fall below this share
+EMA_TOLERANCE = 1e-3
+
+INDICATORS: Dict[str, str] = {
+    **{f"sma_{window}": f"{window}-day simple moving average" for window in SMA_WINDOWS},
+    **{f"ema_{span}": f"{span}-day exponential moving average" for span in EMA_SPANS},
+    f"rsi_{RSI_WINDOW}": f"{RSI_WINDOW}-day relative strength index (Wilder smoothing)",
+    f"volatility_{VOLATILITY_WINDOW}": f"{VOLATILITY_WINDOW}-day annualized volatility of daily log returns",
+    "drawdown": "Decline from the highest stored close, as a fraction (-0.25 is 25% below the peak)",
+}
+
+OPERATORS = ("<", "<=", ">", ">=", "=")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS stock_indicators (
+    symbol VARCHAR NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    close DOUBLE,
+    {", ".join(f"{name} DOUBLE" for name in INDICATORS)},
+    peak DOUBLE,
+    PRIMARY KEY (symbol, timestamp)
+);
+"""
+
+# Exponential weights are rebased every CHUNK_ROWS bars so that they stay within float range
+CHUNK_ROWS = 512
+
+def _decay_rows(decay: float) -> int:
+    """Returns how many bars an exponential average needs before older weights drop below the tolerance."""
+    return math.ceil(math.log(EMA_TOLERANCE) / math.log(decay))
+
+EMA_DECAYS = {span: 1 - 2 / (span + 1) for span in EMA_SPANS}
+RSI_DECAY = 1 - 1 / RSI_WINDOW
+# Stored bars before the last materialized one that the windows of the new bars read, counted in
+# bars rather than calendar days so that holidays, halts and short listings cannot thin them out
+LOOKBACK_ROWS = max(*SMA_WINDOWS, *(_decay_rows(decay) for decay in EMA_DECAYS.values()), _decay_rows(RSI_DECAY))
+
+def _frame(rows: int, partition: str = "symbol") -> str:
+    return f"(PARTITION BY {partition} ORDER BY timestamp ROWS BETWEEN {rows - 1} PRECEDING AND CURRENT ROW)"
+
+def _exponential_average(name: str, value: str, decay: float):
+    """
+    Builds the SQL of an exponentially weighted mean over the last `_decay_rows` bars.
+
+    DuckDB window functions cannot recurse, so the recursive average is replaced by its closed
+    form sum(x_j * decay^(t - j)), normalized by the geometric weight sum. The weights are split
+    as decay^(t - a) * decay^(a - j) around the start `a` of the bar's chunk, which turns the sum
+    into plain windowed SUMs: one over the bars of the same chunk and one over the whole frame,
+    whose remainder holds the bars of the previous chunk.
+
+    :return: The per-bar, window and value expressions, to be evaluated in that order
+    """
+    rows = _decay_rows(decay)
+    scaled = f"scaled_{name}"
+    per_bar = f"({value}) * pow({decay}, -bar_offset) AS {scaled}"
+    windows = (
+        f"sum({scaled}) OVER {_frame(rows)} AS total_{name},"
+        f" sum({scaled}) OVER {_frame(rows, 'symbol, bar_chunk')} AS chunk_{name}"
+    )
+    mean = (
+        f"pow({decay}, bar_offset) * (chunk_{name} + pow({decay}, {CHUNK_ROWS}) * (total_{name} - chunk_{name}))"
+        f" * {1 - decay} / (1 - pow({decay}, least(bar, {rows})))"
+    )
+    return per_bar, windows, mean
+
+def _refresh_query(symbol_filter: str) -> str:
+    per_bar = []
+    windows = ["max(close) OVER (PARTITION BY symbol ORDER BY timestamp ROWS UNBOUNDED PRECEDING) AS running_peak"]
+    averages = []
+    values = []
+    for window in SMA_WINDOWS:
+        windows.append(f"avg(close) OVER {_frame(window)} AS avg_{window}")
+        values.append(f"CASE WHEN bar >= {window} THEN avg_{window} END AS sma_{window}")
+    for span, decay in EMA_DECAYS.items():
+        scaled, window, mean = _exponential_average(f"ema_{span}", "close", decay)
+        per_bar.append(scaled)
+        windows.append(window)
+        averages.append(f"CASE WHEN bar >= {span} THEN {mean} END AS ema_{span}")
+        values.append(f"ema_{span}")
+
+    for name, value in [("gain", "greatest(coalesce(change, 0), 0)"), ("loss", "greatest(-coalesce(change, 0), 0)")]:
+        scaled, window, mean = _exponential_average(name, value, RSI_DECAY)
+        per_bar.append(scaled)
+        windows.append(window)
+        averages.append(f"CASE WHEN bar > {RSI_WINDOW} THEN {mean} END AS avg_{name}")
+    values.append(f"CASE WHEN avg_gain + avg_loss > 0 THEN 100 * avg_gain / (avg_gain + avg_loss) ELSE 50 END AS rsi_{RSI_WINDOW}")
+
+    windows.append(f"stddev_samp(log_return) OVER {_frame(VOLATILITY_WINDOW)} AS sd_vol")
+    values.append(
+        f"CASE WHEN bar > {VOLATILITY_WINDOW} THEN sd_vol * sqrt({TRADING_DAYS}) END AS volatility_{VOLATILITY_WINDOW}"
+    )
+    values.append("close / greatest(running_peak, coalesce(prior_peak, running_peak)) - 1 AS drawdown")
+    values.append("greatest(running_peak, coalesce(prior_peak, running_peak)) AS peak")
+
+    return f"""
+        INSERT OR REPLACE INTO stock_indicators (symbol, timestamp, close, {", ".join(INDICATORS)}, peak)
+        WITH last AS (
+            SELECT symbol, max(timestamp) AS done_at FROM stock_indicators GROUP BY symbol
+        ),
+        state AS (
+            -- The last materialized bar is recomputed: it may have been captured while still forming
+            SELECT symbol, done_at, max(peak) FILTER (WHERE timestamp < done_at) AS prior_peak
+            FROM last JOIN stock_indicators USING (symbol)
+            GROUP BY symbol, done_at
+        ),
+        lookback AS (
+            -- The timestamp of the LOOKBACK_ROWS-th stored bar before the last materialized one
+            SELECT symbol, min(timestamp) AS since FROM (
+                SELECT p.symbol, p.timestamp
+                FROM stock_prices p JOIN state s USING (symbol)
+                WHERE p.timestamp < s.done_at AND p.close IS NOT NULL {symbol_filter}
+                QUALIFY row_number() OVER (PARTITION BY p.symbol ORDER BY p.timestamp DESC) <= {LOOKBACK_ROWS}
+            )
+            GROUP BY symbol
+        ),
+        bars AS (
+            SELECT p.symbol, p.timestamp, p.close, s.done_at, s.prior_peak,
+                   p.close - lag(p.close) OVER by_symbol AS change,
+                   ln(p.close / lag(p.close) OVER by_symbol) AS log_return,
+                   row_number() OVER by_symbol AS bar
+            FROM stock_prices p LEFT JOIN state s USING (symbol) LEFT JOIN lookback l USING (symbol)
+            WHERE (s.done_at IS NULL OR p.timestamp >= coalesce(l.since, s.done_at))
+              AND p.close IS NOT NULL {symbol_filter}
+            WINDOW by_symbol AS (PARTITION BY p.symbol ORDER BY p.timestamp)
+        ),
+        chunked AS (
+            SELECT *, bar // {CHUNK_ROWS} AS bar_chunk, bar % {CHUNK_ROWS} AS bar_offset
+            FROM bars
+        ),
+        scaled AS (
+            SELECT *, {", ".join(per_bar)}
+            FROM chunked
+        ),
+        windows AS (
+            -- Every new row has LOOKBACK_ROWS bars or more before it unless the history is shorter,
+            -- in which case `bar` counts from its first bar: `bar` alone tells whether a window is full
+            SELECT symbol, timestamp, close, done_at, prior_peak, bar, bar_offset, {", ".join(windows)}
+            FROM scaled
+        ),
+        fresh AS (
+            -- The lookback bars only feed the windows, they are already materialized
+            SELECT *, {", ".join(averages)}
+            FROM windows
+            WHERE done_at IS NULL OR timestamp >= done_at
+        )
+        SELECT symbol, timestamp, close, {", ".join(values)}
+        FROM fresh
+    """
+
+class IndicatorStore:
+    """
+    Indicator table materialized inside the price store with DuckDB window functions.
+
+    `refresh` computes SMA, EMA, RSI, rolling volatility and drawdown for every stored symbol in
+    one query and only writes the dates after each symbol's last materialized bar, reading the
+    `LOOKBACK_ROWS` stored bars before it to fill the windows. Screening a whole universe ("RSI below 30") is then
+    a single lookup of each symbol's latest row instead of one pandas computation per ticker.
+
+    The EMA and RSI averages are truncated to the bars carrying all but `EMA_TOLERANCE` of their
+    weight, and the drawdown peak is the highest close the store holds for the symbol.
+    """
+
+    def __init__(self, store: Optional[PriceStore] = None) -> None:
+        self.store = store or get_price_store()
+        with self.store.connection() as conn:
+            conn.execute(SCHEMA)
+
+    @staticmethod
+    def _filter(column: str, symbols: Optional[List[str]]):
+        """Returns an `AND column IN (...)` clause and its parameters, empty when no symbols are given."""
+        if not symbols:
+            return "", []
+        return f"AND {column} IN (SELECT unnest(?::VARCHAR[]))", [sorted({symbol.strip().upper() for symbol in symbols})]
+
+    def refresh(self, symbols: Optional[List[str]] = None) -> int:
+        """Materializes the indicators of the bars stored since the last refresh and returns how many rows were written."""
+        with self.store.connection() as conn:
+            # A backfill moves the start of a symbol's history, which changes its EMAs and peak, and a
+            # re-adjusted history (see PriceStore) changes the close of every bar: rebuild the symbol
+            stale_filter, params = self._filter("i.symbol", symbols)
+            conn.execute(f"""
+                DELETE FROM stock_indicators WHERE symbol IN (
+                    SELECT i.symbol FROM (SELECT symbol, min(timestamp) AS first_at FROM stock_indicators GROUP BY symbol) i
+                    JOIN (SELECT symbol, min(timestamp) AS first_at FROM stock_prices GROUP BY symbol) p USING (symbol)
+                    WHERE p.first_at < i.first_at {stale_filter}
+                    UNION
+                    SELECT i.symbol FROM stock_indicators i
+                    JOIN (SELECT symbol, min(timestamp) AS timestamp FROM stock_indicators GROUP BY symbol) USING (symbol, timestamp)
+                    JOIN stock_prices p USING (symbol, timestamp)
+                    WHERE abs(p.close - i.close) > ? * abs(i.close) {stale_filter}
+                )
+            """, params + [ADJUSTMENT_TOLERANCE] + params)
+            symbol_filter, params = self._filter("p.symbol", symbols)
+            written = conn.execute(_refresh_query(symbol_filter), params + params).fetchone()[0]
+        if written:
+            logger.info(f"Materialized {written} indicator rows")
+        return written
+
+    def screen(self, indicator: Optional[str] = None, operator: str = "<", threshold: float = 0.0,
+               symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the latest indicator row of each symbol, indexed by symbol.
+
+        With an `indicator`, only the symbols whose latest value satisfies `operator threshold` are
+        kept, most extreme first. The filter runs inside DuckDB over the materialized table.
+
+        :raises ValueError: If the indicator or operator is not supported
+        """
+        symbol_filter, params = self._filter("symbol", symbols)
+        condition, order = "", "symbol"
+        if indicator is not None:
+            if indicator not in INDICATORS:
+                raise ValueError(f"Unknown indicator {indicator}, expected one of {', '.join(INDICATORS)}")
+            if operator not in OPERATORS:
+                raise ValueError(f"Unknown operator {operator}, expected one of {', '.join(OPERATORS)}")
+            condition = f"WHERE {indicator} {operator} ?"
+            order = f"{indicator} {'ASC' if operator.startswith('<') else 'DESC'}, symbol"
+            params.append(float(threshold))
+        query = f"""
+            SELECT * EXCLUDE (peak) FROM stock_indicators
+            JOIN (SELECT symbol, max(timestamp) AS timestamp FROM stock_indicators WHERE true {symbol_filter} GROUP BY symbol)
+            USING (symbol, timestamp)
+            {condition}
+            ORDER BY {order}
+        """
+        with self.store.connection() as conn:
+            return conn.execute(query, params).df().set_index("symbol")
+
+_indicator_store: Optional[IndicatorStore] = None
+_indicator_store_lock = threading.Lock()
+
+def get_indicator_store() -> IndicatorStore:
+    """Returns the indicator table of the process-wide price store."""
+    global _indicator_store
+    with _indicator_store_lock:
+        if _indicator_store is None:
+            _indicator_store = IndicatorStore()
+        return _indicator_store
@@ -0,0 +1,276 @@
+import datetime as dt
+import logging
+import math
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import yfinance as yf
+
+from config.financial_analysis_config import PRICE_DB_PATH, PRICE_STORE_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_prices (
+    symbol VARCHAR NOT NULL,
+    timestamp TIMESTAMP NOT NULL,
+    open DOUBLE,
+    high DOUBLE,
+    low DOUBLE,
+    close DOUBLE,
+    volume BIGINT,
+    value DOUBLE,
+    trades INTEGER,
+    source VARCHAR,
+    PRIMARY KEY (symbol, timestamp)
+);
+
+-- Which part of a symbol's history has been requested from the source, and when it was last topped up
+CREATE TABLE IF NOT EXISTS stock_price_coverage (
+    symbol VARCHAR PRIMARY KEY,
+    covered_from TIMESTAMP NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL
+);
+"""
+
+PERIOD_DAYS = {"5d": 5, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366, "2y": 731, "5y": 1827, "10y": 3653}
+
+OHLCV_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+# Relative difference between a stored close and its re-download that means the history was re-adjusted
+ADJUSTMENT_TOLERANCE = 1e-6
+
+Downloader = Callable[[str, dt.datetime, Optional[dt.datetime]], pd.DataFrame]
+
+def _download_daily_bars(symbol: str, start: dt.datetime, end: Optional[dt.datetime]) -> pd.DataFrame:
+    """Downloads daily OHLCV bars in [start, end) from Yahoo Finance."""
+    return yf.Ticker(symbol).history(start=start, end=end, interval="1d")
+
+def period_start(period: str, now: Optional[dt.datetime] = None) -> Optional[dt.datetime]:
+    """Translates a yfinance period ('1y', '6mo', 'ytd', ...) to a start date, None when unsupported."""
+    now = now or dt.datetime.now()
+    today = dt.datetime(now.year, now.month, now.day)
+    if period == "ytd":
+        return dt.datetime(now.year, 1, 1)
+    days = PERIOD_DAYS.get(period)
+    return today - dt.timedelta(days=days) if days else None
+
+def covers_range(bars: pd.DataFrame, start: dt.datetime, end: dt.datetime, max_gap_days: int = 4) -> bool:
+    """
+    Whether stored daily bars cover [start, end] without holes: the first and last bars lie within
+    `max_gap_days` of the ends of the range, and so does every bar of the one before it. The
+    tolerance allows for weekends and holidays, e.g. a Friday before a Monday holiday.
+    """
+    if bars is None or bars.empty:
+        return False
+    index = pd.DatetimeIndex(bars.index).sort_values()
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    tolerance = pd.Timedelta(days=max_gap_days)
+    if index[0] - pd.Timestamp(start) > tolerance or pd.Timestamp(end) - index[-1] > tolerance:
+        return False
+    return len(index) < 2 or index.to_series().diff().max() <= tolerance
+
+class PriceStore:
+    """
+    Persistent DuckDB store of daily OHLCV bars using the `stock_prices` schema.
+
+    Reads go through `history`, which first tops the symbol up with the bars missing since the
+    last stored timestamp (and backfills if an earlier start is requested), then serves the
+    range from the database. Top-ups are throttled to one per `refresh_seconds` per symbol,
+    so repeat questions about a ticker never download history the store already holds.
+
+    Bars are auto-adjusted as of the day they are downloaded, so a split or a dividend rescales
+    the whole history at the source. Each top-up re-downloads the last complete stored bar and
+    compares its close; when it differs, the symbol's stored history is downloaded again.
+    """
+
+    def __init__(
+        self,
+        path: str = PRICE_DB_PATH,
+        refresh_seconds: float = PRICE_STORE_REFRESH_SECONDS,
+        downloader: Downloader = _download_daily_bars,
+        source: str = "yfinance",
+    ) -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.refresh_seconds = refresh_seconds
+        self.downloader = downloader
+        self.source = source
+        self._conn = duckdb.connect(path)
+        self._conn.execute(SCHEMA)
+        self._lock = threading.Lock()
+        self._drop_foreign_bars()
+
+    def _drop_foreign_bars(self) -> None:
+        """
+        Forgets the symbols holding bars of another source, which earlier versions wrote: they are
+        adjusted differently, so they would pass for a re-adjustment. They are downloaded again on use.
+        """
+        foreign = [row[0] for row in self._conn.execute(
+            "SELECT DISTINCT symbol FROM stock_prices WHERE source IS DISTINCT FROM ?", [self.source]
+        ).fetchall()]
+        for symbol in foreign:
+            self._conn.execute("DELETE FROM stock_prices WHERE symbol = ?", [symbol])
+            self._conn.execute("DELETE FROM stock_price_coverage WHERE symbol = ?", [symbol])
+        if foreign:
+            logger.info(f"Dropped the stored prices of {len(foreign)} symbols that held bars of another source")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Yields the DuckDB connection while holding the store lock, for queries over the stored bars."""
+        with self._lock:
+            yield self._conn
+
+    def coverage(self, symbol: str) -> Tuple[Optional[dt.datetime], Optional[dt.datetime], Optional[dt.datetime]]:
+        """Returns (covered_from, last stored bar, refreshed_at) for a symbol."""
+        with self._lock:
+            covered = self._conn.execute(
+                "SELECT covered_from, refreshed_at FROM stock_price_coverage WHERE symbol = ?", [symbol]
+            ).fetchone()
+            last = self._conn.execute("SELECT max(timestamp) FROM stock_prices WHERE symbol = ?", [symbol]).fetchone()[0]
+        if covered is None:
+            return None, last, None
+        return covered[0], last, covered[1]
+
+    def write(self, symbol: str, bars: pd.DataFrame) -> int:
+        """
+        Upserts OHLCV bars (indexed by timestamp) of the store's source in one bulk insert through
+        Arrow. Only bars of that source belong here: the adjustment check compares against them.
+        """
+        if bars is None or bars.empty:
+            return 0
+        symbol = symbol.strip().upper()
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is not None:
+            # Daily bars are stored on their exchange-local date
+            index = index.tz_localize(None)
+        table = pa.table({
+            "symbol": pa.array([symbol] * len(bars), pa.string()),
+            "timestamp": pa.array(index.to_numpy(dtype="datetime64[us]")),
+            "open": pa.array(bars["Open"].to_numpy(dtype="float64")),
+            "high": pa.array(bars["High"].to_numpy(dtype="float64")),
+            "low": pa.array(bars["Low"].to_numpy(dtype="float64")),
+            "close": pa.array(bars["Close"].to_numpy(dtype="float64")),
+            "volume": pa.array(bars["Volume"].fillna(0).to_numpy(dtype="int64")),
+            "source": pa.array([self.source] * len(bars), pa.string()),
+        })
+        with self._lock:
+            self._conn.register("incoming_bars", table)
+            try:
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO stock_prices (symbol, timestamp, open, high, low, close, volume, source)
+                    SELECT symbol, timestamp, open, high, low, close, volume, source FROM incoming_bars
+                """)
+            finally:
+                self._conn.unregister("incoming_bars")
+        return len(bars)
+
+    def _mark(self, symbol: str, covered_from: dt.datetime, refreshed_at: dt.datetime) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stock_price_coverage VALUES (?, ?, ?)", [symbol, covered_from, refreshed_at]
+            )
+
+    def _anchor(self, symbol: str, last: dt.datetime) -> Tuple[dt.datetime, Optional[float]]:
+        """The stored bar before the last one, complete when it was stored, and its close."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp, close FROM stock_prices WHERE symbol = ? AND timestamp < ? ORDER BY timestamp DESC LIMIT 1",
+                [symbol, last],
+            ).fetchone()
+        return (row[0], row[1]) if row else (last, None)
+
+    def _readjusted(self, bars: pd.DataFrame, anchor: dt.datetime, stored_close: Optional[float]) -> bool:
+        if stored_close is None or bars is None or bars.empty:
+            return False
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        matches = bars["Close"].to_numpy()[index == pd.Timestamp(anchor)]
+        return len(matches) > 0 and not math.isclose(float(matches[0]), stored_close, rel_tol=ADJUSTMENT_TOLERANCE)
+
+    def rebuild(self, symbol: str, start: dt.datetime) -> int:
+        """Replaces every stored bar of the symbol with a fresh download from `start`."""
+        symbol = symbol.strip().upper()
+        bars = self.downloader(symbol, start, None)
+        with self._lock:
+            self._conn.execute("DELETE FROM stock_prices WHERE symbol = ?", [symbol])
+        written = self.write(symbol, bars)
+        self._mark(symbol, start, dt.datetime.now())
+        return written
+
+    def top_up(self, symbol: str, start: dt.datetime) -> int:
+        """Downloads only the bars the store is missing for [start, now] and returns how many were written."""
+        symbol = symbol.strip().upper()
+        now = dt.datetime.now()
+        covered_from, last, refreshed_at = self.coverage(symbol)
+        written = 0
+
+        if covered_from is None or last is None:
+            written += self.write(symbol, self.downloader(symbol, start, None))
+            self._mark(symbol, start, now)
+            return written
+
+        if start < covered_from:
+            written += self.write(symbol, self.downloader(symbol, start, covered_from))
+            covered_from = start
+
+        if (now - refreshed_at).total_seconds() >= self.refresh_seconds:
+            # Re-download the last stored bar too, as it may have been captured while still forming, and
+            # the complete one before it, to tell whether the source re-adjusted the history since
+            anchor, stored_close = self._anchor(symbol, last)
+            bars = self.downloader(symbol, anchor, None)
+            if self._readjusted(bars, anchor, stored_close):
+                logger.info(f"The history of {symbol} was re-adjusted at the source, downloading it again")
+                return self.rebuild(symbol, covered_from)
+            written += self.write(symbol, bars)
+            refreshed_at = now
+
+        self._mark(symbol, covered_from, refreshed_at)
+        if written:
+            logger.info(f"Stored {written} new bars for {symbol}")
+        return written
+
+    def read(self, symbol: str, start: Optional[dt.datetime] = None, end: Optional[dt.datetime] = None) -> pd.DataFrame:
+        """Reads stored bars in [start, end) as an OHLCV frame indexed by Date, without any download."""
+        query = "SELECT timestamp AS Date, open, high, low, close, volume FROM stock_prices WHERE symbol = ?"
+        params = [symbol.strip().upper()]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(end)
+        with self._lock:
+            frame = self._conn.execute(query + " ORDER BY timestamp", params).df()
+        return frame.set_index("Date").rename(columns=OHLCV_COLUMNS)
+
+    def history(self, symbol: str, start: dt.datetime, end: Optional[dt.datetime] = None) -> pd.DataFrame:
+        """Tops the symbol up, then returns its stored bars in [start, end)."""
+        try:
+            self.top_up(symbol, start)
+        except Exception as e:
+            # Serve whatever we already hold when the source is unreachable
+            logger.error(f"Error topping up prices for {symbol}: {e}")
+        return self.read(symbol, start, end)
+
+_store: Optional[PriceStore] = None
+_store_lock = threading.Lock()
+
+def get_price_store() -> PriceStore:
+    """Returns the process-wide price store, opening the database on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+        return _store
@@ -1,41 +1,35 @@
 import yfinance as yf
 import matplotlib.pyplot as plt
 import streamlit as st
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
+import sys
 import json
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils import indicators
+from utils.llm_client import get_client
 
 def get_stock_price(ticker: str):
     return str(yf.Ticker(ticker).history(period='1y').iloc[-1].Close)
 
 def calculate_SMA(ticker, window):
     data = yf.Ticker(ticker).history(period='1y').Close
-    return str(data.rolling(window=window).mean().iloc[-1])
+    return str(indicators.sma(data, window)[-1])
 
 def calculate_EMA(ticker, window):
     data = yf.Ticker(ticker).history(period='1y').Close
-    return str(data.ewm(span=window, adjust=False).mean().iloc[-1])
+    return str(indicators.ema(data, window)[-1])
 
 def calculate_RSI(ticker):
     data = yf.Ticker(ticker).history(period='1y').Close
-    delta = data.diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ema_up = up.ewm(com=14-1, adjust=False).mean()
-    ema_down = down.ewm(com=14-1, adjust=False).mean()
-    rs = ema_up / ema_down
-    return str(100 - (100 / (1 + rs)).iloc[-1])
+    return str(indicators.rsi(data, 14)[-1])
 
 def calculate_MACD(ticker):
     data = yf.Ticker(ticker).history(period='1y').Close
-    short_EMA = data.ewm(span=12, adjust=False).mean()
-    long_EMA = data.ewm(span=26, adjust=False).mean()
-
-    MACD = short_EMA - long_EMA
-    signal = MACD.ewm(span=9, adjust=False)
-
-    MACD_histogram = MACD - signal
+    MACD, signal, MACD_histogram = indicators.macd(data, 12, 26, 9)
 
     return f'{MACD[-1]}, {signal[-1]}, {MACD_histogram[-1]}'
 
@@ -174,10 +168,7 @@ available_functions = {
 
 load_dotenv()
 
-client = OpenAI(
-    base_url=os.getenv("BASE_URL"),
-    api_key=os.getenv("API_KEY")
-)
+client = get_client(os.getenv("BASE_URL"), os.getenv("API_KEY"))
 
 if 'messages' not in st.session_state:
     st.session_state['messages'] = []
@@ -0,0 +1,73 @@
+"""
+Benchmarks the batch indicator engine against a per-ticker loop.
+
+The per-ticker path pays one history request and one pandas pass per symbol,
+the batch path one panel request and one column-wise pass. Network time is
+simulated with --latency so the benchmark runs offline; pass --live to
+download real data from Yahoo Finance instead.
+
+Usage: python scripts/bench_batch_indicators.py [--sizes 10 100 500] [--latency 0.15] [--live]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.services.batch_analysis import BatchStockAnalyzer
+
+def synthetic_panel(n_tickers: int, n_bars: int = 252, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n_bars, freq="B")
+    returns = rng.normal(0.0005, 0.02, size=(n_bars, n_tickers))
+    prices = 100 * np.exp(np.cumsum(returns, axis=0))
+    return pd.DataFrame(prices, index=index, columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+def simulated_fetch(panel: pd.DataFrame, latency: float):
+    def fetch(tickers):
+        time.sleep(latency)
+        return panel[list(tickers)]
+    return fetch
+
+def per_ticker_loop(tickers, fetch) -> pd.DataFrame:
+    return pd.concat([BatchStockAnalyzer.compute_indicators(fetch([ticker])) for ticker in tickers])
+
+def batch(tickers, fetch) -> pd.DataFrame:
+    return BatchStockAnalyzer.compute_indicators(fetch(tickers))
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated seconds per history request")
+    parser.add_argument("--live", action="store_true", help="Download real tickers instead of a synthetic panel")
+    parser.add_argument("--tickers", nargs="*", default=[], help="Universe used with --live")
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'loop (s)':>10} {'batch (s)':>10} {'speedup':>8}")
+    for size in args.sizes:
+        if args.live:
+            tickers = sorted({ticker.upper() for ticker in args.tickers[:size]})
+            fetch = BatchStockAnalyzer.download_panel
+        else:
+            panel = synthetic_panel(size)
+            tickers = list(panel.columns)
+            fetch = simulated_fetch(panel, args.latency)
+
+        loop_time, loop_result = timed(per_ticker_loop, tickers, fetch)
+        batch_time, batch_result = timed(batch, tickers, fetch)
+
+        if not args.live:
+            pd.testing.assert_frame_equal(loop_result, batch_result, check_exact=False, rtol=1e-9)
+        print(f"{len(tickers):>8} {loop_time:>10.3f} {batch_time:>10.3f} {loop_time / batch_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
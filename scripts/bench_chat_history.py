@@ -0,0 +1,61 @@
+"""
+Measures how the prompt replayed to the model grows over a long chat session.
+
+Simulates turns that each call a tool returning a year of daily prices, as
+`get_technical_indicators` or a price lookup would, and reports the estimated prompt
+tokens of the history after each turn with the unbounded history `app.py` used to keep
+and with `HistoryManager`, plus the time `compact` takes per turn.
+
+Usage: python scripts/bench_chat_history.py [--turns 200] [--budget 6000]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.chat_history import HistoryManager, message_tokens
+
+def simulated_turn(index: int) -> list:
+    prices = {"ticker": "AAPL", "Close": [round(180 + (index * 7 + day) % 23 * 0.37, 2) for day in range(252)]}
+    return [
+        {"role": "user", "content": f"How did AAPL trade over the last year? (question {index})"},
+        {"role": "assistant", "content": "", "tool_calls": [{
+            "id": f"call_{index}", "type": "function",
+            "function": {"name": "StockAnalyzer.get_stock_price", "arguments": '{"ticker": "AAPL"}'},
+        }]},
+        {"tool_call_id": f"call_{index}", "role": "tool", "name": "StockAnalyzer.get_stock_price", "content": json.dumps(prices)},
+        {"role": "assistant", "content": "AAPL traded between 180 and 188 over the last year, ending near 184. " * 3},
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200, help="Turns to simulate")
+    parser.add_argument("--budget", type=int, default=6000, help="History token budget")
+    args = parser.parse_args()
+
+    manager = HistoryManager(token_budget=args.budget)
+    system = {"role": "system", "content": "You are a stock analysis assistant."}
+    unbounded, managed = [system], [system]
+    unbounded_tokens, managed_tokens, compact_ms = [], [], []
+    for index in range(args.turns):
+        turn = simulated_turn(index)
+        unbounded += turn
+        started = time.perf_counter()
+        managed = manager.compact(managed + turn)
+        compact_ms.append((time.perf_counter() - started) * 1000)
+        unbounded_tokens.append(sum(map(message_tokens, unbounded)))
+        managed_tokens.append(sum(map(message_tokens, managed)))
+
+    for turn in sorted({1, 5, 10, 25, 50, 100, args.turns} & set(range(1, args.turns + 1))):
+        print(f"after turn {turn:4}: unbounded {unbounded_tokens[turn - 1]:8} tokens, "
+              f"managed {managed_tokens[turn - 1]:6} tokens ({len(managed)} messages at the end)")
+    late = compact_ms[len(compact_ms) // 2:]
+    print(f"compact: {statistics.median(compact_ms[:10]):.3f} ms per turn over the first 10 turns, "
+          f"{statistics.median(late):.3f} ms over the last {len(late)}")
+
+if __name__ == "__main__":
+    main()
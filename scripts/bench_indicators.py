@@ -0,0 +1,121 @@
+"""
+Correctness and throughput benchmark for the NumPy indicator kernels in utils/indicators.py.
+
+For every indicator and series length, the kernel output is checked against
+the pandas / `ta` reference implementation the project used before, and the
+throughput of both is reported in million points per second. References are
+skipped above --reference-limit points because some of them (ATR in `ta`)
+are Python loops.
+
+Usage: python scripts/bench_indicators.py [--sizes 1000 10000 100000 1000000 10000000] [--reference-limit 1000000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils import indicators
+from ta.momentum import RSIIndicator, StochasticOscillator
+from ta.trend import MACD
+from ta.volatility import AverageTrueRange, BollingerBands
+from ta.volume import volume_weighted_average_price
+
+# Kernels and references start their recursions differently, compare after the effect has decayed
+WARMUP = 300
+TOLERANCE = 1e-6
+
+def synthetic_bars(size: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    spread = close * rng.uniform(0, 0.02, size)
+    return pd.DataFrame({
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(10_000, 1_000_000, size).astype(np.float64),
+    })
+
+def cases(bars: pd.DataFrame):
+    high, low, close, volume = (np.ascontiguousarray(bars[column].to_numpy()) for column in ["High", "Low", "Close", "Volume"])
+    return {
+        "SMA(20)": (
+            lambda: indicators.sma(close, 20),
+            lambda: bars.Close.rolling(20).mean(),
+        ),
+        "EMA(20)": (
+            lambda: indicators.ema(close, 20),
+            lambda: bars.Close.ewm(span=20, adjust=False).mean(),
+        ),
+        "RSI(14)": (
+            lambda: indicators.rsi(close, 14),
+            lambda: RSIIndicator(bars.Close, window=14).rsi(),
+        ),
+        "MACD": (
+            lambda: indicators.macd(close)[2],
+            lambda: MACD(bars.Close).macd_diff(),
+        ),
+        "Stochastic": (
+            lambda: indicators.stochastic(high, low, close)[0],
+            lambda: StochasticOscillator(bars.High, bars.Low, bars.Close).stoch(),
+        ),
+        "VWAP": (
+            lambda: indicators.vwap(high, low, close, volume),
+            lambda: volume_weighted_average_price(bars.High, bars.Low, bars.Close, bars.Volume),
+        ),
+        "ATR(14)": (
+            lambda: indicators.atr(high, low, close, 14),
+            lambda: AverageTrueRange(bars.High, bars.Low, bars.Close, window=14).average_true_range(),
+        ),
+        "Bollinger": (
+            lambda: indicators.bollinger_bands(close)[1],
+            lambda: BollingerBands(bars.Close).bollinger_hband(),
+        ),
+    }
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def max_relative_error(actual: np.ndarray, expected) -> float:
+    expected = np.asarray(expected, dtype=np.float64)
+    rows = np.arange(len(expected)) >= WARMUP
+    mask = rows & np.isfinite(expected) & np.isfinite(actual)
+    if not mask.any():
+        return 0.0
+    return float(np.max(np.abs(actual[mask] - expected[mask]) / np.maximum(np.abs(expected[mask]), 1.0)))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--reference-limit", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'indicator':<12} {'points':>10} {'kernel Mpt/s':>13} {'reference Mpt/s':>16} {'max rel err':>12}")
+    for size in args.sizes:
+        bars = synthetic_bars(size)
+        for name, (kernel, reference) in cases(bars).items():
+            kernel_time, actual = timed(kernel)
+            kernel_rate = size / kernel_time / 1e6
+            if size <= args.reference_limit:
+                reference_time, expected = timed(reference)
+                error = max_relative_error(actual, expected)
+                if error > TOLERANCE:
+                    failures.append((name, size, error))
+                print(f"{name:<12} {size:>10} {kernel_rate:>13.1f} {size / reference_time / 1e6:>16.1f} {error:>12.2e}")
+            else:
+                print(f"{name:<12} {size:>10} {kernel_rate:>13.1f} {'skipped':>16} {'-':>12}")
+
+    if failures:
+        for name, size, error in failures:
+            print(f"MISMATCH {name} at {size} points: max relative error {error:.2e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
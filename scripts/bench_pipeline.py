@@ -0,0 +1,91 @@
+"""
+Measures the latency the chat pipeline adds on top of the model, offline.
+
+Runs turns of `app.process_user_input` against the mock inference server of
+`utils.mock_llm_server`, whose scripted models take a known time: each turn calls the quote tool
+of the question's ticker and answers from its result. Tools answer at once and the response cache
+is cleared before each turn, so the wall time of a turn less the time of its simulated
+completions is the pipeline's own: routing, history, streaming, tool dispatch and rendering.
+
+Usage: python scripts/bench_pipeline.py [--turns 20] [--first-token-seconds 0.2] [--tokens-per-second 80]
+"""
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import streamlit as st
+
+import app
+from utils.function_registry import FunctionsRegistry
+from utils.llm_client import get_client
+from utils.mock_llm_server import Latency, MockLLMServer, MockResponse, Rule
+
+SERVICE = '''
+from utils.function_metadata import function_schema
+
+class Quotes:
+    @classmethod
+    @function_schema(name="get_quote", description="Returns the latest price of a stock", required_params=["ticker"])
+    def get_quote(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol
+        """
+        return f"{ticker}: 100"
+'''
+
+RULES = [
+    Rule(MockResponse(tool_calls=[{"name": "Quotes.get_quote", "arguments": {"ticker": "{ticker}"}}]),
+         match=r"price of (?P<ticker>[A-Z]+)"),
+    Rule(MockResponse("{ticker} last traded at 100 dollars, unchanged from the previous close."),
+         match=r"price of (?P<ticker>[A-Z]+)", after_tool=True),
+]
+TICKERS = ["NVDA", "AAPL", "MSFT", "TSLA", "AMD", "META"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20, help="Turns of one chat")
+    parser.add_argument("--first-token-seconds", type=float, default=0.2, help="Simulated time to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Simulated decoding speed")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    app.PREFETCH_MAX_TICKERS = 0
+    with tempfile.TemporaryDirectory() as services, \
+            MockLLMServer(RULES, latency=Latency(args.first_token_seconds, args.tokens_per_second)) as server:
+        (Path(services) / "quotes.py").write_text(SERVICE)
+        tools = FunctionsRegistry(Path(services))
+        app.client = get_client(server.base_url, "mock")
+        st.session_state["messages"] = []
+        st.session_state["display_messages"] = []
+        st.session_state["llm_model"] = "qwen2.5:14b"
+
+        walls, models, overheads = [], [], []
+        for turn in range(args.turns):
+            app.response_cache.clear()
+            served = len(server.requests)
+            started = time.perf_counter()
+            app.process_user_input(app.client, f"What is the price of {TICKERS[turn % len(TICKERS)]}?", tools)
+            wall = time.perf_counter() - started
+            model = sum(request["model_seconds"] for request in server.requests[served:])
+            walls.append(wall)
+            models.append(model)
+            overheads.append(wall - model)
+
+    # The first turn also imports the tools and opens the connection
+    overheads_ms = sorted(overhead * 1000 for overhead in overheads[1:] or overheads)
+    print(f"turns:            {args.turns}, {len(server.requests) / args.turns:.0f} completions each")
+    print(f"turn:             {statistics.median(walls) * 1000:9.1f} ms (median)")
+    print(f"model:            {statistics.median(models) * 1000:9.1f} ms (median)")
+    print(f"pipeline:         {statistics.median(overheads_ms):9.1f} ms (median), "
+          f"{overheads_ms[min(len(overheads_ms) - 1, int(len(overheads_ms) * 0.95))]:.1f} ms (p95)")
+    print(f"first turn:       {overheads[0] * 1000:9.1f} ms of pipeline")
+    print(f"history:          {len(st.session_state['messages'])} messages after the last turn")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Simulates the latency a price tool call adds to a turn, with and without prefetching.
+
+Each turn asks about tickers found by `extract_tickers`. The model takes `--llm-seconds` to
+stream its tool calls, then the tools read the histories through a `PriceHistoryCache`
+whose downloads take `--download-seconds`. Without prefetch the downloads start after the
+model; with prefetch they start with the message and the tools find the data local, or wait
+for the download in flight.
+
+Usage: python scripts/bench_prefetch.py [--llm-seconds 1.5] [--download-seconds 0.8]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.price_cache import PriceHistoryCache
+from utils.tickers import extract_tickers
+
+MESSAGES = [
+    "What's Apple trading at?",
+    "Compare nvda and Microsoft",
+    "Is $PLTR oversold?",
+    "RSI of TSLA, AMD and Intel",
+]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-seconds", type=float, default=1.5, help="Time until the model's tool calls are complete")
+    parser.add_argument("--download-seconds", type=float, default=0.8, help="Time to download one history")
+    args = parser.parse_args()
+
+    def download(ticker, period, interval):
+        time.sleep(args.download_seconds)
+        return pd.DataFrame({"Close": np.linspace(100, 110, 252)}, index=pd.date_range("2024-01-01", periods=252, freq="B"))
+
+    for prefetch in (False, True):
+        cache = PriceHistoryCache(loader=download)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            total = 0.0
+            for message in MESSAGES:
+                started = time.perf_counter()
+                tickers = extract_tickers(message)
+                if prefetch:
+                    cache.prefetch(tickers, pool)
+                time.sleep(args.llm_seconds)  # the first completion streams its tool calls
+                list(pool.map(cache.get, tickers))  # the tool calls of the turn
+                total += time.perf_counter() - started
+        label = "with prefetch:   " if prefetch else "without prefetch:"
+        print(f"{label} {total / len(MESSAGES):.2f} s per turn until the tool results are ready")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures what building the tool registry costs per chat message.
+
+Compares the first build of the registry (which imports yfinance, matplotlib, DuckDB...),
+a fresh `FunctionsRegistry()` per message as `app.py` used to do, and the process-wide
+registry returned by `get_registry`, which only stats the service files on later calls.
+
+Cold start is measured in fresh interpreters: the time until `mapped_functions()` can be
+served when every module is executed up front, and when the schemas come from the manifest.
+
+Usage: python scripts/bench_registry.py [--messages 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.function_registry import FunctionsRegistry, get_registry
+
+def timed_ms(func) -> float:
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+COLD_START = """
+import sys, time
+started = time.perf_counter()
+sys.path.append({root!r})
+from utils.function_registry import FunctionsRegistry
+registry = FunctionsRegistry(manifest={manifest})
+registry.mapped_functions()
+schemas_at = time.perf_counter()
+registry.import_function("StockAnalyzer.get_stock_price")
+print((schemas_at - started) * 1000, (time.perf_counter() - started) * 1000)
+"""
+
+def cold_start_ms(manifest: bool):
+    """Returns the ms until the schemas are served and until the first tool is callable, in a fresh interpreter."""
+    root = str(Path(__file__).resolve().parent.parent)
+    output = subprocess.run([sys.executable, "-c", COLD_START.format(root=root, manifest=manifest)],
+                            capture_output=True, text=True, check=True).stdout
+    schemas, first_call = output.strip().splitlines()[-1].split()
+    return float(schemas), float(first_call)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20, help="Chat messages to simulate")
+    args = parser.parse_args()
+
+    # Writes the manifest if it is missing or stale, so the manifest run below starts from a fresh one
+    FunctionsRegistry(manifest=True)
+    eager_schemas, eager_call = map(statistics.median, zip(*(cold_start_ms(False) for _ in range(3))))
+    manifest_schemas, manifest_call = map(statistics.median, zip(*(cold_start_ms(True) for _ in range(3))))
+    print(f"cold start to schemas, every module:  {eager_schemas:10.2f} ms (first tool callable at {eager_call:.0f} ms)")
+    print(f"cold start to schemas, manifest:      {manifest_schemas:10.2f} ms (first tool callable at {manifest_call:.0f} ms)")
+
+    startup = timed_ms(get_registry)
+    per_message_build = [timed_ms(FunctionsRegistry) for _ in range(args.messages)]
+    per_message_shared = [timed_ms(get_registry) for _ in range(args.messages)]
+
+    build, shared = statistics.median(per_message_build), statistics.median(per_message_shared)
+    print(f"get_registry() first call:           {startup:10.2f} ms")
+    print(f"per message, new FunctionsRegistry(): {build:10.2f} ms (median of {args.messages})")
+    print(f"per message, shared get_registry():   {shared:10.3f} ms (median of {args.messages})")
+    print(f"latency removed per message:          {build - shared:10.2f} ms ({build / shared:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Measures the hit rate of the response cache on a desk asking near-identical questions.
+
+Users hold chat sessions of a few turns, with questions drawn from a few intents, each worded
+several ways, and follow-ups about the ticker of the previous question ("And its RSI?"). Each
+session's history grows as in `app.py`: a miss is answered by a simulated turn of
+`--turn-seconds` that calls a tool (with an id unique to the session) and is stored with the
+price data TTL, a hit appends the cached answer. Reports the hit rate of each layer, on the first
+and on later turns of the sessions, the time the hits saved and the cost of a lookup.
+
+Usage: python scripts/bench_response_cache.py [--sessions 100] [--turns 5] [--turn-seconds 4]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.response_cache import ResponseCache
+
+INTENTS = {
+    "{t} price": ["What's {t} trading at?", "what is {t} trading at right now", "{t} price", "Current {t} stock price?",
+                  "What is the price of {t}"],
+    "{t} rsi": ["What's the RSI of {t}?", "{t} RSI", "Is {t} overbought?", "what is the rsi for {t} today"],
+    "{t} sma": ["What is the 50 day SMA of {t}?", "what's the 50-day SMA for {t}", "{t} 50 day simple moving average"],
+}
+FOLLOW_UPS = ["And its RSI?", "What about its 50 day SMA?", "Is it overbought?", "and what is it trading at now"]
+TICKERS = ["NVDA", "AAPL", "MSFT", "TSLA", "AMD", "META"]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="Chat sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Questions per session")
+    parser.add_argument("--follow-ups", type=float, default=0.25, help="Share of later questions that are follow-ups")
+    parser.add_argument("--minutes", type=float, default=60, help="Time span of the sessions")
+    parser.add_argument("--ttl", type=float, default=300, help="Freshness of the price data, in seconds")
+    parser.add_argument("--turn-seconds", type=float, default=4.0, help="Time to answer a question without the cache")
+    args = parser.parse_args()
+
+    random.seed(7)
+    clock = [0.0]
+    cache = ResponseCache(clock=lambda: clock[0])
+    system = {"role": "system", "content": "You are a stock analysis assistant."}
+    outcomes = {"exact": 0, "semantic": 0, None: 0}
+    by_turn = {True: [0, 0], False: [0, 0]}  # first turn or not: [hits, questions]
+    lookups_ms = []
+    questions = args.sessions * args.turns
+    for session in range(args.sessions):
+        messages = [system]
+        ticker = random.choice(TICKERS)
+        for turn in range(args.turns):
+            clock[0] = (session * args.turns + turn) * args.minutes * 60 / questions
+            if turn and random.random() < args.follow_ups:
+                question = random.choice(FOLLOW_UPS)
+            else:
+                ticker = random.choice(TICKERS)
+                question = random.choice(INTENTS[random.choice(list(INTENTS))]).format(t=ticker)
+            messages.append({"role": "user", "content": question})
+
+            started = time.perf_counter()
+            layer, entry = cache.get("qwen2.5:14b", messages)
+            lookups_ms.append((time.perf_counter() - started) * 1000)
+            outcomes[layer] += 1
+            by_turn[turn == 0][0] += entry is not None
+            by_turn[turn == 0][1] += 1
+            if entry is not None:
+                messages.append({"role": "assistant", "content": entry.answer})
+                continue
+
+            answer = f"answer about {ticker}"
+            call_id = f"call_{session}_{turn}"
+            messages.append({"role": "assistant", "content": "", "tool_calls": [
+                {"id": call_id, "type": "function", "function": {"name": "StockAnalyzer.get_stock_price",
+                                                                 "arguments": f'{{"ticker": "{ticker}"}}'}}
+            ]})
+            messages.append({"role": "tool", "tool_call_id": call_id, "name": "StockAnalyzer.get_stock_price", "content": "100"})
+            messages.append({"role": "assistant", "content": answer})
+            # The app stores the answer under the history up to the question
+            question_at = max(index for index, message in enumerate(messages) if message["role"] == "user")
+            cache.put("qwen2.5:14b", messages[:question_at + 1], answer, ttl=args.ttl, seconds=args.turn_seconds)
+
+    hits = outcomes["exact"] + outcomes["semantic"]
+    print(f"questions:        {questions} in {args.sessions} sessions of {args.turns} over {args.minutes:.0f} min")
+    print(f"exact hits:       {outcomes['exact']:6} ({outcomes['exact'] / questions:.0%})")
+    print(f"semantic hits:    {outcomes['semantic']:6} ({outcomes['semantic'] / questions:.0%})")
+    print(f"hit rate:         {hits / questions:9.0%}")
+    print(f"  first turns:    {by_turn[True][0] / by_turn[True][1]:9.0%}")
+    print(f"  later turns:    {by_turn[False][0] / max(by_turn[False][1], 1):9.0%}")
+    print(f"time saved:       {hits * args.turn_seconds:9.0f} s of {questions * args.turn_seconds:.0f} s")
+    print(f"lookup:           {statistics.median(lookups_ms):9.3f} ms (median)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmarks screening a universe on the DuckDB indicator table against the per-ticker pandas path.
+
+The pandas path reads each ticker's bars from the store and computes its indicators with
+rolling/ewm and `ta`, as the per-ticker tools do. The SQL path materializes the indicators for
+every symbol in one query, tops them up incrementally after a new bar lands, and screens with a
+single lookup. Prices are synthetic and live in an in-memory store, so the benchmark runs offline.
+
+Usage: python scripts/bench_sql_indicators.py [--sizes 100 800] [--bars 504] [--rsi-below 30]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ta.momentum import RSIIndicator
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from database.indicator_store import IndicatorStore
+from database.price_store import PriceStore
+
+def synthetic_store(n_tickers: int, n_bars: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_bars + 1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0002, 0.02, size=(n_bars + 1, n_tickers)), axis=0))
+    store = PriceStore(":memory:", downloader=lambda *args: None)
+    frames = {}
+    for column in range(n_tickers):
+        close = prices[:, column]
+        frames[f"T{column:04d}"] = pd.DataFrame(
+            {"Open": close, "High": close, "Low": close, "Close": close, "Volume": np.full(len(close), 1000)}, index=index
+        )
+        store.write(f"T{column:04d}", frames[f"T{column:04d}"].iloc[:-1])
+    return store, frames
+
+def pandas_screen(store: PriceStore, tickers, threshold: float) -> pd.Index:
+    rows = {}
+    for ticker in tickers:
+        close = store.read(ticker).Close
+        rows[ticker] = {
+            "sma_20": close.rolling(20).mean().iloc[-1],
+            "sma_50": close.rolling(50).mean().iloc[-1],
+            "sma_200": close.rolling(200).mean().iloc[-1],
+            "ema_20": close.ewm(span=20, adjust=False).mean().iloc[-1],
+            "ema_50": close.ewm(span=50, adjust=False).mean().iloc[-1],
+            "rsi_14": RSIIndicator(close).rsi().iloc[-1],
+            "volatility_20": np.log(close).diff().rolling(20).std().iloc[-1] * np.sqrt(252),
+            "drawdown": close.iloc[-1] / close.cummax().iloc[-1] - 1,
+        }
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    return table.index[table.rsi_14 < threshold]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 800])
+    parser.add_argument("--bars", type=int, default=504, help="Daily bars stored per ticker")
+    parser.add_argument("--rsi-below", type=float, default=30)
+    args = parser.parse_args()
+
+    print(f"{'tickers':>8} {'pandas (s)':>11} {'sql build (s)':>14} {'sql top-up (s)':>15} "
+          f"{'sql screen (s)':>15} {'speedup':>8} {'matches':>8} {'agree':>6}")
+    for size in args.sizes:
+        store, frames = synthetic_store(size, args.bars)
+        table = IndicatorStore(store)
+        build_time, _ = timed(table.refresh)
+
+        # A new trading day lands: the per-ticker path recomputes everything, the table only the new rows
+        for symbol, frame in frames.items():
+            store.write(symbol, frame.iloc[-1:])
+        pandas_time, expected = timed(pandas_screen, store, list(frames), args.rsi_below)
+        top_up_time, _ = timed(table.refresh)
+        screen_time, matches = timed(table.screen, "rsi_14", "<", args.rsi_below)
+
+        # The SQL RSI is a truncated Wilder average, so tickers sitting on the threshold may differ
+        agree = len(set(expected) ^ set(matches.index))
+        sql_time = top_up_time + screen_time
+        print(f"{size:>8} {pandas_time:>11.3f} {build_time:>14.3f} {top_up_time:>15.3f} "
+              f"{screen_time:>15.3f} {pandas_time / sql_time:>7.1f}x {len(matches):>8} {'yes' if not agree else f'{agree} diff':>6}")
+
+if __name__ == "__main__":
+    main()
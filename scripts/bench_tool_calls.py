@@ -0,0 +1,61 @@
+"""
+Benchmarks one assistant turn's tool calls run one after another against the concurrent executor.
+
+The turn asks for the technical indicators of several tickers, as a "compare AAPL, MSFT and
+NVDA" question does. History downloads are simulated with --latency seconds each, so the
+benchmark runs offline and measures what the executor saves on network-bound calls.
+
+Usage: python scripts/bench_tool_calls.py [--tickers AAPL MSFT NVDA] [--latency 0.5]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.function_registry import FunctionsRegistry
+from utils.price_cache import price_cache
+
+def simulated_download(latency: float):
+    def download(ticker: str, period: str, interval: str) -> pd.DataFrame:
+        time.sleep(latency)
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(len(ticker)).normal(0, 0.01, 252)))
+        return pd.DataFrame({"Close": close}, index=pd.bdate_range(end="2024-12-31", periods=252))
+    return download
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", nargs="+", default=["AAPL", "MSFT", "NVDA"])
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per history download")
+    args = parser.parse_args()
+
+    price_cache.loader = simulated_download(args.latency)
+    registry = FunctionsRegistry()
+    tool_calls = [
+        SimpleNamespace(id=f"call_{ticker}", function=SimpleNamespace(
+            name="StockAnalyzer.get_technical_indicators", arguments=json.dumps({"ticker": ticker})))
+        for ticker in args.tickers
+    ]
+
+    price_cache.invalidate()
+    started = time.perf_counter()
+    sequential = [registry.resolve_function(call.function.name, call.function.arguments) for call in tool_calls]
+    sequential_time = time.perf_counter() - started
+
+    price_cache.invalidate()
+    batch = registry.execute_tool_calls(tool_calls)
+    assert [result.content for result in batch.results] == sequential
+
+    print(f"{len(tool_calls)} tool calls, {args.latency:.2f}s simulated fetch each")
+    print(f"sequential wall time:  {sequential_time:6.2f}s")
+    print(f"concurrent wall time:  {batch.wall_seconds:6.2f}s (summed tool time {batch.tool_seconds:.2f}s, "
+          f"{sequential_time / batch.wall_seconds:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures the prompt tokens saved by offering the model only the tools routed for each message.
+
+Routes a set of typical chat messages with `FunctionsRegistry.route` and compares the
+estimated tokens of the routed tool schemas with those of every registered schema, which
+is what each completion request carried before. Also reports the routing latency and the
+time to build the index.
+
+Usage: python scripts/bench_tool_routing.py [--top-k 4]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from utils.function_registry import FunctionsRegistry
+from utils.tokens import estimate_tokens
+from utils.tool_router import ToolRouter
+
+MESSAGES = [
+    "What is the stock price of Apple?",
+    "Plot TSLA for me",
+    "Show me a chart of NVDA over the last year",
+    "What's the RSI of MSFT?",
+    "Is AAPL oversold?",
+    "Give me the 50 day moving average of AMZN",
+    "EMA 20 for GOOG",
+    "MACD of META",
+    "Compare AAPL, MSFT and NVDA",
+    "Which stocks have RSI below 30?",
+    "Find stocks trading above their 200-day SMA",
+    "Technical analysis of TSLA",
+    "And for MSFT?",
+]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=4, help="Tools offered per message")
+    args = parser.parse_args()
+
+    tools = FunctionsRegistry(manifest=True)
+    every_tool = estimate_tokens(json.dumps(tools.mapped_functions()))
+
+    started = time.perf_counter()
+    ToolRouter(tools.schema_registry)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    offered, latencies = [], []
+    for message in MESSAGES:
+        started = time.perf_counter()
+        names = tools.route(message, args.top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        tokens = estimate_tokens(json.dumps(tools.mapped_functions(names)))
+        offered.append(tokens)
+        print(f"{message:45} {len(names)} tools {tokens:6} tokens  {', '.join(name.split('.')[-1] for name in names)}")
+
+    total = every_tool * len(MESSAGES)
+    print(f"\nevery tool:           {every_tool:8} tokens per request ({len(tools.schema_registry)} tools)")
+    print(f"routed, average:      {statistics.mean(offered):8.0f} tokens per request (top {args.top_k})")
+    print(f"prompt tokens saved:  {total - sum(offered):8} of {total} ({(total - sum(offered)) / total:.0%})")
+    print(f"routing latency:      {statistics.median(latencies):8.3f} ms per message (median), index built in {build_ms:.2f} ms")
+
+if __name__ == "__main__":
+    main()
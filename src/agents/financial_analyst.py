@@ -15,6 +15,8 @@ import pandas as pd
 import dotenv
 from langchain_core.messages import BaseMessage
 
+from database.price_store import covers_range, get_price_store
+
 dotenv.load_dotenv()
 
 def merge_dicts(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
@@ -172,11 +174,23 @@ def prices_to_df(prices: List[Dict[str, Any]]) -> pd.DataFrame:
     df.sort_index(inplace=True)
     return df
 
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
 # Update the get_price_data function to use the new functions
 def get_price_data(
     ticker: str,
     start_date: str,
     end_date: str
 ) -> pd.DataFrame:
+    """
+    Reads daily prices through the local price store, which downloads the bars it is missing from its
+    own source. The API is only asked when the store cannot cover the range, and its bars are not
+    stored: they are adjusted differently from the store's.
+    """
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    stored = get_price_store().history(ticker, start.to_pydatetime(), (end + pd.Timedelta(days=1)).to_pydatetime())
+    if covers_range(stored, start, end):
+        return stored.rename(columns=str.lower)[PRICE_COLUMNS]
+
     prices = get_prices(ticker, start_date, end_date)
-    return prices_to_df(prices)
\ No newline at end of file
+    return prices_to_df(prices)[PRICE_COLUMNS]
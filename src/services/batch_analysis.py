@@ -0,0 +1,79 @@
+import json
+from typing import List
+
+import pandas as pd
+import yfinance as yf
+from config.financial_analysis_config import PRICE_CACHE_TTL_SECONDS
+from utils import indicators
+from utils.function_metadata import function_schema
+
+DEFAULT_BATCH_WINDOWS = [20, 50]
+
+class BatchStockAnalyzer:
+    """Computes indicators for many tickers at once over a wide (date x ticker) price panel."""
+
+    @staticmethod
+    def download_panel(tickers: List[str], period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        """
+        Downloads the histories of all tickers with a single request and returns the close panel.
+
+        :param tickers: The stock ticker symbols to download
+        :param period: The history period, as accepted by yfinance
+        :param interval: The bar interval, as accepted by yfinance
+        """
+        symbols = sorted({ticker.strip().upper() for ticker in tickers})
+        data = yf.download(tickers=symbols, period=period, interval=interval, group_by='column', progress=False, threads=True)
+        if data.empty:
+            return pd.DataFrame(columns=symbols)
+        close = data['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(symbols[0])
+        return close.dropna(axis=1, how='all')
+
+    @staticmethod
+    def compute_indicators(close: pd.DataFrame, windows: List[int] = None) -> pd.DataFrame:
+        """
+        Computes the latest price, SMA/EMA per window, RSI and MACD column-wise over a close panel.
+
+        :param close: A frame indexed by date with one close column per ticker
+        :param windows: The timeframes to consider when calculating the SMA and EMA
+        :return: A frame indexed by ticker with one column per indicator
+        """
+        windows = windows or DEFAULT_BATCH_WINDOWS
+        # The kernels skip each ticker's leading gap and forward fill interior gaps,
+        # so tickers with different calendars still get a value on the last row
+        prices = indicators.as_array(close)
+        columns = {"price": close.ffill().iloc[-1].to_numpy()}
+
+        for window in windows:
+            columns[f"SMA_{window}"] = indicators.sma(prices, window)[-1]
+            columns[f"EMA_{window}"] = indicators.ema(prices, window)[-1]
+
+        columns["RSI"] = indicators.rsi(prices)[-1]
+        macd, signal, histogram = indicators.macd(prices)
+        columns["MACD"] = macd[-1]
+        columns["MACD_signal"] = signal[-1]
+        columns["MACD_histogram"] = histogram[-1]
+
+        return pd.DataFrame(columns, index=close.columns)
+
+    @classmethod
+    def analyze(cls, tickers: List[str], windows: List[int] = None, period: str = '1y') -> pd.DataFrame:
+        """Downloads a panel for the tickers and returns their indicator table."""
+        return cls.compute_indicators(cls.download_panel(tickers, period=period), windows)
+
+    @classmethod
+    @function_schema(
+        name="get_batch_indicators",
+        description="Get the latest price, SMA, EMA, RSI and MACD for a list of stock tickers in a single call",
+        required_params=["tickers"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
+    )
+    def get_batch_indicators(cls, tickers: List[str], windows: List[int] = None):
+        """
+        :param tickers: The stock ticker symbols to analyze (for example ["AAPL", "MSFT"])
+        :param windows: The timeframes to consider when calculating the SMA and EMA (defaults to 20 and 50)
+        """
+        table = cls.analyze(tickers, windows=[int(window) for window in windows] if windows else None)
+        table = table.round(4).astype(object).where(table.notna(), None)
+        return json.dumps(table.to_dict(orient="index"))
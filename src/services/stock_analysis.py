@@ -1,6 +1,23 @@
-import yfinance as yf
-import matplotlib.pyplot as plt
+import json
+import math
+from typing import List, Optional
+
+import numpy as np
+from config.financial_analysis_config import PRICE_CACHE_TTL_SECONDS
+from utils import indicators
+from utils.chart_renderer import submit_price_chart
 from utils.function_metadata import function_schema
+from utils.price_cache import get_history
+from utils.streaming_indicators import EMAState, MACDState, RSIState, indicator_states
+
+DEFAULT_INDICATOR_WINDOWS = [20, 50, 200]
+
+def _last_value(values: np.ndarray) -> Optional[float]:
+    """Returns the last value of an indicator array as a JSON friendly float (None when undefined)."""
+    if len(values) == 0:
+        return None
+    value = float(values[-1])
+    return None if math.isnan(value) else round(value, 4)
 
 class StockAnalyzer:
 
@@ -8,81 +25,110 @@ class StockAnalyzer:
     @function_schema(
         name="get_stock_price",
         description="Gets the latest stock price given the ticker symbol of a company.",
-        required_params=["ticker"]
+        required_params=["ticker"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
     )
     def get_stock_price(cls, ticker: str):
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         """
-        return str(yf.Ticker(ticker).history(period='1y').iloc[-1].Close)
+        return str(get_history(ticker).iloc[-1].Close)
     
     @classmethod
     @function_schema(
         name="calculate_SMA",
         description="Calculate the simple moving average for a given stock ticker and a window",
-        required_params=["ticker", "window"]
+        required_params=["ticker", "window"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
     )
     def calculate_SMA(cls, ticker: str, window: int):
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         :param window: The timeframe to consider when calculating the SMA
         """
-        data = yf.Ticker(ticker).history(period='1y').Close
-        return str(data.rolling(window=window).mean().iloc[-1])
+        data = get_history(ticker).Close
+        return str(indicators.sma(data, window)[-1])
 
     @classmethod
     @function_schema(
         name="calculate_EMA",
         description="Calculate the exponential moving average for a given stock ticker and a window",
-        required_params=["ticker", "window"]
+        required_params=["ticker", "window"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
     )
     def calculate_EMA(cls, ticker: str, window: int):
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         :param window: The timeframe to consider when calculating the EMA
         """
-        data = yf.Ticker(ticker).history(period='1y').Close
-        return str(data.ewm(span=window, adjust=False).mean().iloc[-1])
+        data = get_history(ticker).Close
+        key = (ticker.strip().upper(), "EMA", int(window))
+        return str(indicator_states.evaluate(key, lambda: EMAState(window), data))
 
     @classmethod
     @function_schema(
         name="calculate_RSI",
         description="Calculate the RSI for a given stock ticker",
-        required_params=["ticker"]
+        required_params=["ticker"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
     )
     def calculate_RSI(cls, ticker: str):
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         """
-        data = yf.Ticker(ticker).history(period='1y').Close
-        delta = data.diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ema_up = up.ewm(com=14-1, adjust=False).mean()
-        ema_down = down.ewm(com=14-1, adjust=False).mean()
-        rs = ema_up / ema_down
-        return str(100 - (100 / (1 + rs)).iloc[-1])
+        data = get_history(ticker).Close
+        key = (ticker.strip().upper(), "RSI", 14)
+        return str(indicator_states.evaluate(key, lambda: RSIState(14), data))
 
     @classmethod
     @function_schema(
         name="calculate_MACD",
         description="Calculate the MACD for a given stock ticker",
-        required_params=["ticker"]
+        required_params=["ticker"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
     )
     def calculate_MACD(cls, ticker: str):
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         """
-        data = yf.Ticker(ticker).history(period='1y').Close
-        short_EMA = data.ewm(span=12, adjust=False).mean()
-        long_EMA = data.ewm(span=26, adjust=False).mean()
+        data = get_history(ticker).Close
+        key = (ticker.strip().upper(), "MACD", 12, 26, 9)
+        MACD, signal, MACD_histogram = indicator_states.evaluate(key, lambda: MACDState(12, 26, 9), data)
+
+        return f'{MACD}, {signal}, {MACD_histogram}'
 
-        MACD = short_EMA - long_EMA
-        signal = MACD.ewm(span=9, adjust=False)
+    @classmethod
+    @function_schema(
+        name="get_technical_indicators",
+        description="Get the latest price, SMA and EMA for several windows, RSI and MACD for a given stock ticker in a single call",
+        required_params=["ticker"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
+    )
+    def get_technical_indicators(cls, ticker: str, windows: List[int] = None):
+        """
+        :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
+        :param windows: The timeframes to consider when calculating the SMA and EMA (defaults to 20, 50 and 200)
+        """
+        windows = [int(window) for window in (windows or DEFAULT_INDICATOR_WINDOWS)]
+        data = get_history(ticker)
+        close = indicators.as_array(data.Close)
 
-        MACD_histogram = MACD - signal
+        # Every indicator is derived from the same frame, so the bundle costs a single download
+        macd, signal, histogram = indicators.macd(close)
 
-        return f'{MACD[-1]}, {signal[-1]}, {MACD_histogram[-1]}'
+        return json.dumps({
+            "ticker": ticker,
+            "as_of": str(data.index[-1].date()),
+            "price": _last_value(close),
+            "SMA": {str(window): _last_value(indicators.sma(close, window)) for window in windows},
+            "EMA": {str(window): _last_value(indicators.ema(close, window)) for window in windows},
+            "RSI": _last_value(indicators.rsi(close)),
+            "MACD": {
+                "macd": _last_value(macd),
+                "signal": _last_value(signal),
+                "histogram": _last_value(histogram),
+            },
+        })
 
     @classmethod
     @function_schema(
@@ -94,12 +140,6 @@ class StockAnalyzer:
         """
         :param ticker: The stock ticker symbol for a company (for example APPL for Apple)
         """
-        data = yf.Ticker(ticker).history(period='1y')
-        plt.figure(figsize=(10,5))
-        plt.plot(data.index, data.Close)
-        plt.title(f"{ticker} Stock Price Over Last Year")
-        plt.xlabel('Date')
-        plt.ylabel('Stock Price ($)')
-        plt.grid(True)
-        plt.savefig('assets/stock.png')
-        plt.close()
\ No newline at end of file
+        data = get_history(ticker)
+        # Rendering happens on the chart worker pool, the caller gets a future of the image bytes
+        return submit_price_chart(ticker, data, f"{ticker} Stock Price Over Last Year")
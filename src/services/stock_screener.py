@@ -0,0 +1,76 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from config.financial_analysis_config import PRICE_CACHE_TTL_SECONDS
+from database.indicator_store import INDICATORS, OPERATORS, get_indicator_store
+from database.price_store import period_start
+from utils.function_metadata import function_schema
+
+logger = logging.getLogger(__name__)
+
+# Enough daily bars for the 200-day SMA
+SCREEN_HISTORY_PERIOD = '2y'
+TOP_UP_WORKERS = 8
+
+class StockScreener:
+    """Screens a universe of tickers on the indicator table materialized in the price store."""
+
+    @staticmethod
+    def top_up(tickers: List[str], period: str = SCREEN_HISTORY_PERIOD) -> None:
+        """
+        Stores the bars missing for each ticker, downloading several tickers concurrently.
+
+        Top-ups are throttled per ticker by the price store, so screening the same universe
+        again only downloads once the refresh interval has passed.
+        """
+        store = get_indicator_store().store
+        start = period_start(period)
+
+        def _top_up(ticker: str) -> None:
+            try:
+                store.top_up(ticker, start)
+            except Exception as e:
+                logger.error(f"Error topping up prices for {ticker}: {e}")
+
+        with ThreadPoolExecutor(max_workers=TOP_UP_WORKERS) as pool:
+            list(pool.map(_top_up, tickers))
+
+    @classmethod
+    @function_schema(
+        name="screen_stocks",
+        description=(
+            "Find the stocks whose latest indicator value passes a threshold, for example RSI below 30, "
+            "among a list of tickers or every ticker already stored. Indicators: "
+            + "; ".join(f"{name}: {description}" for name, description in INDICATORS.items())
+        ),
+        required_params=["indicator", "operator", "threshold"],
+        cache_ttl=PRICE_CACHE_TTL_SECONDS
+    )
+    def screen_stocks(cls, indicator: str, operator: str, threshold: float, tickers: List[str] = None):
+        """
+        :param indicator: The indicator to screen on, one of sma_20, sma_50, sma_200, ema_20, ema_50, rsi_14, volatility_20 or drawdown
+        :param operator: The comparison to apply, one of <, <=, >, >= or =
+        :param threshold: The value to compare the latest indicator value with (for example 30)
+        :param tickers: The stock ticker symbols to screen (defaults to every stored ticker)
+        """
+        if indicator not in INDICATORS or operator not in OPERATORS:
+            return json.dumps({"error": f"indicator must be one of {', '.join(INDICATORS)} and operator one of {', '.join(OPERATORS)}"})
+
+        indicator_store = get_indicator_store()
+        if tickers:
+            cls.top_up(tickers)
+        indicator_store.refresh(tickers)
+        universe = indicator_store.screen(symbols=tickers)
+        matches = indicator_store.screen(indicator, operator, float(threshold), symbols=tickers)
+
+        return json.dumps({
+            "condition": f"{indicator} {operator} {threshold}",
+            "as_of": str(universe.timestamp.max().date()) if not universe.empty else None,
+            "screened": len(universe),
+            "matches": {
+                symbol: {"close": round(float(row.close), 4), indicator: round(float(row[indicator]), 4)}
+                for symbol, row in matches.iterrows()
+            },
+        })
@@ -1,60 +1,64 @@
-from typing import Dict, Union
+from typing import Dict, Optional, Union
 
 from langchain_core.tools import tool
-import yfinance as yf
 import datetime as dt
 import logging
+import math
 
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.trend import MACD
-from ta.volume import volume_weighted_average_price
+from database.price_store import get_price_store
+from utils import indicators as ind
+from utils.payload import compact_price_payload
 
 class StockDataFetcher:
     """Handles stock price and technical indicator retrieval."""
 
     @staticmethod
     @tool(parse_docstring=True, name_or_callable="StockDataFetcher.get_stock_prices")
-    def get_stock_prices(ticker: str) -> Union[Dict, str]:
+    def get_stock_prices(ticker: str, compact: bool = True, row_budget: int = 120, token_budget: Optional[int] = None) -> Union[Dict, str]:
         """Fetches historical stock price data and technical indicators for a given ticker.
         
         Args:
             ticker: The stock ticker symbol for a company (for example APPL for Apple)
+            compact: Return column arrays with rounded values and weekly or monthly bars for older history instead of one dict per day
+            row_budget: Maximum number of price bars to return in compact mode
+            token_budget: Maximum estimated tokens for the price data in compact mode
         """
         try:
-            data = yf.download(
-                ticker,
-                start=dt.datetime.now() - dt.timedelta(weeks=24 * 3),
-                end=dt.datetime.now(),
-                interval="1d",
-            )
+            data = get_price_store().history(ticker, start=dt.datetime.now() - dt.timedelta(weeks=24 * 3))
 
             if data.empty:
                 return f"Error: No data found for {ticker}"
 
+            if compact:
+                stock_price = compact_price_payload(data[["Open", "High", "Low", "Close", "Volume"]], row_budget, token_budget)
+
             df = data.copy()
             df.reset_index(inplace=True)
             df["Date"] = df["Date"].astype(str)
 
             indicators = {}
+            dates = df["Date"].iloc[-12:]
+            high, low, close, volume = (ind.as_array(df[column]) for column in ["High", "Low", "Close", "Volume"])
+
+            def last_values(values):
+                return {date: int(value) for date, value in zip(dates, values[-12:]) if not math.isnan(value)}
 
             # RSI
-            rsi_series = RSIIndicator(df["Close"], window=14).rsi().iloc[-12:]
-            indicators["RSI"] = {str(date): int(value) for date, value in rsi_series.dropna().to_dict().items()}
+            indicators["RSI"] = last_values(ind.rsi(close, window=14))
 
             # Stochastic Oscillator
-            sto_series = StochasticOscillator(df["High"], df["Low"], df["Close"], window=14).stoch().iloc[-12:]
-            indicators["Stochastic_Oscillator"] = {str(date): int(value) for date, value in sto_series.dropna().to_dict().items()}
+            indicators["Stochastic_Oscillator"] = last_values(ind.stochastic(high, low, close, window=14)[0])
 
             # MACD
-            macd = MACD(df["Close"])
-            macd_series = macd.macd().iloc[-12:]
-            indicators["MACD"] = {str(date): int(value) for date, value in macd_series.to_dict().items()}
+            indicators["MACD"] = last_values(ind.macd(close)[0])
 
             # VWAP
-            vwap_series = volume_weighted_average_price(df["High"], df["Low"], df["Close"], df["Volume"]).iloc[-12:]
-            indicators["VWAP"] = {str(date): int(value) for date, value in vwap_series.to_dict().items()}
+            indicators["VWAP"] = last_values(ind.vwap(high, low, close, volume))
+
+            if not compact:
+                stock_price = df.to_dict(orient="records")
 
-            return {"stock_price": df.to_dict(orient="records"), "indicators": indicators}
+            return {"stock_price": stock_price, "indicators": indicators}
 
         except Exception as e:
             logging.error(f"Error fetching stock prices for {ticker}: {e}")
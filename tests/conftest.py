@@ -0,0 +1,44 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.function_registry import FunctionsRegistry
+
+QUOTES_SERVICE = '''
+from utils.function_metadata import function_schema
+
+class Quotes:
+    @classmethod
+    @function_schema(name="get_quote", description="Returns the price of a stock", required_params=["ticker"])
+    def get_quote(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol
+        """
+        if ticker == "FAIL":
+            raise RuntimeError("no quote")
+        return f"{ticker}: 100"
+'''
+
+@pytest.fixture
+def make_history():
+    """
+    Returns a factory of synthetic daily OHLCV histories: a random walk over `rows` business days
+    up to `end` (today by default), the same for the same `seed`.
+    """
+    def make(rows: int = 250, seed: int = 7, end=None) -> pd.DataFrame:
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+        return pd.DataFrame(
+            {"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+             "Volume": rng.integers(10**6, 10**7, rows)},
+            index=pd.bdate_range(end=end or dt.date.today(), periods=rows, name="Date"),
+        )
+    return make
+
+@pytest.fixture
+def quote_tools(tmp_path):
+    """A registry of one service, `Quotes.get_quote`, which answers "<ticker>: 100" and fails for "FAIL"."""
+    (tmp_path / "quotes.py").write_text(QUOTES_SERVICE)
+    return FunctionsRegistry(tmp_path)
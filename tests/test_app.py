@@ -1,11 +1,10 @@
 from typing import List, Dict
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
 import logging
-import json
 
 from utils.function_registry import FunctionsRegistry
+from utils.llm_client import get_client
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -14,13 +13,9 @@ def main() -> None:
     load_dotenv()
 
     try:
-        client = OpenAI(
-            base_url=os.getenv("BASE_URL"),
-            api_key=os.getenv("API_KEY")
-        )
+        client = get_client(os.getenv("BASE_URL"), os.getenv("API_KEY"))
 
         tools = FunctionsRegistry()
-        function_map = tools.get_function_callable()
         
         # This might not work as the context is short, You have to stich up the prompt better to make it work in this particular example
         messages: List[Dict[str, str]] = [
@@ -40,22 +35,18 @@ def main() -> None:
         if tool_calls:
             messages.append(response_message)
 
-            for tool_call in tool_calls:
-                function_name = tool_call.function.name
-                if function_name in function_map:
-                    function_args = json.loads(tool_call.function.arguments)
-
-                    try:
-                        function_response = function_map[function_name](
-                            **function_args)
-                        messages.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": function_response,
-                        })
-                    except Exception as e:
-                        logging.error(f"Error in {function_name}: {e}")
+            batch = tools.execute_tool_calls(tool_calls)
+            logging.info(batch.summary())
+            # Every tool call needs its paired tool message, failed ones included
+            for result in batch.results:
+                if not result.ok:
+                    logging.error(f"Error in {result.name}: {result.error}")
+                messages.append({
+                    "tool_call_id": result.tool_call_id,
+                    "role": "tool",
+                    "name": result.name,
+                    "content": result.content if result.ok else result.error,
+                })
 
             second_completion = client.chat.completions.create(
                 model="qwen2.5:7b",
@@ -0,0 +1,153 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+import streamlit as st
+
+import app
+from utils.metrics import metrics
+from utils.model_router import ModelRouter
+
+def tool_call(index, ticker, call_id=None, arguments=None):
+    return SimpleNamespace(index=index, id=call_id or f"call_{ticker}", function=SimpleNamespace(
+        name="Quotes.get_quote", arguments=json.dumps({"ticker": ticker}) if arguments is None else arguments))
+
+def chunk(content=None, tool_calls=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content, tool_calls=tool_calls))])
+
+class ScriptedCompletions:
+    """Streams the first completion and each follow-up from a script, recording the requests."""
+
+    def __init__(self, *streams, unavailable=()):
+        self.streams = list(streams)
+        self.unavailable = set(unavailable)
+        self.requests = []
+
+    def create(self, **request):
+        assert request["stream"]
+        if request["model"] in self.unavailable:
+            raise ConnectionError(f"{request['model']} is not loaded")
+        self.requests.append({**request, "messages": list(request["messages"])})
+        return iter(self.streams.pop(0))
+
+@pytest.fixture
+def chat(monkeypatch):
+    st.session_state["messages"] = []
+    st.session_state["display_messages"] = []
+    st.session_state["llm_model"] = "test-model"
+    app.response_cache.clear()
+    prefetched = []
+    monkeypatch.setattr(app, "prefetch_prices", prefetched.extend)
+
+    def install(completions):
+        client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        client.prefetched = prefetched
+        monkeypatch.setattr(app, "client", client, raising=False)
+        return client
+    return install
+
+def test_tool_results_share_one_follow_up(quote_tools, chat):
+    first = [chunk(tool_calls=[tool_call(0, "AAPL")]), chunk(tool_calls=[tool_call(1, "MSFT")])]
+    completions = ScriptedCompletions(first, [chunk("AAPL and "), chunk("MSFT are at 100.")])
+    client = chat(completions)
+    app.process_user_input(client, "Compare AAPL and MSFT", quote_tools)
+
+    assert client.prefetched == ["AAPL", "MSFT"]
+    assert len(completions.requests) == 2
+    roles = [message["role"] for message in st.session_state["messages"]]
+    assert roles == ["user", "assistant", "tool", "tool", "assistant"]
+    request_message, *results, answer = st.session_state["messages"][1:]
+    assert [call["id"] for call in request_message["tool_calls"]] == ["call_AAPL", "call_MSFT"]
+    assert [(result["tool_call_id"], result["content"]) for result in results] == [
+        ("call_AAPL", "AAPL: 100"), ("call_MSFT", "MSFT: 100")
+    ]
+    assert answer["content"] == "AAPL and MSFT are at 100."
+
+def test_follow_ups_may_call_tools_up_to_the_depth(quote_tools, chat, monkeypatch):
+    monkeypatch.setattr(app, "MAX_TOOL_ROUNDS", 2)
+    first = [chunk(tool_calls=[tool_call(0, "AAPL")])]
+    streamed_call = [
+        chunk(tool_calls=[tool_call(0, "NVDA", arguments='{"ticker": ')]),
+        chunk(tool_calls=[SimpleNamespace(index=0, id=None, function=SimpleNamespace(name=None, arguments='"NVDA"}'))]),
+    ]
+    completions = ScriptedCompletions(first, streamed_call, [chunk("NVDA is at 100.")])
+    app.process_user_input(chat(completions), "And NVDA?", quote_tools)
+
+    follow_ups = completions.requests[1:]
+    assert ["tools" in request for request in follow_ups] == [True, False]
+    assert st.session_state["messages"][-2] == {
+        "tool_call_id": "call_NVDA", "role": "tool", "name": "Quotes.get_quote", "content": "NVDA: 100"
+    }
+    assert st.session_state["messages"][-1]["content"] == "NVDA is at 100."
+
+def test_plain_answers_stream_into_the_history(quote_tools, chat):
+    completions = ScriptedCompletions([chunk("Hello"), chunk(", how can I help?")])
+    app.process_user_input(chat(completions), "Hi", quote_tools)
+
+    assert st.session_state["messages"][-1] == {"role": "assistant", "content": "Hello, how can I help?"}
+    assert st.session_state["display_messages"][-1] == {"role": "assistant", "content": "Hello, how can I help?"}
+
+def test_tool_calls_run_while_the_completion_streams(quote_tools, chat):
+    seen_during_stream = []
+
+    def quotes_run(expected):
+        """Waits up to 5s for `expected` quote calls to have run and returns how many did."""
+        deadline = time.monotonic() + 5
+        while True:
+            tool = metrics.tools.get("Quotes.get_quote")
+            calls = tool.calls if tool is not None else 0
+            if calls >= expected or time.monotonic() > deadline:
+                return calls
+            time.sleep(0.01)
+
+    def first():
+        yield chunk(tool_calls=[tool_call(0, "AAPL", arguments='{"ticker": ')])
+        time.sleep(0.1)
+        seen_during_stream.append(quotes_run(0))
+        # The arguments are complete: the call runs before the model ends its output, also when it is the only one
+        yield chunk(tool_calls=[SimpleNamespace(index=0, id=None, function=SimpleNamespace(name=None, arguments='"AAPL"}'))])
+        seen_during_stream.append(quotes_run(1))
+        yield chunk(tool_calls=[tool_call(1, "MSFT")])
+        seen_during_stream.append(quotes_run(2))
+
+    metrics.reset()
+    completions = ScriptedCompletions(first(), [chunk("Done.")])
+    app.process_user_input(chat(completions), "Quote AAPL and MSFT", quote_tools)
+
+    assert seen_during_stream == [0, 1, 2]
+    assert metrics.tools["Quotes.get_quote"].calls == 2
+    assert [message.get("content") for message in st.session_state["messages"][2:4]] == ["AAPL: 100", "MSFT: 100"]
+
+def test_repeated_questions_are_answered_from_the_cache(quote_tools, chat):
+    completions = ScriptedCompletions([chunk("Markets close at 4pm ET.")])
+    client = chat(completions)
+    app.process_user_input(client, "When does the market close?", quote_tools)
+
+    # Another session asks the same question, worded differently
+    st.session_state["messages"] = []
+    app.process_user_input(client, "when does the market close", quote_tools)
+
+    assert len(completions.requests) == 1
+    assert st.session_state["messages"][-1] == {"role": "assistant", "content": "Markets close at 4pm ET."}
+
+def test_small_model_selects_tools_and_large_model_analyzes(quote_tools, chat, monkeypatch):
+    monkeypatch.setattr(app, "ModelRouter", lambda large: ModelRouter(large, small_model="small", enabled=True))
+    quote = ScriptedCompletions([chunk(tool_calls=[tool_call(0, "AAPL")])], [chunk("AAPL is at 100.")])
+    app.process_user_input(chat(quote), "What is AAPL trading at?", quote_tools)
+    analysis = ScriptedCompletions([chunk(tool_calls=[tool_call(0, "MSFT")])], [chunk("MSFT looks fine.")])
+    app.process_user_input(chat(analysis), "Analyze MSFT for me", quote_tools)
+
+    assert [request["model"] for request in quote.requests] == ["small", "small"]
+    assert [request["model"] for request in analysis.requests] == ["test-model", "test-model"]
+    assert metrics.llm[("small", "select")].calls >= 1
+
+def test_unavailable_models_fall_back(quote_tools, chat, monkeypatch):
+    monkeypatch.setattr(app, "ModelRouter", lambda large: ModelRouter(large, small_model="small", enabled=True))
+    metrics.reset()
+    completions = ScriptedCompletions([chunk("Hello!")], unavailable={"small"})
+    app.process_user_input(chat(completions), "Hi there", quote_tools)
+
+    assert [request["model"] for request in completions.requests] == ["test-model"]
+    assert st.session_state["messages"][-1]["content"] == "Hello!"
+    assert metrics.llm[("small", "select")].failures == 1
@@ -0,0 +1,58 @@
+import json
+
+from utils.chat_history import DIGEST_PREFIX, SUMMARY_HEADER, HistoryManager, digest_tool_output, message_tokens
+
+SYSTEM = {"role": "system", "content": "You are a stock analysis assistant."}
+
+def turn(index, payload_points=400):
+    prices = json.dumps({"ticker": f"T{index}", "Close": [100.0 + point for point in range(payload_points)]})
+    return [
+        {"role": "user", "content": f"Question {index}"},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": f"call_{index}", "type": "function",
+             "function": {"name": "StockAnalyzer.get_stock_price", "arguments": json.dumps({"ticker": f"T{index}"})}}
+        ]},
+        {"tool_call_id": f"call_{index}", "role": "tool", "name": "StockAnalyzer.get_stock_price", "content": prices},
+        {"role": "assistant", "content": f"Answer {index}"},
+    ]
+
+def test_digest_keeps_scalars_and_summarizes_series():
+    content = json.dumps({"ticker": "AAPL", "Close": [1.0, 2.0, 5.0, 3.0], "note": "x" * 500})
+    digest = json.loads(digest_tool_output(content, max_tokens=100)[len(DIGEST_PREFIX):])
+
+    assert digest["ticker"] == "AAPL"
+    assert digest["Close"] == {"n": 4, "first": 1.0, "last": 3.0, "min": 1.0, "max": 5.0}
+    assert len(digest["note"]) == 80
+    assert digest_tool_output("not json " * 200, max_tokens=10).startswith(DIGEST_PREFIX + "not json")
+    assert len(digest_tool_output("not json " * 200, max_tokens=10)) == len(DIGEST_PREFIX) + 40
+
+def test_history_within_budget_is_untouched():
+    messages = [SYSTEM] + turn(0, payload_points=10)
+    assert HistoryManager(token_budget=10_000).compact(messages) is messages
+
+def test_old_tool_results_are_digested_and_recent_turns_kept():
+    messages = [SYSTEM] + turn(0) + turn(1) + turn(2)
+    compacted = HistoryManager(token_budget=2_000, keep_turns=2).compact(messages)
+
+    assert compacted[0] == SYSTEM
+    assert compacted[3]["content"].startswith(DIGEST_PREFIX)
+    assert compacted[3]["tool_call_id"] == "call_0"
+    assert compacted[5:] == messages[5:]
+
+def test_old_turns_fold_into_a_bounded_summary():
+    manager = HistoryManager(token_budget=2_000, keep_turns=2, summary_tokens=60)
+    messages = [SYSTEM]
+    sizes = []
+    for index in range(30):
+        messages = manager.compact(messages + turn(index))
+        sizes.append(sum(map(message_tokens, messages)))
+
+    assert messages[0] == SYSTEM
+    summary = messages[1]
+    assert summary["role"] == "system" and summary["content"].startswith(SUMMARY_HEADER)
+    assert "- User: Question 29" not in summary["content"]
+    assert "Tools: get_stock_price" in summary["content"] and "Answer: Answer 2" in summary["content"]
+    assert message_tokens(summary) <= 60 + 30
+    # The newest turns are verbatim and every tool message still follows its call
+    assert messages[-8:] == turn(28) + turn(29)
+    assert max(sizes) <= 2_000
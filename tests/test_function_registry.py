@@ -0,0 +1,176 @@
+import json
+import os
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from utils import function_registry
+from utils.function_registry import FunctionsRegistry
+
+SERVICE = '''
+from utils.function_metadata import function_schema
+
+class Quotes:
+    @classmethod
+    @function_schema(name="{name}", description="Returns a quote", required_params=["ticker"])
+    def {name}(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol
+        """
+        return ticker
+'''
+
+def write_service(path, name):
+    path.write_text(textwrap.dedent(SERVICE.format(name=name)))
+
+def test_only_changed_modules_are_executed_again(tmp_path):
+    write_service(tmp_path / "quotes.py", "get_quote")
+    write_service(tmp_path / "other.py", "get_other")
+    registry = FunctionsRegistry(tmp_path)
+    assert sorted(registry.get_registry_contents()) == ["Quotes.get_other", "Quotes.get_quote"]
+
+    assert registry.load_functions() == []
+
+    # A touched but unchanged file is hashed, not executed
+    stat = (tmp_path / "quotes.py").stat()
+    os.utime(tmp_path / "quotes.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert registry.load_functions() == []
+
+    write_service(tmp_path / "quotes.py", "get_last_quote")
+    os.utime(tmp_path / "quotes.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    assert registry.load_functions() == ["quotes"]
+    assert sorted(registry.get_registry_contents()) == ["Quotes.get_last_quote", "Quotes.get_other"]
+
+    (tmp_path / "other.py").unlink()
+    registry.load_functions()
+    assert registry.get_registry_contents() == ["Quotes.get_last_quote"]
+    assert [tool["function"]["name"] for tool in registry.mapped_functions()] == ["Quotes.get_last_quote"]
+
+def test_manifest_mode_imports_modules_on_first_call(tmp_path):
+    write_service(tmp_path / "quotes.py", "get_quote")
+    write_service(tmp_path / "other.py", "get_other")
+    FunctionsRegistry(tmp_path, manifest=True)
+    assert (tmp_path / "function_schemas.json").exists()
+
+    registry = FunctionsRegistry(tmp_path, manifest=True)
+    assert [tool["function"]["name"] for tool in registry.mapped_functions()] == ["Quotes.get_other", "Quotes.get_quote"]
+    assert not any(loaded.executed for loaded in registry.modules.values())
+
+    assert registry.get_function_callable()["Quotes.get_quote"]("AAPL") == "AAPL"
+    assert registry.modules[tmp_path / "quotes.py"].executed
+    assert not registry.modules[tmp_path / "other.py"].executed
+
+def test_stale_manifest_is_regenerated(tmp_path):
+    write_service(tmp_path / "quotes.py", "get_quote")
+    FunctionsRegistry(tmp_path, manifest=True)
+
+    write_service(tmp_path / "quotes.py", "get_last_quote")
+    registry = FunctionsRegistry(tmp_path, manifest=True)
+    assert registry.get_registry_contents() == ["Quotes.get_last_quote"]
+
+    fresh = FunctionsRegistry(tmp_path, manifest=True)
+    assert fresh.get_registry_contents() == ["Quotes.get_last_quote"]
+    assert not fresh.modules[tmp_path / "quotes.py"].executed
+
+def test_manifest_of_another_schema_derivation_is_regenerated(tmp_path, monkeypatch):
+    write_service(tmp_path / "quotes.py", "get_quote")
+    FunctionsRegistry(tmp_path, manifest=True)
+
+    # function_metadata.py changed how schemas are derived, the service modules did not
+    monkeypatch.setattr(function_registry, "SCHEMA_DIGEST", "another version")
+    registry = FunctionsRegistry(tmp_path, manifest=True)
+    assert registry.modules[tmp_path / "quotes.py"].executed
+    assert json.loads((tmp_path / "function_schemas.json").read_text())["schema_digest"] == "another version"
+
+    fresh = FunctionsRegistry(tmp_path, manifest=True)
+    assert not fresh.modules[tmp_path / "quotes.py"].executed
+
+SLOW_SERVICE = '''
+import time
+from utils.function_metadata import function_schema
+
+class Slow:
+    @classmethod
+    @function_schema(name="fetch", description="Sleeps, then echoes the ticker", required_params=["ticker", "seconds"])
+    def fetch(cls, ticker: str, seconds: float):
+        """
+        :param ticker: The stock ticker symbol
+        :param seconds: How long the fetch takes
+        """
+        time.sleep(seconds)
+        return ticker
+'''
+
+def tool_call(call_id, arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name="Slow.fetch", arguments=arguments))
+
+def test_tool_calls_run_concurrently_in_call_order(tmp_path):
+    (tmp_path / "slow.py").write_text(textwrap.dedent(SLOW_SERVICE))
+    registry = FunctionsRegistry(tmp_path)
+    calls = [tool_call(f"call_{ticker}", json.dumps({"ticker": ticker, "seconds": delay}))
+             for ticker, delay in [("AAPL", 0.3), ("MSFT", 0.1), ("NVDA", 0.2)]]
+
+    batch = registry.execute_tool_calls(calls, executor=ThreadPoolExecutor(max_workers=3))
+    assert [(result.tool_call_id, result.content) for result in batch.results] == [
+        ("call_AAPL", "AAPL"), ("call_MSFT", "MSFT"), ("call_NVDA", "NVDA")
+    ]
+    assert batch.tool_seconds >= 0.6
+    assert batch.wall_seconds < 0.5
+
+def test_failed_and_timed_out_calls_still_get_a_result(tmp_path):
+    (tmp_path / "slow.py").write_text(textwrap.dedent(SLOW_SERVICE))
+    registry = FunctionsRegistry(tmp_path)
+    calls = [tool_call("slow", json.dumps({"ticker": "AAPL", "seconds": 1})), tool_call("broken", "{not json")]
+
+    batch = registry.execute_tool_calls(calls, timeout=0.1, executor=ThreadPoolExecutor(max_workers=2))
+    assert [result.tool_call_id for result in batch.results] == ["slow", "broken"]
+    assert "timed out" in batch.results[0].error
+    assert "Invalid JSON" in batch.results[1].error
+
+CACHED_SERVICE = '''
+from utils.function_metadata import function_schema
+
+CALLS = []
+
+class Indicators:
+    @classmethod
+    @function_schema(name="rsi", description="Returns the RSI", required_params=["ticker"], cache_ttl=60, max_entries=2)
+    def rsi(cls, ticker: str, window: int = 14):
+        """
+        :param ticker: The stock ticker symbol
+        :param window: The RSI window
+        """
+        CALLS.append(ticker)
+        return f"{ticker}:{window}:{len(CALLS)}"
+'''
+
+def test_results_are_memoized_per_tool_and_arguments(tmp_path):
+    (tmp_path / "cached.py").write_text(textwrap.dedent(CACHED_SERVICE))
+    registry = FunctionsRegistry(tmp_path)
+    now = [0.0]
+    registry.result_cache.clock = lambda: now[0]
+
+    first = registry.call("Indicators.rsi", {"ticker": "AAPL"})
+    # Defaults are bound before keying, so spelling them out hits the same entry
+    assert registry.call("Indicators.rsi", {"ticker": "AAPL", "window": 14}) == first
+    assert registry.resolve_function("Indicators.rsi", '{"window": 14, "ticker": "AAPL"}') == first
+    assert registry.call("Indicators.rsi", {"ticker": "MSFT"}) != first
+    assert registry.cache_stats()["Indicators.rsi"] == {"hits": 2, "misses": 2, "hit_rate": 0.5, "entries": 2}
+
+    now[0] = 61.0
+    assert registry.call("Indicators.rsi", {"ticker": "AAPL"}) != first
+
+    registry.call("Indicators.rsi", {"ticker": "NVDA"})
+    registry.call("Indicators.rsi", {"ticker": "TSLA"})
+    assert registry.cache_stats()["Indicators.rsi"]["entries"] == 2
+
+def test_reloading_a_module_drops_its_cached_results(tmp_path):
+    (tmp_path / "cached.py").write_text(textwrap.dedent(CACHED_SERVICE))
+    registry = FunctionsRegistry(tmp_path)
+    registry.call("Indicators.rsi", {"ticker": "AAPL"})
+
+    (tmp_path / "cached.py").write_text(textwrap.dedent(CACHED_SERVICE) + "\n# changed\n")
+    stat = (tmp_path / "cached.py").stat()
+    os.utime(tmp_path / "cached.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    registry.load_functions()
+    assert registry.cache_stats()["Indicators.rsi"]["entries"] == 0
@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database.indicator_store import IndicatorStore
+from database.price_store import PriceStore
+from utils import indicators
+
+@pytest.fixture
+def universe(make_history):
+    bars = {f"T{seed}": make_history(600, seed=seed) for seed in range(5)}
+    store = PriceStore(":memory:", refresh_seconds=3600, downloader=lambda *args: None)
+    for symbol, frame in bars.items():
+        store.write(symbol, frame.iloc[:-5])
+    return store, bars
+
+def test_sql_indicators_match_the_kernels(universe):
+    store, bars = universe
+    table = IndicatorStore(store)
+    table.refresh()
+    latest = table.screen().loc["T1"]
+
+    close = bars["T1"].Close.iloc[:-5]
+    assert latest.sma_200 == pytest.approx(indicators.sma(close, 200)[-1], rel=1e-9)
+    assert latest.ema_20 == pytest.approx(indicators.ema(close, 20)[-1], rel=1e-3)
+    assert latest.ema_50 == pytest.approx(indicators.ema(close, 50)[-1], rel=1e-3)
+    assert latest.rsi_14 == pytest.approx(indicators.rsi(close)[-1], abs=0.1)
+    log_returns = np.log(close).diff()
+    assert latest.volatility_20 == pytest.approx(log_returns.rolling(20).std().iloc[-1] * np.sqrt(252), rel=1e-9)
+    assert latest.drawdown == pytest.approx(close.iloc[-1] / close.max() - 1, rel=1e-9)
+
+def test_incremental_refresh_only_writes_new_dates(universe):
+    store, bars = universe
+    table = IndicatorStore(store)
+    table.refresh()
+    for symbol, frame in bars.items():
+        store.write(symbol, frame)
+
+    # The last materialized bar is recomputed along with the 5 new ones
+    assert table.refresh() == 6 * len(bars)
+    incremental = table.screen()
+
+    rebuilt = IndicatorStore(PriceStore(":memory:", downloader=lambda *args: None))
+    for symbol, frame in bars.items():
+        rebuilt.store.write(symbol, frame)
+    rebuilt.refresh()
+    pd.testing.assert_frame_equal(incremental, rebuilt.screen(), rtol=1e-9)
+
+def test_incremental_refresh_looks_back_over_trading_halts(make_history):
+    # A quarter without trading leaves fewer than 200 bars in the year before the last refresh
+    frame = make_history(600, seed=9)
+    frame = pd.concat([frame.iloc[:400], frame.iloc[465:]])
+    store = PriceStore(":memory:", downloader=lambda *args: None)
+    store.write("HALT", frame.iloc[:-5])
+    table = IndicatorStore(store)
+    table.refresh()
+    store.write("HALT", frame)
+    table.refresh()
+
+    latest = table.screen().loc["HALT"]
+    assert latest.sma_200 == pytest.approx(indicators.sma(frame.Close, 200)[-1], rel=1e-9)
+    assert latest.ema_50 == pytest.approx(indicators.ema(frame.Close, 50)[-1], rel=1e-3)
+
+def test_refresh_rebuilds_symbols_whose_history_was_readjusted(universe):
+    store, bars = universe
+    table = IndicatorStore(store)
+    table.refresh()
+
+    # A 4:1 split rescales the stored history of T1 (see PriceStore.rebuild)
+    split = bars["T1"] / 4
+    store.write("T1", split)
+    table.refresh()
+
+    latest = table.screen().loc["T1"]
+    assert latest.sma_200 == pytest.approx(indicators.sma(split.Close, 200)[-1], rel=1e-9)
+    assert latest.drawdown == pytest.approx(split.Close.iloc[-1] / split.Close.max() - 1, rel=1e-9)
+
+def test_screen_filters_on_the_latest_value(universe):
+    store, _ = universe
+    table = IndicatorStore(store)
+    table.refresh()
+    latest = table.screen()
+    threshold = latest.rsi_14.median()
+
+    oversold = table.screen("rsi_14", "<", threshold)
+    assert list(oversold.index) == list(latest[latest.rsi_14 < threshold].sort_values("rsi_14").index)
+    assert list(table.screen("rsi_14", ">=", 0, symbols=["t2"]).index) == ["T2"]
+    with pytest.raises(ValueError):
+        table.screen("close; DROP TABLE stock_prices", "<", 1)
+
+def test_screen_stocks_tool_reports_matches(universe, monkeypatch):
+    from src.services import stock_screener
+
+    store, _ = universe
+    table = IndicatorStore(store)
+    monkeypatch.setattr(stock_screener, "get_indicator_store", lambda: table)
+
+    result = json.loads(stock_screener.StockScreener.screen_stocks("drawdown", "<=", 0))
+    assert result["screened"] == 5
+    assert sorted(result["matches"]) == ["T0", "T1", "T2", "T3", "T4"]
+    assert "error" in json.loads(stock_screener.StockScreener.screen_stocks("pe_ratio", "<", 10))
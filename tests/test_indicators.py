@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ta.momentum import RSIIndicator, StochasticOscillator
+from ta.trend import MACD
+from ta.volatility import AverageTrueRange, BollingerBands
+from ta.volume import volume_weighted_average_price
+
+from utils import indicators
+
+@pytest.fixture(scope="module")
+def bars() -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    size = 2000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, size)))
+    spread = close * rng.uniform(0, 0.02, size)
+    return pd.DataFrame({
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(10_000, 1_000_000, size).astype(float),
+    })
+
+def assert_matches(actual, expected, skip: int = 0):
+    expected = np.asarray(expected, dtype=float)
+    mask = np.isfinite(expected)
+    mask[:skip] = False
+    np.testing.assert_allclose(actual[mask], expected[mask], rtol=1e-8, atol=1e-8)
+
+def test_moving_averages_match_pandas(bars):
+    assert_matches(indicators.sma(bars.Close, 20), bars.Close.rolling(20).mean())
+    assert_matches(indicators.ema(bars.Close, 20), bars.Close.ewm(span=20, adjust=False).mean())
+    assert np.isnan(indicators.sma(bars.Close, 20)[:19]).all()
+
+def test_oscillators_match_ta(bars):
+    # ta seeds the Wilder averages one bar earlier; the difference decays geometrically
+    assert_matches(indicators.rsi(bars.Close), RSIIndicator(bars.Close).rsi(), skip=300)
+    line, signal, histogram = indicators.macd(bars.Close)
+    reference = MACD(bars.Close)
+    assert_matches(line, reference.macd())
+    assert_matches(histogram, reference.macd_diff(), skip=300)
+    k, d = indicators.stochastic(bars.High, bars.Low, bars.Close)
+    stoch = StochasticOscillator(bars.High, bars.Low, bars.Close)
+    assert_matches(k, stoch.stoch())
+    assert_matches(d, stoch.stoch_signal())
+
+def test_volume_and_volatility_match_ta(bars):
+    assert_matches(indicators.vwap(bars.High, bars.Low, bars.Close, bars.Volume),
+                   volume_weighted_average_price(bars.High, bars.Low, bars.Close, bars.Volume))
+    assert_matches(indicators.atr(bars.High, bars.Low, bars.Close), AverageTrueRange(bars.High, bars.Low, bars.Close).average_true_range(), skip=13)
+    middle, upper, lower = indicators.bollinger_bands(bars.Close)
+    reference = BollingerBands(bars.Close)
+    assert_matches(middle, reference.bollinger_mavg())
+    assert_matches(upper, reference.bollinger_hband())
+    assert_matches(lower, reference.bollinger_lband())
+
+def test_panel_columns_skip_their_own_leading_gap(bars):
+    panel = pd.DataFrame({"early": bars.Close, "late": bars.Close * 2})
+    panel.iloc[:100, 1] = np.nan
+
+    expected_ema = panel.ewm(span=20, adjust=False, ignore_na=True).mean()
+    np.testing.assert_allclose(indicators.ema(panel, 20), expected_ema, rtol=1e-10)
+    np.testing.assert_allclose(indicators.sma(panel, 20), panel.rolling(20).mean(), rtol=1e-10)
+    assert np.isnan(indicators.rsi(panel)[:101, 1]).all()
+    assert indicators.rsi(panel)[-1, 0] == pytest.approx(indicators.rsi(bars.Close)[-1])
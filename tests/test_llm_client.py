@@ -0,0 +1,89 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import llm_client
+from utils.llm_client import get_async_client, get_client
+
+COMPLETION = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "test-model",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "Hi"}}],
+}
+
+@pytest.fixture
+def server():
+    """A minimal chat completions endpoint recording the client port of every request."""
+    ports = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            ports.append(self.client_address[1])
+            body = json.dumps(COMPLETION).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1", ports
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_clients_are_shared_per_server():
+    client = get_client("http://localhost:1/v1", "key")
+
+    assert get_client("http://localhost:1/v1", "key") is client
+    assert get_client("http://localhost:2/v1", "key") is not client
+
+def test_client_uses_the_configured_pool_and_timeouts():
+    client = get_client("http://localhost:1/v1", "key")
+    pool = client._client._transport._pool
+
+    assert client.timeout.connect == llm_client.LLM_CONNECT_TIMEOUT_SECONDS
+    assert client.timeout.read == llm_client.LLM_READ_TIMEOUT_SECONDS
+    assert pool._max_connections == llm_client.LLM_MAX_CONNECTIONS
+    assert pool._keepalive_expiry == llm_client.LLM_KEEPALIVE_SECONDS
+
+def test_http2_needs_the_h2_package(monkeypatch):
+    monkeypatch.setattr(llm_client.importlib.util, "find_spec", lambda name: None)
+    assert not llm_client.http2_available()
+
+    monkeypatch.setattr(llm_client.importlib.util, "find_spec", lambda name: object())
+    assert llm_client.http2_available()
+
+def test_requests_reuse_the_connection(server):
+    url, ports = server
+    client = get_client(url, "key")
+
+    for _ in range(3):
+        assert client.chat.completions.create(model="test-model", messages=[]).choices[0].message.content == "Hi"
+
+    assert len(ports) == 3
+    assert len(set(ports)) == 1
+
+def test_async_clients_are_shared_within_an_event_loop(server):
+    url, ports = server
+
+    async def ask():
+        client = get_async_client(url, "key")
+        assert get_async_client(url, "key") is client
+        completions = await asyncio.gather(*(client.chat.completions.create(model="test-model", messages=[]) for _ in range(4)))
+        return client, [completion.choices[0].message.content for completion in completions]
+
+    first, answers = asyncio.run(ask())
+    second, _ = asyncio.run(ask())
+
+    assert answers == ["Hi"] * 4
+    assert first is not second
+    assert len(ports) == 8
@@ -0,0 +1,69 @@
+import pytest
+
+from utils.metrics import LatencyHistogram, Metrics, metrics
+from utils.tool_validation import ToolArgumentError
+
+def test_percentiles_use_nearest_rank():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for millis in range(1, 101):
+        histogram.observe(millis / 1000)
+
+    assert histogram.percentile(50) == 0.05
+    assert histogram.percentile(95) == 0.095
+    assert histogram.percentile(99) == 0.099
+    assert histogram.count == 100
+
+def test_prometheus_text_has_cumulative_buckets():
+    registry = Metrics()
+    registry.record_tool("Quotes.get_quote", 0.02, result="x" * 40)
+    registry.record_tool("Quotes.get_quote", 3.0, error=True)
+    registry.record_llm("qwen2.5:14b", "follow_up", 0.4, 2.0)
+
+    text = registry.to_prometheus()
+    tool = 'tool="Quotes.get_quote"'
+    assert f"financial_assistant_tool_calls_total{{{tool}}} 2" in text
+    assert f"financial_assistant_tool_errors_total{{{tool}}} 1" in text
+    assert f"financial_assistant_tool_result_bytes_total{{{tool}}} 40" in text
+    assert f"financial_assistant_tool_result_tokens_total{{{tool}}} 10" in text
+    assert f'financial_assistant_tool_latency_seconds_bucket{{{tool},le="0.025"}} 1' in text
+    assert f'financial_assistant_tool_latency_seconds_bucket{{{tool},le="+Inf"}} 2' in text
+    assert 'financial_assistant_llm_time_to_first_token_seconds_count{model="qwen2.5:14b",stage="follow_up"} 1' in text
+
+def test_prometheus_families_are_contiguous():
+    registry = Metrics()
+    for tool in ("Quotes.get_quote", "Charts.plot"):
+        registry.record_tool(tool, 0.02, result="x")
+    for model in ("mistral:7b", "qwen2.5:14b"):
+        registry.record_llm(model, "select", 0.1, 0.5)
+        registry.record_llm_failure(model, "answer")
+    registry.record_response_cache("exact", 2.0)
+    registry.record_response_cache("miss", 0.0)
+
+    families, current = [], None
+    for line in registry.to_prometheus().splitlines():
+        if line.startswith("# TYPE "):
+            current = line.split()[2]
+            assert current not in families
+            families.append(current)
+            continue
+        if line.startswith("#"):
+            continue
+        # Each sample follows the TYPE line of its family (histograms add _bucket, _sum and _count)
+        name = line.split("{")[0].split()[0]
+        assert name == current or name in (f"{current}_bucket", f"{current}_sum", f"{current}_count")
+    assert len(families) == 10
+
+def test_registry_records_each_call(quote_tools):
+    metrics.reset()
+
+    quote_tools.call("Quotes.get_quote", {"ticker": "AAPL"})
+    with pytest.raises(RuntimeError):
+        quote_tools.call("Quotes.get_quote", {"ticker": "FAIL"})
+    with pytest.raises(ToolArgumentError):
+        quote_tools.call("Quotes.get_quote", {})
+
+    [row] = metrics.snapshot()["tools"]
+    assert (row["tool"], row["calls"], row["errors"]) == ("Quotes.get_quote", 3, 2)
+    assert row["p50_ms"] is not None
+    assert metrics.tools["Quotes.get_quote"].result_bytes == len("AAPL: 100")
@@ -0,0 +1,136 @@
+import json
+import time
+
+import pytest
+import streamlit as st
+
+import app
+from utils.function_registry import FunctionsRegistry
+from utils.llm_client import get_client
+from utils.mock_llm_server import DEFAULT_SCRIPT, Latency, MockLLMServer, MockResponse, Rule, load_script, recording_key
+
+QUOTE_TOOL = {"type": "function", "function": {"name": "Quotes.get_quote", "parameters": {"type": "object"}}}
+
+RULES = [
+    Rule(MockResponse(tool_calls=[{"name": "Quotes.get_quote", "arguments": {"ticker": "{ticker}"}}]),
+         match=r"price of (?P<ticker>[A-Z]+)"),
+    Rule(MockResponse("{ticker} is trading at 100 dollars."), match=r"price of (?P<ticker>[A-Z]+)", after_tool=True),
+]
+
+@pytest.fixture
+def server():
+    with MockLLMServer(RULES, latency=Latency(0.05, 200)) as server:
+        yield server
+
+def test_streams_tool_calls_in_pieces(server):
+    client = get_client(server.base_url, "key")
+    stream = client.chat.completions.create(model="test-model", messages=[{"role": "user", "content": "price of NVDA"}],
+                                            tools=[QUOTE_TOOL], stream=True)
+    pieces = [chunk.choices[0].delta.tool_calls[0] for chunk in stream if chunk.choices and chunk.choices[0].delta.tool_calls]
+
+    assert pieces[0].id and pieces[0].function.name == "Quotes.get_quote"
+    assert len(pieces) > 2
+    assert json.loads("".join(piece.function.arguments for piece in pieces)) == {"ticker": "NVDA"}
+    assert server.requests[0]["source"] == "rule"
+
+def test_answers_follow_ups_at_the_simulated_speed(server):
+    client = get_client(server.base_url, "key")
+    messages = [{"role": "user", "content": "What is the price of AAPL?"},
+                {"role": "tool", "tool_call_id": "call_0", "name": "Quotes.get_quote", "content": "AAPL: 100"}]
+    started = time.perf_counter()
+    completion = client.chat.completions.create(model="test-model", messages=messages)
+
+    assert completion.choices[0].message.content == "AAPL is trading at 100 dollars."
+    request = server.requests[0]
+    assert request["model_seconds"] == pytest.approx(Latency(0.05, 200).seconds(request["completion_tokens"]))
+    assert time.perf_counter() - started >= request["model_seconds"]
+
+def test_tool_calls_are_only_made_when_tools_are_offered(server):
+    client = get_client(server.base_url, "key")
+    completion = client.chat.completions.create(model="test-model", messages=[{"role": "user", "content": "price of NVDA"}])
+
+    assert completion.choices[0].message.tool_calls is None
+    assert server.requests[0]["source"] == "default"
+
+def test_records_the_upstream_and_replays_offline(server, tmp_path):
+    recordings = tmp_path / "recordings.jsonl"
+    messages = [{"role": "user", "content": "price of MSFT"}]
+    with MockLLMServer(recordings=str(recordings), upstream=server.base_url, latency=Latency(0, 0)) as recorder:
+        recorded = get_client(recorder.base_url, "key").chat.completions.create(model="test-model", messages=messages, tools=[QUOTE_TOOL])
+    assert recorder.requests[0]["source"] == "upstream"
+
+    with MockLLMServer(recordings=str(recordings), latency=Latency(0, 0)) as replay:
+        client = get_client(replay.base_url, "key")
+        replayed = client.chat.completions.create(model="test-model", messages=messages, tools=[QUOTE_TOOL])
+        other_model = client.chat.completions.create(model="other-model", messages=messages)
+
+    assert replayed.choices[0].message.tool_calls == recorded.choices[0].message.tool_calls
+    assert [request["source"] for request in replay.requests] == ["recording", "default"]
+    assert other_model.choices[0].message.content == "This is a mock answer."
+
+def test_recording_keys_ignore_the_data_tools_returned():
+    history = [{"role": "user", "content": "price of MSFT"},
+               {"role": "assistant", "content": "", "tool_calls": [{"id": "a", "function": {"name": "q", "arguments": "{}"}}]}]
+    today = recording_key("m", history + [{"role": "tool", "tool_call_id": "a", "name": "q", "content": "MSFT: 100"}])
+    tomorrow = recording_key("m", history + [{"role": "tool", "tool_call_id": "a", "name": "q", "content": "MSFT: 101"}])
+
+    assert today == tomorrow
+    assert today != recording_key("n", history + [{"role": "tool", "tool_call_id": "a", "name": "q", "content": "MSFT: 100"}])
+
+def test_loads_rules_from_a_script(tmp_path):
+    script = tmp_path / "rules.json"
+    script.write_text(json.dumps([{"match": "hi", "content": "Hello", "model": "small", "first_token_seconds": 1}]))
+    rule, = load_script(str(script))
+
+    assert rule.response.content == "Hello"
+    assert rule.response.latency == Latency(1.0, Latency.tokens_per_second)
+    assert rule.matches("small", "hi there", after_tool=False) == {}
+    assert rule.matches("large", "hi there", after_tool=False) is None
+
+def test_patterns_keep_their_case():
+    rule = Rule(MockResponse(tool_calls=[{"name": "q", "arguments": {"ticker": "{ticker}"}}]), match=r"\b(?P<ticker>[A-Z]{2,5})\b")
+
+    assert rule.matches("m", "What is the price of NVDA?", after_tool=False) == {"ticker": "NVDA"}
+    assert Rule(MockResponse(), match="(?i:price) of").matches("m", "PRICE of NVDA", after_tool=False) == {}
+
+@pytest.mark.parametrize("question, name, arguments", [
+    ("What is the price of NVDA?", "StockAnalyzer.get_stock_price", {"ticker": "NVDA"}),
+    ("what's the 200 day SMA for AAPL", "StockAnalyzer.calculate_SMA", {"ticker": "AAPL", "window": 200}),
+    ("MSFT ema", "StockAnalyzer.calculate_EMA", {"ticker": "MSFT", "window": 20}),
+    ("Is TSLA overbought?", "StockAnalyzer.calculate_RSI", {"ticker": "TSLA"}),
+    ("Show me the MACD of AMD", "StockAnalyzer.calculate_MACD", {"ticker": "AMD"}),
+    ("Plot META for me", "StockAnalyzer.plot_stock_price", {"ticker": "META"}),
+])
+def test_default_script_calls_the_registered_tools(question, name, arguments):
+    tools = FunctionsRegistry()
+    with MockLLMServer(load_script(str(DEFAULT_SCRIPT))) as server:
+        body = {"model": "m", "messages": [{"role": "user", "content": question}], "tools": tools.mapped_functions()}
+        response, source = server.respond(body)
+        call, = response.tool_call_payloads()
+        follow_up, _ = server.respond({**body, "messages": body["messages"] + [{"role": "tool", "content": "1"}]})
+
+    assert (source, call["function"]["name"]) == ("rule", name)
+    assert json.loads(call["function"]["arguments"]) == arguments
+    assert tools.validate_arguments(name, arguments) == arguments
+    assert follow_up.content and not follow_up.tool_calls
+
+def test_drives_the_chat_pipeline_end_to_end(server, quote_tools, monkeypatch):
+    st.session_state["messages"] = []
+    st.session_state["display_messages"] = []
+    st.session_state["llm_model"] = "test-model"
+    app.response_cache.clear()
+    monkeypatch.setattr(app, "PREFETCH_MAX_TICKERS", 0)
+    client = get_client(server.base_url, "key")
+    monkeypatch.setattr(app, "client", client, raising=False)
+
+    started = time.perf_counter()
+    app.process_user_input(client, "What is the price of NVDA?", quote_tools)
+    elapsed = time.perf_counter() - started
+
+    assert [message["role"] for message in st.session_state["messages"]] == ["user", "assistant", "tool", "assistant"]
+    assert st.session_state["messages"][2]["content"] == "NVDA: 100"
+    assert st.session_state["messages"][-1]["content"] == "NVDA is trading at 100 dollars."
+    assert [(request["tools"], request["source"]) for request in server.requests] == [
+        (["Quotes.get_quote"], "rule"), (["Quotes.get_quote"], "rule")
+    ]
+    assert elapsed >= server.model_seconds()
@@ -0,0 +1,25 @@
+from utils.model_router import ANSWER, SELECT, ModelRouter
+
+def router(**options):
+    return ModelRouter("qwen2.5:14b", small_model="mistral:7b", enabled=True,
+                       analysis_keywords=["analy", "compar", "why"], large_result_tokens=100, **options)
+
+def test_small_model_selects_tools_and_writes_short_answers():
+    route = router().for_selection("What is AAPL trading at?")
+    assert (route.stage, route.models) == (SELECT, ["mistral:7b", "qwen2.5:14b"])
+
+    route = router().for_answer("What is AAPL trading at?", ["189.25"])
+    assert (route.stage, route.model) == (ANSWER, "mistral:7b")
+
+def test_large_model_writes_analysis_and_digests_large_results():
+    assert router().for_selection("Can you analyze NVDA?").model == "qwen2.5:14b"
+    assert router().for_answer("Compare AAPL and MSFT", ["1", "2"]).model == "qwen2.5:14b"
+    route = router().for_answer("What are the indicators of AAPL?", ["x" * 800])
+    assert (route.model, route.fallback, route.reason) == ("qwen2.5:14b", "mistral:7b", "200 tokens of tool results")
+
+def test_disabled_routing_uses_the_selected_model():
+    for route in [
+        ModelRouter("qwen2.5:14b", small_model="mistral:7b", enabled=False).for_selection("Hi"),
+        ModelRouter("mistral:7b", small_model="mistral:7b", enabled=True).for_answer("Analyze AAPL", []),
+    ]:
+        assert route.fallback is None and route.reason == "routing disabled"
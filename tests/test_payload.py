@@ -0,0 +1,21 @@
+import json
+
+from utils.payload import compact_price_payload, downsample_history
+
+def test_older_history_is_weekly_and_recent_history_daily(make_history):
+    history = make_history(360, seed=5, end="2025-02-14")
+    compact = downsample_history(history, row_budget=150)
+    assert len(compact) < 150
+    assert compact.index.is_monotonic_increasing
+    assert compact.iloc[-60:].equals(history.iloc[-60:])
+    assert (compact.index[:40].dayofweek == 4).all()
+    assert compact.Volume.sum() == history.Volume.sum()
+
+def test_payload_respects_token_budget_and_reports_compression(make_history):
+    payload = compact_price_payload(make_history(360, seed=5, end="2025-02-14"), row_budget=120, token_budget=400)
+
+    assert payload["compression"]["tokens"] <= 400
+    assert payload["compression"]["rows"] == len(payload["columns"]["Close"])
+    assert payload["compression"]["ratio"] > 10
+    assert payload["columns"]["Date"][-1] == "2025-02-14"
+    assert len(json.dumps(payload["columns"])) <= 400 * 4
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from utils.price_cache import PriceHistoryCache
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_repeated_lookups_download_once(make_history):
+    calls = []
+
+    def loader(ticker, period, interval):
+        calls.append((ticker, period, interval))
+        return make_history()
+
+    cache = PriceHistoryCache(ttl=60, max_bytes=10**8, loader=loader)
+    first = cache.get("aapl")
+    second = cache.get("AAPL")
+
+    assert first is second
+    assert calls == [("AAPL", "1y", "1d")]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_entries_expire_after_ttl(make_history):
+    clock = FakeClock()
+    calls = []
+
+    def loader(ticker, period, interval):
+        calls.append(ticker)
+        return make_history()
+
+    cache = PriceHistoryCache(ttl=10, max_bytes=10**8, loader=loader, clock=clock)
+    cache.get("MSFT")
+    clock.now = 11
+    cache.get("MSFT")
+
+    assert calls == ["MSFT", "MSFT"]
+
+def test_least_recently_used_entry_is_evicted_over_memory_cap(make_history):
+    frame_size = int(make_history().memory_usage(index=True, deep=True).sum())
+    cache = PriceHistoryCache(ttl=60, max_bytes=frame_size * 2, loader=lambda *_: make_history())
+
+    cache.get("A")
+    cache.get("B")
+    cache.get("A")  # refresh A so B becomes the eviction candidate
+    cache.get("C")
+
+    assert cache.peek("A") is not None
+    assert cache.peek("B") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_empty_downloads_are_not_cached():
+    calls = []
+
+    def loader(ticker, period, interval):
+        calls.append(ticker)
+        return pd.DataFrame()
+
+    cache = PriceHistoryCache(ttl=60, max_bytes=10**8, loader=loader)
+    cache.get("NOPE")
+    cache.get("NOPE")
+
+    assert len(calls) == 2
+
+def test_concurrent_misses_share_one_download(make_history):
+    calls = []
+    release = threading.Event()
+
+    def loader(ticker, period, interval):
+        calls.append(ticker)
+        release.wait(5)
+        return make_history()
+
+    cache = PriceHistoryCache(ttl=60, max_bytes=10**8, loader=loader)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert cache.prefetch(["aapl", "AAPL"], pool) == ["AAPL"]
+        while not calls:
+            time.sleep(0.01)
+        waiting = pool.submit(cache.get, "AAPL")
+        time.sleep(0.05)
+        release.set()
+        frame = waiting.result(5)
+
+    assert calls == ["AAPL"]
+    assert frame is cache.get("AAPL")
+    assert cache.prefetch(["AAPL"], pool) == []
@@ -0,0 +1,110 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from database.price_store import PriceStore, covers_range
+
+FULL_HISTORY = pd.DataFrame(
+    {
+        "Open": np.arange(400, dtype=float),
+        "High": np.arange(400, dtype=float) + 1,
+        "Low": np.arange(400, dtype=float) - 1,
+        "Close": np.arange(400, dtype=float),
+        "Volume": np.full(400, 1000),
+    },
+    index=pd.bdate_range(end=dt.date.today(), periods=400, tz="America/New_York"),
+)
+
+class FakeSource:
+    def __init__(self, history: pd.DataFrame) -> None:
+        self.history = history
+        self.requests = []
+
+    def __call__(self, symbol, start, end):
+        self.requests.append((symbol, start, end))
+        index = self.history.index.tz_localize(None)
+        mask = index >= pd.Timestamp(start)
+        if end is not None:
+            mask &= index < pd.Timestamp(end)
+        return self.history[mask]
+
+def test_repeat_requests_are_served_from_the_store():
+    source = FakeSource(FULL_HISTORY)
+    store = PriceStore(":memory:", refresh_seconds=3600, downloader=source)
+    start = dt.datetime.now() - dt.timedelta(days=200)
+
+    first = store.history("aapl", start)
+    second = store.history("AAPL", start)
+
+    assert len(source.requests) == 1
+    assert first.equals(second)
+    assert list(first.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert first.Close.iloc[-1] == 399
+
+def test_top_up_fetches_only_missing_bars_and_backfills_earlier_starts():
+    source = FakeSource(FULL_HISTORY.iloc[:-5])
+    store = PriceStore(":memory:", refresh_seconds=0, downloader=source)
+    start = dt.datetime.now() - dt.timedelta(days=100)
+    store.history("MSFT", start)
+
+    source.history = FULL_HISTORY
+    refreshed = store.history("MSFT", start)
+    _, top_up_start, top_up_end = source.requests[-1]
+    # From the last complete stored bar, to check the history was not re-adjusted since
+    assert top_up_start == FULL_HISTORY.index[-7].tz_localize(None)
+    assert top_up_end is None
+    assert refreshed.Close.iloc[-1] == 399
+
+    earlier = dt.datetime.now() - dt.timedelta(days=300)
+    backfilled = store.history("MSFT", earlier)
+    assert (earlier, start) in [(request[1], request[2]) for request in source.requests]
+    assert len(backfilled) == len(FULL_HISTORY[FULL_HISTORY.index.tz_localize(None) >= earlier])
+
+def test_top_up_rebuilds_the_history_when_the_source_readjusts_it():
+    source = FakeSource(FULL_HISTORY.iloc[:-5])
+    store = PriceStore(":memory:", refresh_seconds=0, downloader=source)
+    start = dt.datetime.now() - dt.timedelta(days=200)
+    store.history("NVDA", start)
+
+    # A 4:1 split: the source rescales every bar it serves, the ones already stored included
+    split = FULL_HISTORY.copy()
+    split[["Open", "High", "Low", "Close"]] /= 4
+    source.history = split
+    refreshed = store.history("NVDA", start)
+
+    expected = split[split.index.tz_localize(None) >= start]
+    assert np.allclose(refreshed.Close.to_numpy(), expected.Close.to_numpy())
+    assert refreshed.Close.iloc[-1] == 399 / 4
+
+    # Unchanged history is topped up without a rebuild
+    requests = len(source.requests)
+    store.history("NVDA", start)
+    assert len(source.requests) == requests + 1
+
+def test_covers_range_rejects_holes_between_stored_ranges():
+    bars = FULL_HISTORY.iloc[-300:]
+    start, end = bars.index[0].tz_localize(None), bars.index[-1].tz_localize(None)
+
+    assert covers_range(bars, start, end)
+    assert covers_range(bars, start - dt.timedelta(days=3), end + dt.timedelta(days=3))
+    assert not covers_range(bars, start - dt.timedelta(days=30), end)
+    # Two separate ranges: both ends are covered, the months between are not
+    assert not covers_range(pd.concat([bars.iloc[:50], bars.iloc[-50:]]), start, end)
+    assert not covers_range(bars.iloc[:0], start, end)
+
+def test_bars_of_another_source_are_dropped_when_the_store_opens(tmp_path):
+    path = str(tmp_path / "prices.duckdb")
+    start = dt.datetime.now() - dt.timedelta(days=100)
+    store = PriceStore(path=path, downloader=FakeSource(FULL_HISTORY))
+    store.history("AAPL", start)
+    store.history("MSFT", start)
+    with store.connection() as conn:
+        conn.execute("UPDATE stock_prices SET source = 'financialdatasets' WHERE symbol = 'MSFT'")
+    store.close()
+
+    reopened = PriceStore(path=path, downloader=FakeSource(FULL_HISTORY))
+    assert not reopened.read("AAPL").empty
+    assert reopened.read("MSFT").empty
+    assert reopened.coverage("MSFT") == (None, None, None)
+    reopened.close()
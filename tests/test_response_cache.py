@@ -0,0 +1,64 @@
+from utils.response_cache import ResponseCache, is_self_contained, key_terms
+
+SYSTEM = {"role": "system", "content": "You are a stock analysis assistant."}
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def ask(question, history=()):
+    return [SYSTEM, *history, {"role": "user", "content": question}]
+
+def test_exact_layer_ignores_case_and_spacing():
+    cache = ResponseCache()
+    cache.put("qwen", ask("What's NVDA trading at?"), "NVDA is at 120.", ttl=60, seconds=3.0)
+
+    layer, entry = cache.get("qwen", ask("what's  nvda trading at"))
+    assert (layer, entry.answer, entry.seconds) == ("exact", "NVDA is at 120.", 3.0)
+    assert cache.get("mistral", ask("What's NVDA trading at?")) == (None, None)
+
+def test_semantic_layer_needs_the_same_key_terms():
+    cache = ResponseCache()
+    cache.put("qwen", ask("What's NVDA trading at?"), "NVDA is at 120.", ttl=60, seconds=3.0)
+    cache.put("qwen", ask("What is the 50 day SMA of NVDA?"), "The SMA is 110.", ttl=60, seconds=3.0)
+
+    assert key_terms("Current NVDA stock price?") == key_terms("What's NVDA trading at?")
+    assert cache.get("qwen", ask("Current NVDA stock price?"))[0] == "semantic"
+    assert cache.get("qwen", ask("What is the price of NVDA right now"))[1].answer == "NVDA is at 120."
+    assert cache.get("qwen", ask("What's AMD trading at?")) == (None, None)
+    assert cache.get("qwen", ask("what's the 200-day SMA for NVDA")) == (None, None)
+    assert cache.get("qwen", ask("what's the 50-day SMA for NVDA"))[1].answer == "The SMA is 110."
+
+def test_self_contained_questions_match_after_any_history():
+    cache = ResponseCache()
+    earlier = [{"role": "user", "content": "Tell me about AMD"}, {"role": "assistant", "content": "AMD makes chips."}]
+    cache.put("qwen", ask("What's NVDA trading at?"), "NVDA is at 120.", ttl=60, seconds=3.0)
+
+    assert cache.get("qwen", ask("Current NVDA price", history=earlier))[1].answer == "NVDA is at 120."
+    cache.put("qwen", ask("What is the RSI of MSFT?", history=earlier), "The RSI is 55.", ttl=60, seconds=3.0)
+    assert cache.get("qwen", ask("MSFT RSI"))[1].answer == "The RSI is 55."
+
+def test_follow_up_questions_only_match_after_the_same_history():
+    cache = ResponseCache()
+    nvda = [{"role": "user", "content": "What's NVDA trading at?"}, {"role": "assistant", "content": "NVDA is at 120."}]
+    amd = [{"role": "user", "content": "What's AMD trading at?"}, {"role": "assistant", "content": "AMD is at 150."}]
+    cache.put("qwen", ask("And what is its RSI?", history=nvda), "Its RSI is 70.", ttl=60, seconds=3.0)
+
+    assert not is_self_contained("And what is its RSI?")
+    assert cache.get("qwen", ask("what is its rsi", history=nvda))[0] == "semantic"
+    assert cache.get("qwen", ask("And what is its RSI?", history=amd)) == (None, None)
+
+def test_entries_expire_and_are_bounded():
+    clock = Clock()
+    cache = ResponseCache(max_entries=2, clock=clock)
+    cache.put("qwen", ask("NVDA price"), "120", ttl=60, seconds=1.0)
+    clock.now = 61
+    assert cache.get("qwen", ask("NVDA price")) == (None, None)
+
+    for ticker in ["AAPL", "MSFT", "AMD"]:
+        cache.put("qwen", ask(f"{ticker} price"), ticker, ttl=60, seconds=1.0)
+    assert cache.get("qwen", ask("AAPL price")) == (None, None)
+    assert cache.get("qwen", ask("AMD price"))[1].answer == "AMD"
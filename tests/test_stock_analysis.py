@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.services.batch_analysis import BatchStockAnalyzer
+from src.services.stock_analysis import StockAnalyzer
+from utils.chart_renderer import chart_cache, lttb
+from utils.price_cache import price_cache
+
+@pytest.fixture
+def offline_history(monkeypatch, make_history):
+    calls = []
+
+    def loader(ticker, period, interval):
+        calls.append(ticker)
+        return make_history()
+
+    price_cache.invalidate()
+    monkeypatch.setattr(price_cache, "loader", loader)
+    yield calls
+    price_cache.invalidate()
+
+def test_indicator_bundle_matches_single_indicator_tools(offline_history):
+    bundle = json.loads(StockAnalyzer.get_technical_indicators("AAPL", windows=[10, 20]))
+
+    assert bundle["price"] == pytest.approx(float(StockAnalyzer.get_stock_price("AAPL")), abs=1e-4)
+    assert bundle["SMA"]["20"] == pytest.approx(float(StockAnalyzer.calculate_SMA("AAPL", 20)), abs=1e-4)
+    assert bundle["EMA"]["10"] == pytest.approx(float(StockAnalyzer.calculate_EMA("AAPL", 10)), abs=1e-4)
+    assert bundle["RSI"] == pytest.approx(float(StockAnalyzer.calculate_RSI("AAPL")), abs=1e-4)
+    assert bundle["MACD"]["histogram"] == pytest.approx(bundle["MACD"]["macd"] - bundle["MACD"]["signal"], abs=1e-3)
+    assert offline_history == ["AAPL"]
+
+def test_indicator_bundle_schema_exposes_optional_windows():
+    schema = StockAnalyzer.get_technical_indicators.schema
+
+    assert schema["name"] == "StockAnalyzer.get_technical_indicators"
+    assert schema["parameters"]["required"] == ["ticker"]
+    assert schema["parameters"]["properties"]["windows"]["type"] == "array"
+    assert schema["parameters"]["properties"]["windows"]["items"] == {"type": "integer"}
+
+def test_batch_indicators_match_per_ticker_bundle(offline_history, make_history):
+    frame = make_history()
+    panel = pd.DataFrame({"AAPL": frame.Close, "MSFT": frame.Close * 2})
+    table = BatchStockAnalyzer.compute_indicators(panel, windows=[20])
+    bundle = json.loads(StockAnalyzer.get_technical_indicators("AAPL", windows=[20]))
+
+    assert list(table.index) == ["AAPL", "MSFT"]
+    assert table.loc["AAPL", "SMA_20"] == pytest.approx(bundle["SMA"]["20"], abs=1e-4)
+    assert table.loc["AAPL", "EMA_20"] == pytest.approx(bundle["EMA"]["20"], abs=1e-4)
+    assert table.loc["AAPL", "RSI"] == pytest.approx(bundle["RSI"], abs=1e-4)
+    assert table.loc["AAPL", "MACD"] == pytest.approx(bundle["MACD"]["macd"], abs=1e-4)
+    assert table.loc["MSFT", "RSI"] == pytest.approx(table.loc["AAPL", "RSI"])
+
+def test_plot_renders_off_thread_and_caches_png_bytes(offline_history):
+    chart_cache.clear()
+    first = StockAnalyzer.plot_stock_price("AAPL").result(timeout=60)
+    second = StockAnalyzer.plot_stock_price("AAPL")
+
+    assert first.startswith(b"\x89PNG")
+    assert second.done() and second.result() == first
+    assert chart_cache.stats()["hits"] == 1
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0
+    kept = lttb(x, y, 200)
+
+    assert len(kept) == 200
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert 4321 in kept
+    assert np.all(np.diff(kept) > 0)
+    assert np.array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
@@ -0,0 +1,73 @@
+import json
+
+import pandas as pd
+import pytest
+
+from utils.streaming_indicators import EMAState, IndicatorStateStore, MACDState, RSIState
+
+def reference_rsi(close: pd.Series) -> float:
+    delta = close.diff()
+    ema_up = delta.clip(lower=0).ewm(com=13, adjust=False).mean()
+    ema_down = (-1 * delta.clip(upper=0)).ewm(com=13, adjust=False).mean()
+    return (100 - (100 / (1 + ema_up / ema_down))).iloc[-1]
+
+def test_states_match_full_pandas_recompute(make_history):
+    close = make_history(300, seed=3).Close
+    ema, rsi, macd = EMAState(20), RSIState(14), MACDState()
+    for price in close:
+        ema.update(price)
+        rsi.update(price)
+        macd.update(price)
+
+    macd_line = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd_line.ewm(span=9, adjust=False).mean()
+
+    assert ema.value == pytest.approx(close.ewm(span=20, adjust=False).mean().iloc[-1])
+    assert rsi.value == pytest.approx(reference_rsi(close))
+    assert macd.value == pytest.approx((macd_line.iloc[-1], signal.iloc[-1], (macd_line - signal).iloc[-1]))
+
+def test_store_only_commits_new_bars_and_revises_the_forming_bar(make_history):
+    close = make_history(300, seed=3).Close
+    store = IndicatorStateStore()
+    key = ("AAPL", "EMA", 20)
+
+    store.evaluate(key, lambda: EMAState(20), close.iloc[:-5])
+    revised = close.copy()
+    revised.iloc[-1] += 3.0  # the latest bar is still forming and keeps changing
+    value = store.evaluate(key, lambda: EMAState(20), revised)
+
+    assert value == pytest.approx(revised.ewm(span=20, adjust=False).mean().iloc[-1])
+
+def test_store_round_trips_through_json(make_history):
+    close = make_history(300, seed=3).Close
+    store = IndicatorStateStore()
+    store.evaluate(("AAPL", "RSI", 14), lambda: RSIState(14), close.iloc[:-1])
+    store.evaluate(("AAPL", "MACD", 12, 26, 9), lambda: MACDState(12, 26, 9), close.iloc[:-1])
+
+    resumed = IndicatorStateStore()
+    resumed.load(json.loads(json.dumps(store.dump())))
+
+    assert resumed.evaluate(("AAPL", "RSI", 14), lambda: RSIState(14), close) == pytest.approx(reference_rsi(close))
+    assert resumed.dump() != {}
+
+def test_store_rebuilds_states_when_the_history_is_readjusted(make_history):
+    close = make_history(300, seed=3).Close
+    store = IndicatorStateStore()
+    key = ("AAPL", "EMA", 20)
+    store.evaluate(key, lambda: EMAState(20), close.iloc[:-5])
+
+    # A 4:1 split rescales every adjusted bar, the ones already committed included
+    adjusted = close / 4
+    value = store.evaluate(key, lambda: EMAState(20), adjusted)
+
+    assert value == pytest.approx(adjusted.ewm(span=20, adjust=False).mean().iloc[-1])
+
+def test_store_evicts_the_least_recently_used_states(make_history):
+    close = make_history(300, seed=3).Close
+    store = IndicatorStateStore(max_entries=2)
+    for ticker in ("AAPL", "MSFT"):
+        store.evaluate((ticker, "RSI", 14), lambda: RSIState(14), close)
+    store.evaluate(("AAPL", "RSI", 14), lambda: RSIState(14), close)
+    store.evaluate(("NVDA", "RSI", 14), lambda: RSIState(14), close)
+
+    assert sorted(store.dump()) == ["AAPL|RSI|14", "NVDA|RSI|14"]
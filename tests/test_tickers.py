@@ -0,0 +1,18 @@
+from utils.tickers import extract_tickers
+
+def test_finds_symbols_names_and_cashtags_in_mention_order():
+    assert extract_tickers("Compare nvda, AMD and Microsoft's margins") == ["NVDA", "AMD", "MSFT"]
+    assert extract_tickers("Goldman Sachs vs JPM, and how is the S&P doing?") == ["GS", "JPM", "SPY"]
+    assert extract_tickers("Is $PLTR oversold? Also $snow and BRK.B") == ["PLTR", "SNOW", "BRK-B"]
+
+def test_skips_acronyms_and_ambiguous_words():
+    assert extract_tickers("What is the RSI and the 20 day EMA?") == []
+    assert extract_tickers("what about meta, is it a good buy for me?") == []
+    assert extract_tickers("META and F, quickly") == ["META", "F"]
+
+def test_takes_unknown_symbols_only_as_cashtags():
+    assert extract_tickers("Should I BUY or HOLD NVDA? WHAT about the CEO") == ["NVDA"]
+    assert extract_tickers("Is SNOW or $SNOW cheaper?") == ["SNOW"]
+
+def test_limits_the_number_of_tickers():
+    assert extract_tickers("AAPL MSFT NVDA AMZN TSLA GOOG", limit=3) == ["AAPL", "MSFT", "NVDA"]
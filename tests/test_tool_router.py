@@ -0,0 +1,86 @@
+from utils.function_registry import FunctionsRegistry
+from utils.tool_router import ToolRouter, tokenize
+
+SERVICE = '''
+from typing import List
+
+from utils.function_metadata import function_schema
+
+class Market:
+    @classmethod
+    @function_schema(name="get_stock_price", description="Gets the latest stock price given the ticker symbol of a company.", required_params=["ticker"])
+    def get_stock_price(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol of a company (for example AAPL)
+        """
+        return "100"
+
+    @classmethod
+    @function_schema(name="plot_stock_price", description="Plot the stock price for the last year given the ticker symbol of a company.", required_params=["ticker"])
+    def plot_stock_price(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol of a company (for example AAPL)
+        """
+        return "chart"
+
+    @classmethod
+    @function_schema(name="calculate_RSI", description="Calculate the RSI for a given stock ticker", required_params=["ticker"])
+    def calculate_RSI(cls, ticker: str):
+        """
+        :param ticker: The stock ticker symbol of a company (for example AAPL)
+        """
+        return "50"
+
+    @classmethod
+    @function_schema(name="screen_stocks", description="Find the stocks whose latest indicator value passes a threshold", required_params=["indicator"])
+    def screen_stocks(cls, indicator: str, tickers: List[str] = None):
+        """
+        :param indicator: The indicator to screen on, for example rsi_14
+        :param tickers: The stock ticker symbols to screen (for example ["AAPL", "MSFT"])
+        """
+        return "{}"
+'''
+
+def registry(tmp_path):
+    (tmp_path / "market.py").write_text(SERVICE)
+    return FunctionsRegistry(tmp_path)
+
+def test_tokenize_splits_identifiers_and_folds_plurals():
+    assert tokenize("calculate_SMA of the StockAnalyzer averages") == ["calculate", "sma", "stock", "analyzer", "average"]
+
+def test_routes_messages_to_the_matching_tools(tmp_path):
+    tools = registry(tmp_path)
+
+    assert tools.route("Show me a chart of NVDA", k=2) == ["Market.plot_stock_price"]
+    assert tools.route("Is AAPL oversold?", k=2)[0] == "Market.calculate_RSI"
+    assert tools.route("Which stocks have an RSI below 30?", k=2) == ["Market.screen_stocks", "Market.calculate_RSI"]
+
+def test_messages_without_known_words_get_every_tool(tmp_path):
+    tools = registry(tmp_path)
+
+    # Tickers given as parameter examples do not count as matches
+    assert tools.route("And for MSFT?", k=2) == tools.get_registry_contents()
+    assert tools.route("What is the price of AAPL?", k=0) == tools.get_registry_contents()
+
+def test_mapped_functions_keeps_the_routed_subset(tmp_path):
+    tools = registry(tmp_path)
+
+    names = tools.route("plot and price", k=2)
+    assert [tool["function"]["name"] for tool in tools.mapped_functions(names)] == names
+
+def test_index_follows_reloaded_modules(tmp_path):
+    tools = registry(tmp_path)
+    (tmp_path / "news.py").write_text('''
+from utils.function_metadata import function_schema
+
+@function_schema(name="get_headlines", description="Get the latest news headlines about a company", required_params=["ticker"])
+def get_headlines(ticker: str):
+    """
+    :param ticker: The stock ticker symbol
+    """
+    return "[]"
+''')
+    tools.load_functions()
+
+    assert tools.route("Any news on TSLA?", k=2) == ["get_headlines"]
+    assert isinstance(tools.router, ToolRouter)
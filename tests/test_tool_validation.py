@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from utils.function_metadata import function_schema
+from utils.function_registry import FunctionsRegistry
+from utils.tool_validation import ArgumentValidator, ToolArgumentError
+
+@function_schema(name="calculate_SMA", description="Calculate the SMA", required_params=["ticker", "window"])
+def calculate_SMA(ticker: str, window: int, windows: List[int] = None, adjusted: bool = True):
+    """
+    :param ticker: The stock ticker symbol
+    :param window: The SMA window
+    :param windows: More windows
+    :param adjusted: Use adjusted prices
+    """
+
+validator = ArgumentValidator(calculate_SMA.schema)
+
+def test_lossless_slips_are_coerced():
+    assert validator({"ticker": "AAPL", "window": "20"}) == {"ticker": "AAPL", "window": 20}
+    assert validator({"ticker": "AAPL", "window": 20.0, "windows": "20, 50", "adjusted": "false"}) == {
+        "ticker": "AAPL", "window": 20, "windows": [20, 50], "adjusted": False
+    }
+    assert validator({"ticker": "AAPL", "window": 5, "windows": "[10]"})["windows"] == [10]
+    # null for an optional argument leaves the default to the function
+    assert validator({"ticker": "AAPL", "window": 5, "windows": None}) == {"ticker": "AAPL", "window": 5}
+
+def test_bad_calls_report_every_problem():
+    with pytest.raises(ToolArgumentError) as raised:
+        validator({"window": "twenty", "period": "1y"})
+    errors = {error["argument"]: error["message"] for error in raised.value.errors}
+    assert set(errors) == {"ticker", "window", "period"}
+    payload = json.loads(raised.value.to_json())
+    assert payload["error"] == "invalid_arguments"
+    assert payload["expected"]["required"] == ["ticker", "window"]
+
+def test_registry_rejects_bad_calls_before_dispatch(tmp_path):
+    (tmp_path / "quotes.py").write_text(
+        "from utils.function_metadata import function_schema\n"
+        "CALLS = []\n"
+        "@function_schema(name='get_quote', description='Returns a quote', required_params=['ticker', 'days'])\n"
+        "def get_quote(ticker: str, days: int):\n"
+        "    CALLS.append(ticker)\n"
+        "    return ticker * days\n"
+    )
+    registry = FunctionsRegistry(tmp_path)
+    calls = [
+        SimpleNamespace(id="good", function=SimpleNamespace(name="get_quote", arguments='{"ticker": "A", "days": "3"}')),
+        SimpleNamespace(id="bad", function=SimpleNamespace(name="get_quote", arguments='{"days": 3}')),
+    ]
+
+    good, bad = registry.execute_tool_calls(calls).results
+    assert good.content == "AAA"
+    assert json.loads(bad.error)["details"][0]["argument"] == "ticker"
+    assert registry.get_function_callable()["get_quote"].__wrapped__.__globals__["CALLS"] == ["A"]
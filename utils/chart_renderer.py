@@ -0,0 +1,190 @@
+import atexit
+import io
+import math
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from config.financial_analysis_config import CHART_CACHE_MAX_BYTES, CHART_FORMAT, CHART_RENDER_WORKERS, CHART_WIDTH_PX
+
+CHART_DPI = 100
+
+class ChartCache:
+    """LRU cache of rendered chart bytes, bounded by their total size."""
+
+    def __init__(self, max_bytes: int = CHART_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            image = self._entries.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: Hashable, image: bytes) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            if len(image) > self.max_bytes:
+                return
+            self._entries[key] = image
+            self._bytes += len(image)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+chart_cache = ChartCache()
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, for every bucket in between, the point forming the
+    largest triangle with the previously kept point and the average of the next bucket.
+
+    :return: The indices of the kept points, in order.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(math.floor(bucket * every)) + 1
+        stop = int(math.floor((bucket + 1) * every)) + 1
+        next_stop = min(int(math.floor((bucket + 2) * every)) + 1, n)
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[anchor] - avg_x) * (y[start:stop] - y[anchor]) - (x[anchor] - x[start:stop]) * (avg_y - y[anchor]))
+        anchor = start + int(area.argmax())
+        kept[bucket + 1] = anchor
+    return kept
+
+def downsample_series(data: pd.DataFrame, width_px: int = CHART_WIDTH_PX):
+    """Reduces the close series to at most one point per horizontal pixel, as (epoch ns, close) arrays."""
+    timestamps = data.index.asi8 if isinstance(data.index, pd.DatetimeIndex) else np.arange(len(data), dtype=np.int64)
+    close = np.ascontiguousarray(data.Close.to_numpy(dtype=np.float64))
+    kept = lttb(timestamps.astype(np.float64), close, width_px)
+    return timestamps[kept], close[kept]
+
+def _init_worker() -> None:
+    """Pins the Agg backend and pays the matplotlib import cost once per worker process."""
+    import matplotlib
+    matplotlib.use("Agg")
+    Figure(figsize=(1, 1))
+
+def _render_series(timestamps: np.ndarray, close: np.ndarray, title: str, fmt: str, width_px: int) -> bytes:
+    """Renders a close price line chart to PNG or WebP bytes. Runs inside the worker processes."""
+    figure = Figure(figsize=(width_px / CHART_DPI, width_px / CHART_DPI / 2), dpi=CHART_DPI)
+    FigureCanvasAgg(figure)
+    axes = figure.subplots()
+    axes.plot(pd.to_datetime(timestamps), close)
+    axes.set_title(title)
+    axes.set_xlabel('Date')
+    axes.set_ylabel('Stock Price ($)')
+    axes.grid(True)
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+def render_price_chart(data: pd.DataFrame, title: str, fmt: str = CHART_FORMAT, width_px: int = CHART_WIDTH_PX) -> bytes:
+    """
+    Renders a close price chart in the calling thread.
+
+    Uses a standalone Agg figure instead of pyplot, so concurrent sessions never share
+    global figure state or an output file.
+    """
+    return _render_series(*downsample_series(data, width_px), title, fmt, width_px)
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+_in_flight: Dict[Hashable, Future] = {}
+
+def get_render_pool() -> Executor:
+    """Returns the process-wide rendering pool, starting its workers on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking the multi-threaded Streamlit server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=CHART_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def submit_price_chart(ticker: str, data: pd.DataFrame, title: str, period: str = '1y',
+                       fmt: str = CHART_FORMAT, width_px: int = CHART_WIDTH_PX) -> "Future[bytes]":
+    """
+    Renders the chart on the worker pool and returns a future resolving to the image bytes.
+
+    The key is (ticker, period, last bar timestamp, format), plus the last close so a bar that
+    is still forming re-renders when it moves. A cached chart comes back as an already
+    completed future, and concurrent requests for the same chart share one render. Only the
+    LTTB-downsampled series crosses the process boundary, so render time does not grow with
+    the length of the history.
+    """
+    key = (ticker.strip().upper(), period, data.index[-1], float(data.Close.iloc[-1]), fmt, width_px)
+    image = chart_cache.get(key)
+    if image is not None:
+        done: "Future[bytes]" = Future()
+        done.set_result(image)
+        return done
+
+    series = downsample_series(data, width_px)
+    pool = get_render_pool()
+    with _pool_lock:
+        future = _in_flight.get(key)
+        if future is not None:
+            return future
+        future = pool.submit(_render_series, *series, title, fmt, width_px)
+        _in_flight[key] = future
+
+    def _store(completed: Future) -> None:
+        global _pool
+        with _pool_lock:
+            _in_flight.pop(key, None)
+            if completed.cancelled():
+                return
+            if isinstance(completed.exception(), BrokenProcessPool) and _pool is pool:
+                _pool = None  # a worker died, start a fresh pool on the next render
+        if completed.exception() is None:
+            chart_cache.put(key, completed.result())
+
+    future.add_done_callback(_store)
+    return future
+
+def cached_price_chart(ticker: str, data: pd.DataFrame, title: str, period: str = '1y', fmt: str = CHART_FORMAT) -> bytes:
+    """Blocking variant of `submit_price_chart`."""
+    return submit_price_chart(ticker, data, title, period, fmt).result()
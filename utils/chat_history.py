@@ -0,0 +1,159 @@
+import json
+import logging
+from typing import Any, Dict, List, Tuple
+
+from config.financial_analysis_config import (
+    HISTORY_DIGEST_TOKENS,
+    HISTORY_KEEP_TURNS,
+    HISTORY_SUMMARY_TOKENS,
+    HISTORY_TOKEN_BUDGET,
+)
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PREFIX = "[digest] "
+SUMMARY_HEADER = "Summary of the earlier conversation, oldest first:"
+# Role, separators and name of each message, on top of its content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def _clip(text: str, max_chars: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+def _digest_value(value: Any, depth: int = 0) -> Any:
+    """Shrinks a JSON value: number series become their range and ends, long lists and nested objects their size."""
+    if isinstance(value, dict):
+        if depth >= 2:
+            return f"{{{len(value)} fields}}"
+        return {key: _digest_value(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, list):
+        numbers = [item for item in value if isinstance(item, (int, float)) and not isinstance(item, bool)]
+        if len(value) > 3 and len(numbers) == len(value):
+            return {"n": len(value), "first": value[0], "last": value[-1], "min": min(numbers), "max": max(numbers)}
+        if len(value) > 3:
+            return [_digest_value(item, depth + 1) for item in value[:2]] + [f"… {len(value) - 2} more"]
+        return [_digest_value(item, depth + 1) for item in value]
+    if isinstance(value, str):
+        return _clip(value, 80)
+    return value
+
+def digest_tool_output(content: str, max_tokens: int = HISTORY_DIGEST_TOKENS) -> str:
+    """
+    Returns a compact stand-in for a tool result the model has already answered from: JSON keeps
+    its keys and scalars while series are reduced to their size, ends and range; the digest
+    is then clipped to `max_tokens`.
+    """
+    if content.startswith(DIGEST_PREFIX):
+        return content
+    try:
+        digest = json.dumps(_digest_value(json.loads(content)), separators=(",", ":"), default=str)
+    except ValueError:
+        digest = content
+    return DIGEST_PREFIX + _clip(digest, max_tokens * CHARS_PER_TOKEN)
+
+def message_tokens(message: Dict) -> int:
+    """Estimates the prompt tokens of one chat message, tool call arguments included."""
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or []:
+        function = tool_call["function"]
+        tokens += estimate_tokens(function["name"]) + estimate_tokens(function["arguments"] or "")
+    return tokens
+
+def split_turns(messages: List[Dict]) -> Tuple[List[Dict], List[List[Dict]]]:
+    """Splits a history into its leading system messages and its turns, each starting at a user message."""
+    start = 0
+    while start < len(messages) and messages[start]["role"] == "system":
+        start += 1
+    turns: List[List[Dict]] = []
+    for message in messages[start:]:
+        if message["role"] == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return messages[:start], turns
+
+def summarize_turn(turn: List[Dict]) -> str:
+    """Returns a one-line account of a turn: the question, the tools called and the answer."""
+    question = next((message["content"] for message in turn if message["role"] == "user"), "")
+    calls = [
+        f"{tool_call['function']['name'].split('.')[-1]}({_clip(tool_call['function']['arguments'] or '', 60)})"
+        for message in turn for tool_call in message.get("tool_calls") or []
+    ]
+    answers = [message["content"] for message in turn if message["role"] == "assistant" and message.get("content")]
+    line = f"- User: {_clip(question, 200)}"
+    if calls:
+        line += f" | Tools: {', '.join(calls)}"
+    if answers:
+        line += f" | Answer: {_clip(answers[-1], 300)}"
+    return line
+
+class HistoryManager:
+    """
+    Keeps the chat history sent to the model within a token budget, so that the prompt, and the
+    time to process it, stays bounded however long the session runs.
+
+    System messages at the start are pinned and the last `keep_turns` turns are kept verbatim.
+    Tool results of older turns are replaced by digests, since the model already answered from
+    them. If the history is still over budget, the oldest turns are evicted and folded into a
+    running summary, a system message right after the pinned ones, itself capped to
+    `summary_tokens` by dropping its oldest lines.
+    """
+
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, keep_turns: int = HISTORY_KEEP_TURNS,
+                 digest_tokens: int = HISTORY_DIGEST_TOKENS, summary_tokens: int = HISTORY_SUMMARY_TOKENS) -> None:
+        self.token_budget = token_budget
+        self.keep_turns = max(1, keep_turns)
+        self.digest_tokens = digest_tokens
+        self.summary_tokens = summary_tokens
+
+    def _digest_turn(self, turn: List[Dict]) -> List[Dict]:
+        return [
+            {**message, "content": digest_tool_output(message["content"], self.digest_tokens)}
+            if message["role"] == "tool" and isinstance(message.get("content"), str) else message
+            for message in turn
+        ]
+
+    def _summary_message(self, lines: List[str]) -> Dict:
+        kept: List[str] = []
+        tokens = estimate_tokens(SUMMARY_HEADER)
+        for line in reversed(lines):
+            tokens += estimate_tokens(line) + 1
+            if tokens > self.summary_tokens and kept:
+                break
+            kept.append(line)
+        return {"role": "system", "content": "\n".join([SUMMARY_HEADER] + kept[::-1])}
+
+    def compact(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Returns the history fitted into the token budget; it is returned unchanged when it fits.
+        The newest turn is never altered, so it may exceed the budget on its own.
+        """
+        total = sum(message_tokens(message) for message in messages)
+        if total <= self.token_budget:
+            return messages
+
+        pinned, turns = split_turns(messages)
+        summary_lines: List[str] = []
+        if pinned and pinned[-1]["content"].startswith(SUMMARY_HEADER):
+            summary_lines = pinned.pop()["content"].split("\n")[1:]
+
+        older, recent = turns[:-self.keep_turns], turns[-self.keep_turns:]
+        older = [self._digest_turn(turn) for turn in older]
+
+        def size() -> int:
+            summary = [self._summary_message(summary_lines)] if summary_lines else []
+            return sum(message_tokens(message) for message in pinned + summary + [m for turn in older + recent for m in turn])
+
+        while older and size() > self.token_budget:
+            summary_lines.append(summarize_turn(older.pop(0)))
+        # Still over budget: digest the tool results of the recent turns but the newest
+        for index in range(len(recent) - 1):
+            if size() <= self.token_budget:
+                break
+            recent[index] = self._digest_turn(recent[index])
+
+        summary = [self._summary_message(summary_lines)] if summary_lines else []
+        compacted = pinned + summary + [message for turn in older + recent for message in turn]
+        logger.info(f"Compacted the chat history from ~{total} to ~{sum(map(message_tokens, compacted))} tokens "
+                    f"({len(messages)} -> {len(compacted)} messages)")
+        return compacted
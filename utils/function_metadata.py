@@ -1,7 +1,15 @@
 from inspect import signature, Parameter
 import functools
 import re
-from typing import Callable, Dict, List
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, get_args, get_origin
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How the registry memoizes a function's results."""
+    ttl: float
+    max_entries: int = 128
+    key_params: Optional[Tuple[str, ...]] = None  # None keys on every argument
 
 def parse_docstring(func: Callable) -> Dict[str, str]:
     """
@@ -32,14 +40,32 @@ def python_type_to_json_type(py_type):
         list: "array",
         dict: "object",
     }
-    return type_mapping.get(py_type, "string")  # Default to string if unknown
+    return type_mapping.get(get_origin(py_type) or py_type, "string")  # Default to string if unknown
+
+def python_type_to_json_schema(py_type) -> Dict:
+    """Maps a Python annotation to a JSON schema fragment, including item types for typed lists."""
+    json_schema = {"type": python_type_to_json_type(py_type)}
+    args = get_args(py_type)
+    if json_schema["type"] == "array" and args:
+        json_schema["items"] = {"type": python_type_to_json_type(args[0])}
+    return json_schema
 
-def function_schema(name: str, description: str, required_params: List[str]):
+def function_schema(name: str, description: str, required_params: List[str], cache_ttl: Optional[float] = None,
+                    max_entries: int = 128, cache_key: Optional[List[str]] = None):
+    """
+    Declares a function as a tool and derives its JSON schema from the signature and docstring.
+
+    :param cache_ttl: Seconds the registry may serve a previous result for the same arguments, None to never cache
+    :param max_entries: The number of results kept for the function, least recently used first out
+    :param cache_key: The arguments results are keyed on (defaults to all of them)
+    """
     def decorator_function(func: Callable) -> Callable:
         sig = signature(func)
 
         if not all(param in sig.parameters for param in required_params):
             raise ValueError(f"Missing required parameters in {func.__name__}")
+        if cache_key and not all(param in sig.parameters for param in cache_key):
+            raise ValueError(f"Unknown cache key parameters in {func.__name__}")
 
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
@@ -58,12 +84,14 @@ def function_schema(name: str, description: str, required_params: List[str]):
 
         param_descriptions = parse_docstring(func)
 
+        # Optional parameters are advertised too, so the model can override their defaults
         serialized_params = {
             param_name: {
-                "type": python_type_to_json_type(param.annotation),
+                **python_type_to_json_schema(param.annotation),
                 "description": param_descriptions.get(param_name, "No description"),
             }
-            for param_name, param in sig.parameters.items() if param_name in required_params
+            for param_name, param in sig.parameters.items()
+            if param_name in required_params or (param_name not in {"cls", "self"} and param.default is not Parameter.empty)
         }
 
         wrapper.schema = {
@@ -75,6 +103,9 @@ def function_schema(name: str, description: str, required_params: List[str]):
                 "required": required_params,
             }
         }
+        wrapper.cache_policy = (
+            CachePolicy(cache_ttl, max_entries, tuple(cache_key) if cache_key else None) if cache_ttl else None
+        )
         return wrapper
 
     return decorator_function
\ No newline at end of file
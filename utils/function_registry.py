@@ -1,52 +1,249 @@
+import atexit
+import hashlib
 import importlib.util
+import math
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
 from pathlib import Path
 import json
 import logging
-from typing import Optional, Dict, List, Type
+from typing import Any, Optional, Dict, List, Type
+
+from config.financial_analysis_config import TOOL_CALL_TIMEOUT_SECONDS, TOOL_CALL_WORKERS, TOOL_MANIFEST, TOOL_ROUTING_TOP_K
+from utils import function_metadata
+from utils.metrics import metrics
+from utils.tool_cache import ToolResultCache, canonical_arguments
+from utils.tool_router import ToolRouter
+from utils.tool_validation import ArgumentValidator, ToolArgumentError
 
 logger = logging.getLogger(__name__)
 
+MANIFEST_NAME = 'function_schemas.json'
+
+@dataclass
+class LoadedModule:
+    """A service module as last executed by the registry, or as described by the manifest."""
+    mtime_ns: int
+    digest: str
+    names: List[str] = field(default_factory=list)
+    executed: bool = True
+
+def _file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+# Schemas are derived from the sources by utils/function_metadata.py: a manifest written by another
+# version of it is stale even when no service module changed
+SCHEMA_DIGEST = _file_digest(Path(function_metadata.__file__))
+
+@dataclass
+class ToolResult:
+    """The outcome of one tool call; `error` is set instead of `content` when the call failed."""
+    tool_call_id: str
+    name: str
+    arguments: Dict = field(default_factory=dict)
+    content: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+@dataclass
+class ToolBatch:
+    """The results of one assistant turn's tool calls, in the order the model issued them."""
+    results: List[ToolResult]
+    wall_seconds: float
+
+    @property
+    def tool_seconds(self) -> float:
+        """The summed run time of the calls, i.e. the wall time of running them one after another."""
+        return sum(result.seconds for result in self.results)
+
+    def summary(self) -> str:
+        return (f"{len(self.results)} tool calls in {self.wall_seconds:.2f}s wall time "
+                f"for {self.tool_seconds:.2f}s of tool time")
+
+_tool_pool: Optional[Executor] = None
+_tool_pool_lock = threading.Lock()
+
+def get_tool_pool() -> Executor:
+    """Returns the process-wide pool running tool calls, shared by every session."""
+    global _tool_pool
+    with _tool_pool_lock:
+        if _tool_pool is None:
+            _tool_pool = ThreadPoolExecutor(max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-call")
+            atexit.register(_tool_pool.shutdown, wait=False, cancel_futures=True)
+        return _tool_pool
+
+class LazyFunction:
+    """Stands in for a manifest function until its module is executed on the first call."""
+
+    def __init__(self, registry: "FunctionsRegistry", file: Path, name: str) -> None:
+        self.registry = registry
+        self.file = file
+        self.name = name
+        self.schema = registry.schema_registry[name]
+
+    def __call__(self, *args, **kwargs):
+        return self.registry.import_function(self.name)(*args, **kwargs)
+
 class FunctionsRegistry:
-    def __init__(self) -> None:
-        self.functions_dir = Path(__file__).parent.parent / 'src' / 'services'
+    def __init__(self, functions_dir: Optional[Path] = None, manifest: bool = False) -> None:
+        """
+        :param functions_dir: The directory of the service modules (defaults to src/services)
+        :param manifest: Serve the schemas from the manifest and execute each module on the first
+            call of one of its functions, instead of executing every module up front
+        """
+        self.functions_dir = functions_dir or Path(__file__).parent.parent / 'src' / 'services'
+        self.manifest_path = self.functions_dir / MANIFEST_NAME
+        self.manifest = manifest
         self.registry: Dict[str, callable] = {}
         self.schema_registry: Dict[str, Dict] = {}
+        self.modules: Dict[Path, LoadedModule] = {}
+        self.result_cache = ToolResultCache()
+        self.validators: Dict[str, ArgumentValidator] = {}
+        self.router: Optional[ToolRouter] = None
+        self._lock = threading.RLock()
+        self._import_lock = threading.Lock()
+        if manifest:
+            self._read_manifest()
         self.load_functions()
 
-    def load_functions(self) -> None:
-        """Dynamically loads functions and class methods from Python files in the functions directory."""
+    def _read_manifest(self) -> None:
+        """Registers the manifest's schemas behind lazy functions; `load_functions` then checks them against the sources."""
+        try:
+            content = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            logger.info(f"No usable function manifest at {self.manifest_path}, executing every module")
+            return
+        if content.get("schema_digest") != SCHEMA_DIGEST:
+            logger.info(f"The function manifest at {self.manifest_path} predates a change to function_metadata, executing every module")
+            return
+
+        schemas = {schema["name"]: schema for schema in content.get("functions", [])}
+        for file_name, entry in content.get("modules", {}).items():
+            file = self.functions_dir / file_name
+            names = [name for name in entry["functions"] if name in schemas]
+            # mtime -1 makes the first load_functions compare the source hash with the manifest's
+            self.modules[file] = LoadedModule(-1, entry["digest"], names, executed=False)
+            for name in names:
+                self.schema_registry[name] = schemas[name]
+                self.registry[name] = LazyFunction(self, file, name)
+
+    def load_functions(self) -> List[str]:
+        """
+        Loads the functions and class methods of the Python files in the functions directory.
+
+        Only modules whose file changed since they were last executed are executed again: a file
+        whose mtime moved is hashed, and re-executed only when its content differs. Functions of
+        deleted modules are unregistered. In manifest mode, modules that still match their
+        manifest entry stay unexecuted, and the manifest is rewritten when any of them changed.
+
+        :return: The names of the modules that were (re)executed
+        """
         if not self.functions_dir.exists():
             logger.error(f"Functions directory does not exist: {self.functions_dir}")
+            return []
+
+        executed = []
+        with self._lock:
+            files = [file for file in sorted(self.functions_dir.glob('*.py')) if not file.stem.startswith('__')]
+            removed = set(self.modules) - set(files)
+            for file in removed:
+                self._unregister(self.modules.pop(file))
+                logger.info(f"Unloaded functions of removed module {file.stem}")
+
+            for file in files:
+                mtime_ns = file.stat().st_mtime_ns
+                loaded = self.modules.get(file)
+                if loaded is not None and loaded.mtime_ns == mtime_ns:
+                    continue
+                digest = _file_digest(file)
+                if loaded is not None and loaded.digest == digest:
+                    loaded.mtime_ns = mtime_ns  # touched but unchanged
+                    continue
+                self._load_module(file, mtime_ns, digest)
+                executed.append(file.stem)
+
+            if self.manifest and (executed or removed):
+                self.generate_schema_file()
+            if executed or removed or self.router is None:
+                self.router = ToolRouter(self.schema_registry)
+        return executed
+
+    def import_function(self, function_name: str) -> callable:
+        """Returns the real function behind a name, executing its module first if it was only known from the manifest."""
+        func = self.registry.get(function_name)
+        if not isinstance(func, LazyFunction):
+            if func is None:
+                raise ValueError(f"Function {function_name} is not registered.")
+            return func
+
+        with self._import_lock:
+            func = self.registry.get(function_name)
+            if isinstance(func, LazyFunction):
+                started = time.perf_counter()
+                expected = self.modules[func.file].digest
+                digest = _file_digest(func.file)
+                self._load_module(func.file, func.file.stat().st_mtime_ns, digest)
+                logger.info(f"Imported {func.file.stem} for {function_name} in {(time.perf_counter() - started) * 1000:.0f} ms")
+                if digest != expected:
+                    self.generate_schema_file()
+                    with self._lock:
+                        self.router = ToolRouter(self.schema_registry)
+
+        func = self.registry.get(function_name)
+        if func is None:
+            raise ValueError(f"Function {function_name} is no longer provided by its module.")
+        return func
+
+    def _unregister(self, loaded: LoadedModule) -> None:
+        for name in loaded.names:
+            self.registry.pop(name, None)
+            self.schema_registry.pop(name, None)
+            self.validators.pop(name, None)
+            if loaded.executed:
+                self.result_cache.invalidate(name)  # results of the previous code
+
+    def _load_module(self, file: Path, mtime_ns: int, digest: str) -> None:
+        """Executes a module file and registers its functions in place of the previous version's."""
+        module_name = file.stem
+        spec = importlib.util.spec_from_file_location(module_name, file)
+        if not (spec and spec.loader):
             return
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        with self._lock:
+            previous = self.modules.get(file)
+            if previous is not None:
+                self._unregister(previous)
+            loaded = LoadedModule(mtime_ns, digest)
+            self.modules[file] = loaded
+
+            # Register standalone functions
+            for attr_name in dir(module):
+                attr = getattr(module, attr_name)
+
+                if callable(attr) and hasattr(attr, 'schema'):
+                    self.registry[attr_name] = attr
+                    self.schema_registry[attr_name] = attr.schema
+                    loaded.names.append(attr_name)
 
-        for file in self.functions_dir.glob('*.py'):
-            module_name = file.stem
-            if module_name.startswith('__'):
-                continue  # Skip dunder files
-
-            spec = importlib.util.spec_from_file_location(module_name, file)
-            if spec and spec.loader:
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-
-                # Register standalone functions
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-
-                    if callable(attr) and hasattr(attr, 'schema'):
-                        self.registry[attr_name] = attr
-                        self.schema_registry[attr_name] = attr.schema
-
-                # Register class methods
-                for class_name in dir(module):
-                    cls = getattr(module, class_name)
-                    if isinstance(cls, type):  # Ensure it's a class
-                        for method_name in dir(cls):
-                            method = getattr(cls, method_name)
-                            if callable(method) and hasattr(method, 'schema'):
-                                # Store bound method (class reference included)
-                                self.registry[f"{class_name}.{method_name}"] = method
-                                self.schema_registry[f"{class_name}.{method_name}"] = method.schema
+            # Register class methods
+            for class_name in dir(module):
+                cls = getattr(module, class_name)
+                if isinstance(cls, type):  # Ensure it's a class
+                    for method_name in dir(cls):
+                        method = getattr(cls, method_name)
+                        if callable(method) and hasattr(method, 'schema'):
+                            # Store bound method (class reference included)
+                            self.registry[f"{class_name}.{method_name}"] = method
+                            self.schema_registry[f"{class_name}.{method_name}"] = method.schema
+                            loaded.names.append(f"{class_name}.{method_name}")
 
     def resolve_function(self, function_name: str, arguments_json: Optional[str] = None):
         """Resolves and executes a function or class method from the registry."""
@@ -55,21 +252,20 @@ class FunctionsRegistry:
             raise ValueError(f"Function {function_name} is not registered.")
 
         try:
+            # Parse JSON arguments
+            arguments_dict = {}
+            if arguments_json is not None:
+                arguments_dict = json.loads(arguments_json) if isinstance(arguments_json, str) else arguments_json
+
             # Determine if the function is a standalone function or class method
             if isinstance(func_entry, tuple):
                 # Class method: (cls, method)
                 cls, method = func_entry
                 func = method.__get__(cls)  # Bind method to class
-            else:
-                # Standalone function
-                func = func_entry
-
-            # Parse JSON arguments
-            if arguments_json is not None:
-                arguments_dict = json.loads(arguments_json) if isinstance(arguments_json, str) else arguments_json
                 return func(**arguments_dict)
-            else:
-                return func()
+
+            # Registered functions and bound class methods go through the result cache
+            return self.call(function_name, arguments_dict)
         except json.JSONDecodeError:
             logger.error("Invalid JSON format.")
             return None
@@ -77,24 +273,206 @@ class FunctionsRegistry:
             logger.error(f"Error when calling function {function_name}: {e}")
             return None
 
-    def mapped_functions(self) -> List[Dict]:
-        """Returns a list of registered functions formatted for OpenAI API function calling."""
-        return [{"type": "function", "function": func_schema} for func_schema in self.schema_registry.values()]
+    def validate_arguments(self, function_name: str, arguments: Optional[Dict]) -> Dict:
+        """
+        Validates and coerces call arguments against the function's schema, compiling its validator on first use.
+
+        Works from the schema alone, so in manifest mode a bad call is rejected before the module is imported.
+
+        :raises ToolArgumentError: If the arguments do not match the schema
+        """
+        validator = self.validators.get(function_name)
+        if validator is None:
+            with self._lock:
+                schema = self.schema_registry.get(function_name)
+                if schema is None:
+                    raise ValueError(f"Function {function_name} is not registered.")
+                validator = self.validators.setdefault(function_name, ArgumentValidator(schema))
+        return validator(arguments)
+
+    def call(self, function_name: str, arguments: Optional[Dict] = None):
+        """
+        Calls a registered function with validated arguments, serving the result from the cache when
+        its `function_schema` declares a caching policy and the same arguments were used within the TTL.
+
+        Every call is recorded in the process metrics with its latency, outcome and result size.
+
+        :raises ToolArgumentError: If the arguments do not match the function's schema
+        """
+        started = time.perf_counter()
+        result, failed = None, True
+        try:
+            result = self._call(function_name, arguments)
+            failed = False
+            return result
+        finally:
+            metrics.record_tool(function_name, time.perf_counter() - started, error=failed, result=result)
+
+    def _call(self, function_name: str, arguments: Optional[Dict]):
+        arguments = self.validate_arguments(function_name, arguments)
+        func = self.import_function(function_name)
+        policy = getattr(func, 'cache_policy', None)
+        if policy is None:
+            return func(**arguments)
+
+        key = canonical_arguments(func, arguments, policy)
+        hit, result = self.result_cache.get(function_name, key, policy)
+        if hit:
+            logger.info(f"Serving {function_name} from the result cache")
+            return result
+        result = func(**arguments)
+        self.result_cache.put(function_name, key, result, policy)
+        return result
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the result cache hit/miss counts per function."""
+        return self.result_cache.stats()
+
+    def _run_tool_call(self, tool_call) -> ToolResult:
+        result = ToolResult(tool_call.id, tool_call.function.name)
+        started = time.perf_counter()
+        try:
+            arguments = tool_call.function.arguments
+            result.arguments = (json.loads(arguments) if isinstance(arguments, str) else arguments) or {}
+            result.content = self.call(result.name, result.arguments)
+        except json.JSONDecodeError as e:
+            result.error = f"Invalid JSON arguments for {result.name}: {e}"
+        except ToolArgumentError as e:
+            # Returned to the model as the tool message so it can fix the call
+            result.error = e.to_json()
+        except Exception as e:
+            result.error = f"Error when calling function {result.name}: {e}"
+        result.seconds = time.perf_counter() - started
+        if result.error:
+            logger.error(result.error)
+        return result
+
+    def dispatch_tool_call(self, tool_call, executor: Optional[Executor] = None) -> Future:
+        """Starts one tool call on the pool, e.g. as soon as it is complete in a streamed completion."""
+        return (executor or get_tool_pool()).submit(self._run_tool_call, tool_call)
+
+    def execute_tool_calls(self, tool_calls, timeout: float = TOOL_CALL_TIMEOUT_SECONDS,
+                           executor: Optional[Executor] = None, dispatched: Optional[Dict[str, Future]] = None) -> ToolBatch:
+        """
+        Runs the tool calls of one assistant turn concurrently and returns their results in call order.
+
+        The calls run on the shared bounded pool, each getting `timeout` seconds once it has a
+        worker; when there are more calls than workers, the later waves get their share of extra
+        time. A call that fails or times out yields a result with `error` set, so every call still
+        gets its `tool` message.
+
+        :param tool_calls: The `tool_calls` of an assistant message (id, function.name, function.arguments)
+        :param timeout: The seconds each call may run
+        :param executor: The pool to run the calls on (defaults to the process-wide tool pool)
+        :param dispatched: Futures of calls already started with `dispatch_tool_call`, by tool call id
+        """
+        tool_calls = list(tool_calls)
+        if not tool_calls:
+            return ToolBatch([], 0.0)
+        executor = executor or get_tool_pool()
+        started = time.perf_counter()
+        dispatched = dispatched or {}
+        futures = [
+            dispatched.pop(tool_call.id) if tool_call.id in dispatched else executor.submit(self._run_tool_call, tool_call)
+            for tool_call in tool_calls
+        ]
+
+        workers = getattr(executor, "_max_workers", len(tool_calls))
+        deadline = started + timeout * math.ceil(len(tool_calls) / max(1, min(workers, len(tool_calls))))
+        results = []
+        for tool_call, future in zip(tool_calls, futures):
+            try:
+                results.append(future.result(timeout=max(0.0, deadline - time.perf_counter())))
+            except FutureTimeoutError:
+                future.cancel()
+                logger.error(f"Function {tool_call.function.name} timed out after {timeout:.0f}s")
+                results.append(ToolResult(tool_call.id, tool_call.function.name,
+                                          error=f"{tool_call.function.name} timed out after {timeout:.0f}s",
+                                          seconds=time.perf_counter() - started))
+
+        batch = ToolBatch(results, time.perf_counter() - started)
+        logger.info(batch.summary())
+        return batch
+
+    def mapped_functions(self, names: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Returns a list of registered functions formatted for OpenAI API function calling.
+
+        :param names: Only return these functions, in this order (defaults to every function)
+        """
+        with self._lock:
+            if names is None:
+                names = list(self.schema_registry)
+            return [{"type": "function", "function": self.schema_registry[name]} for name in names if name in self.schema_registry]
+
+    def route(self, query: str, k: int = TOOL_ROUTING_TOP_K) -> List[str]:
+        """
+        Returns the names of the functions relevant to a user message, scored against the index
+        built with the registry. Every function is returned when `k` is 0 or not below their number.
+        """
+        with self._lock:
+            router = self.router
+        if router is None:
+            return []
+        if not k or k >= len(router.names):
+            return list(router.names)
+        return router.select(query, k)
 
     def get_function_callable(self):
         """Returns a dictionary mapping function names to their callable functions."""
-        return {func_name: func for func_name, func in self.registry.items()}
+        with self._lock:
+            return {func_name: func for func_name, func in self.registry.items()}
 
     def generate_schema_file(self) -> None:
-        """Generates a JSON schema file containing all registered function schemas."""
-        schema_path = self.functions_dir / 'function_schemas.json'
-        with schema_path.open('w') as f:
-            json.dump(list(self.schema_registry.values()), f, indent=2)
+        """
+        Generates the manifest: every registered function schema, plus the source hash and
+        function names of each module and the hash of the code deriving the schemas, so a stale
+        manifest can be detected without importing anything.
+        """
+        with self._lock:
+            manifest = {
+                "schema_digest": SCHEMA_DIGEST,
+                "modules": {
+                    file.name: {"digest": loaded.digest, "functions": list(loaded.names)}
+                    for file, loaded in sorted(self.modules.items())
+                },
+                "functions": list(self.schema_registry.values()),
+            }
+        # Write then rename, so a concurrent reader never sees a partial manifest
+        partial_path = self.manifest_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with partial_path.open('w') as f:
+            json.dump(manifest, f, indent=2)
+        partial_path.replace(self.manifest_path)
 
     def get_registry_contents(self) -> List[str]:
         """Returns a list of registered function names."""
-        return list(self.registry.keys())
+        with self._lock:
+            return list(self.registry.keys())
 
     def get_schema_registry(self) -> List[Dict]:
         """Returns the registered function schemas."""
-        return list(self.schema_registry.values())
\ No newline at end of file
+        with self._lock:
+            return list(self.schema_registry.values())
+
+_registry: Optional[FunctionsRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> FunctionsRegistry:
+    """
+    Returns the process-wide registry, shared by every session.
+
+    The first call reads the schemas from the manifest (executing every service module
+    only when it is missing or stale); later calls only stat the files and re-execute the
+    modules that changed on disk.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            started = time.perf_counter()
+            _registry = FunctionsRegistry(manifest=TOOL_MANIFEST)
+            logger.info(f"Loaded {len(_registry.registry)} functions in {(time.perf_counter() - started) * 1000:.1f} ms")
+            return _registry
+    reloaded = _registry.load_functions()
+    if reloaded:
+        logger.info(f"Reloaded changed modules: {', '.join(reloaded)}")
+    return _registry
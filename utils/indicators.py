@@ -0,0 +1,240 @@
+"""
+NumPy kernels for the technical indicators used across the project.
+
+Every kernel takes contiguous float64 arrays, either 1-D (one series) or 2-D
+(bars x tickers, computed column-wise), and returns arrays of the same length
+with NaN where the indicator is not defined yet. Leading NaNs (a ticker that
+started trading later than the rest of a panel) are skipped per column and
+interior gaps are forward filled.
+
+Recursive indicators (EMA, Wilder smoothing) are evaluated in blocks: inside a
+block the recursion is unrolled into a scaled cumulative sum, and only the
+state between blocks is carried in Python. Rolling windows use blocked
+cumulative sums re-centred per block to keep the rounding error bounded on
+long series.
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+# Largest decay factor b**-k allowed inside one EMA block before rescaling
+_MAX_EMA_SCALE_EXP = 200 * math.log(10)
+# Rows per block for the rolling cumulative sums
+_ROLLING_BLOCK = 1 << 12
+
+def as_array(values) -> np.ndarray:
+    """Converts a sequence, Series or DataFrame to a contiguous float64 array."""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+def _fill_gaps(x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Backfills leading NaNs with the first valid value and forward fills interior gaps.
+
+    :return: The filled array and the index of the first valid row per column.
+    """
+    mask = np.isnan(x)
+    if not mask.any():
+        return x, np.zeros(x.shape[1:], dtype=np.intp)
+
+    valid = ~mask
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), x.shape[0])
+    rows = np.arange(x.shape[0]).reshape((-1,) + (1,) * (x.ndim - 1))
+    # Forward fill: index of the last valid row at or before each row
+    last_valid = np.maximum.accumulate(np.where(valid, rows, 0), axis=0)
+    filled = np.take_along_axis(x, last_valid, axis=0)
+    # Rows before the first valid value take that first value
+    first_value = np.take_along_axis(x, np.minimum(first, x.shape[0] - 1)[np.newaxis, ...], axis=0)
+    filled = np.where(rows < first, first_value, filled)
+    return np.ascontiguousarray(filled), first
+
+def _mask_warmup(out: np.ndarray, first: np.ndarray, warmup: int) -> np.ndarray:
+    """Sets rows before `first + warmup` to NaN, per column."""
+    if warmup <= 0 and not first.any():
+        return out
+    rows = np.arange(out.shape[0]).reshape((-1,) + (1,) * (out.ndim - 1))
+    return np.where(rows < first + warmup, np.nan, out)
+
+def _ewma_kernel(x: np.ndarray, alpha: float, initial=None) -> np.ndarray:
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t - 1] with y[-1] = initial (x[0] when omitted).
+
+    Inside a block of length k the recursion equals
+    y[t] = b**(t+1) * (y[-1] + alpha * cumsum(x[i] * b**-(i+1))), with b = 1 - alpha.
+    """
+    n = x.shape[0]
+    out = np.empty_like(x)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[:] = x
+        return out
+
+    prev = np.array(x[0] if initial is None else initial, dtype=np.float64)
+    block = max(1, min(n, int(_MAX_EMA_SCALE_EXP / -math.log(decay))))
+    exponents = np.arange(1, block + 1, dtype=np.float64)
+    growth = decay ** -exponents
+    shrink = decay ** exponents
+    if x.ndim > 1:
+        growth = growth.reshape((-1,) + (1,) * (x.ndim - 1))
+        shrink = shrink.reshape(growth.shape)
+
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        size = stop - start
+        scaled = np.cumsum(x[start:stop] * growth[:size], axis=0)
+        scaled *= alpha
+        scaled += prev
+        scaled *= shrink[:size]
+        out[start:stop] = scaled
+        prev = scaled[-1]
+    return out
+
+def _ewma(values, alpha: float) -> np.ndarray:
+    x, first = _fill_gaps(as_array(values))
+    return _mask_warmup(_ewma_kernel(x, alpha), first, 0)
+
+def _rolling_sums(x: np.ndarray, window: int, squares: bool = False):
+    """
+    Rolling window sums of (x - c) (and (x - c)**2) in blocks, with c re-chosen per block.
+
+    :return: (centres, sums, square_sums); each row t holds the window ending at t.
+    """
+    n = x.shape[0]
+    centres = np.full_like(x, np.nan)
+    sums = np.full_like(x, np.nan)
+    square_sums = np.full_like(x, np.nan) if squares else None
+    if window <= 0 or n < window:
+        return centres, sums, square_sums
+
+    zero = np.zeros((1,) + x.shape[1:])
+    for start in range(window - 1, n, _ROLLING_BLOCK):
+        stop = min(start + _ROLLING_BLOCK, n)
+        size = stop - start
+        segment = x[start - window + 1:stop]
+        centre = segment[0]
+        shifted = segment - centre
+        cumulative = np.concatenate([zero, np.cumsum(shifted, axis=0)])
+        centres[start:stop] = centre
+        sums[start:stop] = cumulative[window:window + size] - cumulative[:size]
+        if squares:
+            cumulative = np.concatenate([zero, np.cumsum(shifted * shifted, axis=0)])
+            square_sums[start:stop] = cumulative[window:window + size] - cumulative[:size]
+    return centres, sums, square_sums
+
+def sma(close, window: int) -> np.ndarray:
+    """Simple moving average over `window` bars (pandas `rolling(window).mean()`)."""
+    x, first = _fill_gaps(as_array(close))
+    centres, sums, _ = _rolling_sums(x, window)
+    return _mask_warmup(centres + sums / window, first, window - 1)
+
+def ema(close, window: int) -> np.ndarray:
+    """Exponential moving average with span `window` (pandas `ewm(span=window, adjust=False)`)."""
+    return _ewma(close, 2.0 / (window + 1))
+
+def rsi(close, window: int = 14) -> np.ndarray:
+    """
+    Wilder relative strength index.
+
+    Gains and losses are smoothed with alpha = 1 / window, starting at the first price change.
+    RSI is 100 when there were no losses and NaN for a flat series.
+    """
+    x, first = _fill_gaps(as_array(close))
+    out = np.full_like(x, np.nan)
+    if x.shape[0] < 2:
+        return out
+
+    delta = np.diff(x, axis=0)
+    alpha = 1.0 / window
+    # The smoothing of each column starts at its first real price change
+    delta = _mask_warmup(delta, first, 0)
+    avg_up = _ewma(np.clip(delta, 0, None), alpha)
+    avg_down = _ewma(np.clip(-delta, 0, None), alpha)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + avg_up / avg_down)
+    values = np.where((avg_down == 0) & (avg_up > 0), 100.0, values)
+    out[1:] = values
+    return out
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram."""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+def _rolling_extreme(x: np.ndarray, window: int, ufunc) -> np.ndarray:
+    """
+    Rolling minimum or maximum (`ufunc` is np.minimum or np.maximum) in O(n), van Herk / Gil-Werman style.
+
+    The series is cut into blocks of `window` rows; a window ending at t is covered by the
+    suffix of the block holding its start and the prefix of the block holding t.
+    """
+    n = x.shape[0]
+    out = np.full_like(x, np.nan)
+    if window <= 0 or n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.empty((blocks * window,) + x.shape[1:])
+    padded[:n] = x
+    padded[n:] = x[-1]
+    shaped = padded.reshape((blocks, window) + x.shape[1:])
+    prefix = ufunc.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = ufunc.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return out
+
+def stochastic(high, low, close, window: int = 14, smooth_window: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """Stochastic oscillator %K over `window` bars and its `smooth_window` SMA, %D."""
+    high, first = _fill_gaps(as_array(high))
+    low, _ = _fill_gaps(as_array(low))
+    close, _ = _fill_gaps(as_array(close))
+    lowest = _rolling_extreme(low, window, np.minimum)
+    highest = _rolling_extreme(high, window, np.maximum)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = 100 * (close - lowest) / (highest - lowest)
+    k = _mask_warmup(k, first, window - 1)
+    return k, sma(k, smooth_window)
+
+def vwap(high, low, close, volume, window: int = 14) -> np.ndarray:
+    """Rolling volume weighted average of the typical price over `window` bars."""
+    high, first = _fill_gaps(as_array(high))
+    low, _ = _fill_gaps(as_array(low))
+    close, _ = _fill_gaps(as_array(close))
+    volume, _ = _fill_gaps(as_array(volume))
+    typical = (high + low + close) / 3.0
+    pv_centres, pv_sums, _ = _rolling_sums(typical * volume, window)
+    volume_centres, volume_sums, _ = _rolling_sums(volume, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (pv_centres * window + pv_sums) / (volume_centres * window + volume_sums)
+    return _mask_warmup(out, first, window - 1)
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range; the first bar has no previous close and uses high - low."""
+    high, _ = _fill_gaps(as_array(high))
+    low, _ = _fill_gaps(as_array(low))
+    close, _ = _fill_gaps(as_array(close))
+    previous = np.concatenate([close[:1], close[:-1]])
+    return np.maximum(high - low, np.maximum(np.abs(high - previous), np.abs(low - previous)))
+
+def atr(high, low, close, window: int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing, seeded with the mean of the first `window` true ranges."""
+    tr = true_range(high, low, close)
+    _, first = _fill_gaps(as_array(close))
+    out = np.full_like(tr, np.nan)
+    if tr.shape[0] < window:
+        return out
+    seed = tr[:window].mean(axis=0)
+    out[window - 1] = seed
+    out[window:] = _ewma_kernel(tr[window:], 1.0 / window, initial=seed)
+    return _mask_warmup(out, first, window - 1)
+
+def bollinger_bands(close, window: int = 20, num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Middle, upper and lower Bollinger bands (population standard deviation, like `ta`)."""
+    x, first = _fill_gaps(as_array(close))
+    centres, sums, square_sums = _rolling_sums(x, window, squares=True)
+    mean_shift = sums / window
+    variance = np.maximum(square_sums / window - mean_shift * mean_shift, 0.0)
+    middle = _mask_warmup(centres + mean_shift, first, window - 1)
+    spread = _mask_warmup(num_std * np.sqrt(variance), first, window - 1)
+    return middle, middle + spread, middle - spread
@@ -0,0 +1,97 @@
+import asyncio
+import atexit
+import importlib.util
+import logging
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from config.financial_analysis_config import (
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_HTTP2,
+    LLM_KEEPALIVE_SECONDS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_POOL_TIMEOUT_SECONDS,
+    LLM_READ_TIMEOUT_SECONDS,
+    LLM_WRITE_TIMEOUT_SECONDS,
+    api_key,
+    base_url,
+)
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[Optional[str], Optional[str]]
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package; without it httpx only speaks HTTP/1.1."""
+    return LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+
+def connection_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+    )
+
+def client_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=LLM_CONNECT_TIMEOUT_SECONDS,
+        read=LLM_READ_TIMEOUT_SECONDS,
+        write=LLM_WRITE_TIMEOUT_SECONDS,
+        pool=LLM_POOL_TIMEOUT_SECONDS,
+    )
+
+def create_client(base_url: Optional[str] = base_url, api_key: Optional[str] = api_key) -> OpenAI:
+    """Builds a client with its own connection pool. Prefer `get_client`, which shares one."""
+    http_client = DefaultHttpxClient(http2=http2_available(), limits=connection_limits(), timeout=client_timeout())
+    return OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+
+def create_async_client(base_url: Optional[str] = base_url, api_key: Optional[str] = api_key) -> AsyncOpenAI:
+    """Builds an async client with its own connection pool. Prefer `get_async_client`, which shares one."""
+    http_client = DefaultAsyncHttpxClient(http2=http2_available(), limits=connection_limits(), timeout=client_timeout())
+    return AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+
+_clients: Dict[ClientKey, OpenAI] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[ClientKey, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+def _close_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+atexit.register(_close_clients)
+
+def get_client(base_url: Optional[str] = base_url, api_key: Optional[str] = api_key) -> OpenAI:
+    """
+    Returns the process-wide client of an inference server, shared by every session and Streamlit
+    rerun, so that its connections stay open between turns instead of being set up again for each.
+    The client is thread-safe.
+    """
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = create_client(base_url, api_key)
+            logger.info(f"Created the LLM client of {base_url} (HTTP/2: {http2_available()})")
+        return client
+
+def get_async_client(base_url: Optional[str] = base_url, api_key: Optional[str] = api_key) -> AsyncOpenAI:
+    """
+    Returns the async client of an inference server for the running event loop, to send concurrent
+    requests from coroutines. Async connections cannot move between event loops, so each loop gets
+    its own pool, released with the loop.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url, api_key)
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = create_async_client(base_url, api_key)
+        return client
@@ -0,0 +1,254 @@
+import bisect
+import logging
+import math
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "financial_assistant"
+
+# Upper bounds in seconds, from cache hits to slow downloads and long completions
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class LatencyHistogram:
+    """
+    Latency distribution with Prometheus-style cumulative buckets for export, plus the most
+    recent samples for exact p50/p95/p99 in the UI.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS, window: int = 2048) -> None:
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Returns the nearest-rank percentile of the recent samples, None without samples."""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+    def prometheus_lines(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.bucket_counts):
+            cumulative += count
+            le = "+Inf" if math.isinf(bound) else repr(bound)
+            lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class ToolMetrics:
+    """Calls, errors, latency and result size of one tool."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.result_bytes = 0
+        self.result_tokens = 0
+
+class LLMMetrics:
+    """Time to first token and total time of the completions of one model and stage."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.failures = 0
+        self.time_to_first_token = LatencyHistogram()
+        self.duration = LatencyHistogram()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metrics:
+    """
+    Process-wide performance counters of the chat flow: one entry per tool called through the
+    registry and per (model, stage) of LLM completion, where the stage is the model route:
+    "select" for the first completion of a turn, "answer" for the follow-ups answering tool results.
+    """
+
+    def __init__(self) -> None:
+        self.tools: Dict[str, ToolMetrics] = {}
+        self.llm: Dict[Tuple[str, str], LLMMetrics] = {}
+        # Response cache lookups by outcome ("exact", "semantic" or "miss") and the seconds hits saved
+        self.response_cache: Dict[str, int] = {"exact": 0, "semantic": 0, "miss": 0}
+        self.response_cache_saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_tool(self, name: str, seconds: float, error: bool = False, result: Any = None) -> None:
+        """Records one tool call; string results also count their size in bytes and estimated tokens."""
+        size = len(result.encode("utf-8")) if isinstance(result, str) else 0
+        tokens = estimate_tokens(result) if isinstance(result, str) else 0
+        with self._lock:
+            tool = self.tools.setdefault(name, ToolMetrics())
+            tool.calls += 1
+            tool.errors += int(error)
+            tool.latency.observe(seconds)
+            tool.result_bytes += size
+            tool.result_tokens += tokens
+
+    def record_llm(self, model: str, stage: str, time_to_first_token: float, total: float) -> None:
+        """Records one completion; for non-streamed completions the first token arrives with the response."""
+        with self._lock:
+            llm = self.llm.setdefault((model, stage), LLMMetrics())
+            llm.calls += 1
+            llm.time_to_first_token.observe(time_to_first_token)
+            llm.duration.observe(total)
+
+    def record_llm_failure(self, model: str, stage: str) -> None:
+        """Records a completion request that failed before streaming, e.g. before falling back to another model."""
+        with self._lock:
+            self.llm.setdefault((model, stage), LLMMetrics()).failures += 1
+
+    def record_response_cache(self, outcome: str, saved_seconds: float = 0.0) -> None:
+        """Records one response cache lookup; a hit saves the time the cached answer took to produce."""
+        with self._lock:
+            self.response_cache[outcome] = self.response_cache.get(outcome, 0) + 1
+            self.response_cache_saved_seconds += saved_seconds
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """Returns one row per tool and per (model, stage), with latencies in milliseconds."""
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 1)
+
+        with self._lock:
+            tools = [
+                {
+                    "tool": name,
+                    "calls": tool.calls,
+                    "errors": tool.errors,
+                    "p50_ms": ms(tool.latency.percentile(50)),
+                    "p95_ms": ms(tool.latency.percentile(95)),
+                    "p99_ms": ms(tool.latency.percentile(99)),
+                    "avg_kb": round(tool.result_bytes / tool.calls / 1024, 1),
+                    "avg_tokens": round(tool.result_tokens / tool.calls),
+                }
+                for name, tool in sorted(self.tools.items())
+            ]
+            llm = [
+                {
+                    "model": model,
+                    "stage": stage,
+                    "calls": entry.calls,
+                    "failures": entry.failures,
+                    "ttft_p50_ms": ms(entry.time_to_first_token.percentile(50)),
+                    "ttft_p95_ms": ms(entry.time_to_first_token.percentile(95)),
+                    "total_p50_ms": ms(entry.duration.percentile(50)),
+                    "total_p95_ms": ms(entry.duration.percentile(95)),
+                }
+                for (model, stage), entry in sorted(self.llm.items())
+            ]
+            lookups = sum(self.response_cache.values())
+            hits = lookups - self.response_cache.get("miss", 0)
+            response_cache = [{
+                **self.response_cache,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "saved_s": round(self.response_cache_saved_seconds, 2),
+            }] if lookups else []
+        return {"tools": tools, "llm": llm, "response_cache": response_cache}
+
+    def to_prometheus(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format, one metric family at a time:
+        its HELP and TYPE lines, then its samples for every label set.
+        """
+        tool_metric = f"{METRIC_PREFIX}_tool"
+        llm_metric = f"{METRIC_PREFIX}_llm"
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: Iterable[str]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            tools = [(f'tool="{_escape(name)}"', tool) for name, tool in sorted(self.tools.items())]
+            llm = [
+                (f'model="{_escape(model)}",stage="{_escape(stage)}"', entry)
+                for (model, stage), entry in sorted(self.llm.items())
+            ]
+            family(f"{tool_metric}_calls_total", "counter", "Tool calls dispatched through the registry.",
+                   (f"{tool_metric}_calls_total{{{labels}}} {tool.calls}" for labels, tool in tools))
+            family(f"{tool_metric}_errors_total", "counter", "Tool calls that failed, including rejected arguments.",
+                   (f"{tool_metric}_errors_total{{{labels}}} {tool.errors}" for labels, tool in tools))
+            family(f"{tool_metric}_result_bytes_total", "counter", "Bytes of the tool results sent to the model.",
+                   (f"{tool_metric}_result_bytes_total{{{labels}}} {tool.result_bytes}" for labels, tool in tools))
+            family(f"{tool_metric}_result_tokens_total", "counter", "Estimated tokens of the tool results sent to the model.",
+                   (f"{tool_metric}_result_tokens_total{{{labels}}} {tool.result_tokens}" for labels, tool in tools))
+            family(f"{tool_metric}_latency_seconds", "histogram", "Tool call latency.",
+                   (line for labels, tool in tools for line in tool.latency.prometheus_lines(f"{tool_metric}_latency_seconds", labels)))
+            family(f"{llm_metric}_failures_total", "counter", "Completion requests that failed before streaming.",
+                   (f"{llm_metric}_failures_total{{{labels}}} {entry.failures}" for labels, entry in llm))
+            family(f"{llm_metric}_time_to_first_token_seconds", "histogram", "Time until the first token of a completion.",
+                   (line for labels, entry in llm
+                    for line in entry.time_to_first_token.prometheus_lines(f"{llm_metric}_time_to_first_token_seconds", labels)))
+            family(f"{llm_metric}_duration_seconds", "histogram", "Total time of a completion.",
+                   (line for labels, entry in llm for line in entry.duration.prometheus_lines(f"{llm_metric}_duration_seconds", labels)))
+            family(f"{METRIC_PREFIX}_response_cache_lookups_total", "counter", "Response cache lookups by outcome.",
+                   (f'{METRIC_PREFIX}_response_cache_lookups_total{{outcome="{_escape(outcome)}"}} {count}'
+                    for outcome, count in sorted(self.response_cache.items())))
+            family(f"{METRIC_PREFIX}_response_cache_saved_seconds_total", "counter", "Time the response cache hits saved.",
+                   [f"{METRIC_PREFIX}_response_cache_saved_seconds_total {self.response_cache_saved_seconds}"])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Writes the metrics for the node_exporter textfile collector, replacing the file atomically."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_suffix(f".{threading.get_ident()}.tmp")
+        partial.write_text(self.to_prometheus())
+        partial.replace(target)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.tools.clear()
+            self.llm.clear()
+            self.response_cache = {"exact": 0, "semantic": 0, "miss": 0}
+            self.response_cache_saved_seconds = 0.0
+
+metrics = Metrics()
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serves the metrics at http://host:port/metrics from a daemon thread, once per process."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(format % args)
+
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on port {port}")
+        return _server
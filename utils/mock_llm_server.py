@@ -0,0 +1,430 @@
+"""
+An offline stand-in for the inference server, speaking the OpenAI chat completions protocol.
+
+Requests are answered from scripted rules, or from recordings of a real server, at a simulated
+speed: the first token after `first_token_seconds`, then `tokens_per_second`. Both streamed
+(server-sent events, with content and `tool_calls` deltas) and plain responses are supported,
+so the app and the scripts run against it unchanged with BASE_URL pointing at it. Every request
+is logged with the time the simulated model took, which tells the pipeline's own latency apart.
+
+Usage: python -m utils.mock_llm_server [--port 8001] [--script rules.json] [--recordings recordings.jsonl]
+                                       [--upstream URL] [--first-token-seconds 0.3] [--tokens-per-second 50]
+                                       [--model-latency mistral:7b=0.1,120]
+
+A script is a JSON list of rules, the first matching one answers:
+    [{"match": "price of (?P<ticker>[A-Z]+)", "tool_calls": [{"name": "StockAnalyzer.get_stock_price",
+      "arguments": {"ticker": "{ticker}"}}]},
+     {"match": "price of (?P<ticker>[A-Z]+)", "after_tool": true, "content": "{ticker} is at 100."}]
+`match` is searched, case-sensitively unless it says otherwise (e.g. "(?i:price) of"), in the last
+user message; its named groups fill the {placeholders} of the response. An argument that is only a
+placeholder of digits becomes a number. The default script, mock_llm_rules.json next to this module,
+calls the tools of src/services for questions about prices, moving averages, RSI, MACD and charts.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+import socket
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER = "This is a mock answer."
+DEFAULT_SCRIPT = Path(__file__).with_name("mock_llm_rules.json")
+
+@dataclass(frozen=True)
+class Latency:
+    """The simulated speed of a model. With `tokens_per_second` at 0 the tokens are not paced."""
+    first_token_seconds: float = 0.3
+    tokens_per_second: float = 50.0
+
+    def seconds(self, tokens: int) -> float:
+        """Time the model takes to produce a completion of `tokens` tokens."""
+        paced = (max(tokens, 1) - 1) / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return self.first_token_seconds + paced
+
+@dataclass
+class MockResponse:
+    """
+    A completion: text content or tool calls, each a dict of its "name" and "arguments" (a dict or a
+    JSON string) and optionally its "id". `latency` overrides the speed of the server for it.
+    """
+    content: str = ""
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+    latency: Optional[Latency] = None
+
+    def render(self, groups: Dict[str, str]) -> "MockResponse":
+        """Fills the {placeholders} of the content and of the argument strings with `groups`."""
+        def fill(value):
+            if isinstance(value, str):
+                whole = re.fullmatch(r"\{(\w+)\}", value)
+                if whole and groups.get(whole.group(1), "").isdigit():
+                    return int(groups[whole.group(1)])
+                return re.sub(r"\{(\w+)\}", lambda match: groups.get(match.group(1), match.group(0)), value)
+            if isinstance(value, dict):
+                return {key: fill(item) for key, item in value.items()}
+            if isinstance(value, list):
+                return [fill(item) for item in value]
+            return value
+
+        if not groups:
+            return self
+        return replace(self, content=fill(self.content),
+                       tool_calls=[{**call, "arguments": fill(call.get("arguments", {}))} for call in self.tool_calls])
+
+    def tool_call_payloads(self) -> List[Dict[str, Any]]:
+        """The tool calls in the shape of the API, with ids that are the same from one run to the next."""
+        payloads = []
+        for index, call in enumerate(self.tool_calls):
+            arguments = call.get("arguments", {})
+            arguments = arguments if isinstance(arguments, str) else json.dumps(arguments)
+            call_id = call.get("id") or f"call_{index}_{zlib.crc32((call['name'] + arguments).encode('utf-8')):08x}"
+            payloads.append({"id": call_id, "type": "function", "function": {"name": call["name"], "arguments": arguments}})
+        return payloads
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MockResponse":
+        latency = None
+        if "first_token_seconds" in data or "tokens_per_second" in data:
+            latency = Latency(float(data.get("first_token_seconds", Latency.first_token_seconds)),
+                              float(data.get("tokens_per_second", Latency.tokens_per_second)))
+        return cls(data.get("content") or "", list(data.get("tool_calls") or []), latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"content": self.content, "tool_calls": self.tool_calls}
+        if self.latency is not None:
+            data.update(first_token_seconds=self.latency.first_token_seconds, tokens_per_second=self.latency.tokens_per_second)
+        return data
+
+@dataclass
+class Rule:
+    """
+    Answers the requests whose last user message matches `match` (any when None), of `model` (any
+    when None). A rule with `after_tool` answers follow-ups, whose history ends with tool results;
+    a rule without it answers the first completion of a turn.
+    """
+    response: MockResponse
+    match: Optional[str] = None
+    after_tool: bool = False
+    model: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        self._pattern = re.compile(self.match) if self.match else None
+
+    def matches(self, model: str, question: str, after_tool: bool) -> Optional[Dict[str, str]]:
+        """Returns the named groups of the match, or None when the rule does not apply."""
+        if self.after_tool != after_tool or (self.model and self.model != model):
+            return None
+        if self._pattern is None:
+            return {}
+        match = self._pattern.search(question)
+        return {key: value for key, value in match.groupdict().items() if value is not None} if match else None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        return cls(MockResponse.from_dict(data), data.get("match"), bool(data.get("after_tool")), data.get("model"))
+
+def load_script(path: str) -> List[Rule]:
+    return [Rule.from_dict(rule) for rule in json.loads(Path(path).read_text(encoding="utf-8"))]
+
+def recording_key(model: str, messages: Sequence[Dict[str, Any]]) -> str:
+    """
+    Hashes a request for replay. Only the name of the tool of a tool result counts, not its content:
+    the data tools return, such as prices, differs between the recording and the replay.
+    """
+    shape = []
+    for message in messages:
+        if message.get("role") == "tool":
+            shape.append(["tool", message.get("name")])
+        elif message.get("tool_calls"):
+            shape.append(["assistant", [[call["function"]["name"], call["function"]["arguments"]] for call in message["tool_calls"]]])
+        else:
+            shape.append([message.get("role"), message.get("content")])
+    return hashlib.sha256(json.dumps([model, shape], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _tokens(text: str) -> List[str]:
+    return [text[start:start + CHARS_PER_TOKEN] for start in range(0, len(text), CHARS_PER_TOKEN)]
+
+def _last_user_message(messages: Sequence[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+class MockLLMServer:
+    """
+    Serves /v1/chat/completions and /v1/models on a background thread.
+
+    A request is answered by its recording if there is one, then by the first matching rule
+    (rules with tool calls only when the request offers tools), then by the `upstream` server if
+    set, whose answer is added to the recordings, and otherwise with a fixed answer. Scripted and
+    recorded answers take the time of `latency`, or of `model_latency` for their model.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = (), recordings: Optional[str] = None,
+                 latency: Latency = Latency(), model_latency: Optional[Dict[str, Latency]] = None,
+                 upstream: Optional[str] = None, upstream_api_key: Optional[str] = None,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.rules = list(rules)
+        self.recordings_path = Path(recordings) if recordings else None
+        self.recordings: Dict[str, MockResponse] = {}
+        if self.recordings_path is not None and self.recordings_path.exists():
+            for line in self.recordings_path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self.recordings[entry["key"]] = MockResponse.from_dict(entry["response"])
+        self.latency = latency
+        self.model_latency = dict(model_latency or {})
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.upstream_api_key = upstream_api_key
+        # One entry per completion served: its model, source, tokens and simulated model time
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serves on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def model_seconds(self) -> float:
+        """Total time the simulated models took over the requests served so far."""
+        with self._lock:
+            return sum(request["model_seconds"] for request in self.requests)
+
+    def respond(self, body: Dict[str, Any]) -> Tuple[MockResponse, str]:
+        """Picks the response to a request body, and where it came from."""
+        model, messages = body.get("model", ""), body.get("messages", [])
+        key = recording_key(model, messages)
+        if key in self.recordings:
+            return self.recordings[key], "recording"
+
+        after_tool = bool(messages) and messages[-1].get("role") == "tool"
+        question = _last_user_message(messages)
+        for rule in self.rules:
+            if rule.response.tool_calls and not body.get("tools"):
+                continue
+            groups = rule.matches(model, question, after_tool)
+            if groups is not None:
+                return rule.response.render(groups), "rule"
+
+        if self.upstream:
+            return self._record(key, body), "upstream"
+        return MockResponse(DEFAULT_ANSWER), "default"
+
+    def _record(self, key: str, body: Dict[str, Any]) -> MockResponse:
+        started = time.perf_counter()
+        headers = {"Authorization": f"Bearer {self.upstream_api_key}"} if self.upstream_api_key else {}
+        reply = httpx.post(f"{self.upstream}/chat/completions", json={**body, "stream": False}, headers=headers, timeout=600)
+        reply.raise_for_status()
+        message = reply.json()["choices"][0]["message"]
+        tool_calls = [{"id": call["id"], "name": call["function"]["name"], "arguments": call["function"]["arguments"]}
+                      for call in message.get("tool_calls") or []]
+        # Replays take the speed of the server; this once, the upstream already took its time
+        response = MockResponse(message.get("content") or "", tool_calls)
+        with self._lock:
+            self.recordings[key] = response
+            if self.recordings_path is not None:
+                self.recordings_path.parent.mkdir(parents=True, exist_ok=True)
+                with self.recordings_path.open("a", encoding="utf-8") as file:
+                    file.write(json.dumps({"key": key, "model": body.get("model"), "question": _last_user_message(body.get("messages", [])),
+                                           "response": response.to_dict()}) + "\n")
+        logger.info(f"Recorded the answer of {self.upstream} in {time.perf_counter() - started:.2f} s")
+        return replace(response, latency=Latency(0.0, 0.0))
+
+    def latency_of(self, model: str, response: MockResponse) -> Latency:
+        return response.latency or self.model_latency.get(model, self.latency)
+
+    def log(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append(entry)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Send each chunk at once, as inference servers do, instead of holding it for the previous one's ACK
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            mock = self.server.mock
+            models = sorted({rule.model for rule in mock.rules if rule.model} | set(mock.model_latency)) or ["mock"]
+            self._send_json(200, {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "mock"} for model in models]})
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "invalid_request_error"}})
+            return
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            self._send_json(400, {"error": {"message": "The body is not JSON", "type": "invalid_request_error"}})
+            return
+
+        mock = self.server.mock
+        started = time.perf_counter()
+        try:
+            response, source = mock.respond(body)
+        except httpx.HTTPError as e:
+            self._send_json(502, {"error": {"message": f"Upstream failed: {e}", "type": "api_error"}})
+            return
+        model = body.get("model", "")
+        latency = mock.latency_of(model, response)
+        tool_calls = response.tool_call_payloads()
+        completion_tokens = len(_tokens(response.content)) + sum(
+            1 + len(_tokens(call["function"]["arguments"])) for call in tool_calls
+        )
+        usage = {
+            "prompt_tokens": estimate_tokens(json.dumps(body.get("messages", []), default=str)),
+            "completion_tokens": completion_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        model_seconds = time.perf_counter() - started if source == "upstream" else latency.seconds(completion_tokens)
+        mock.log({
+            "model": model,
+            "stream": bool(body.get("stream")),
+            "source": source,
+            "tools": [tool["function"]["name"] for tool in body.get("tools") or []],
+            "completion_tokens": completion_tokens,
+            "model_seconds": model_seconds,
+        })
+
+        completion_id = f"chatcmpl-mock-{len(mock.requests)}"
+        finish_reason = "tool_calls" if tool_calls else "stop"
+        if not body.get("stream"):
+            time.sleep(latency.seconds(completion_tokens))
+            message: Dict[str, Any] = {"role": "assistant", "content": response.content or None}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}], "usage": usage,
+            })
+            return
+
+        def chunk(delta, finish=None, **extra):
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}], **extra}
+
+        # The deltas carrying tokens, in order: the content, then each tool call's name and argument pieces
+        deltas = [{"content": token} for token in _tokens(response.content)]
+        for index, call in enumerate(tool_calls):
+            deltas.append({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                           "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            deltas.extend({"tool_calls": [{"index": index, "function": {"arguments": piece}}]}
+                          for piece in _tokens(call["function"]["arguments"]))
+        deltas = deltas or [{"content": ""}]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            events = [chunk({"role": "assistant", "content": ""})]
+            for index, delta in enumerate(deltas):
+                # Paced from the start of the request, so the time spent writing does not add up
+                delay = started + latency.seconds(index + 1) - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                events.append(chunk(delta))
+                self._write_chunk(b"".join(f"data: {json.dumps(event)}\n\n".encode("utf-8") for event in events))
+                events = []
+            events.append(chunk({}, finish_reason))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                events.append({**chunk({}), "choices": [], "usage": usage})
+            self._write_chunk(b"".join(f"data: {json.dumps(event)}\n\n".encode("utf-8") for event in events) + b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            logger.info("The client closed the stream early")
+            self.close_connection = True
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--script", default=str(DEFAULT_SCRIPT), help="JSON file of the rules answering requests")
+    parser.add_argument("--recordings", help="JSONL file of recorded answers, replayed and extended")
+    parser.add_argument("--upstream", help="Real server answering the requests no rule or recording answers, e.g. http://localhost:11434/v1")
+    parser.add_argument("--upstream-api-key")
+    parser.add_argument("--first-token-seconds", type=float, default=Latency.first_token_seconds)
+    parser.add_argument("--tokens-per-second", type=float, default=Latency.tokens_per_second)
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS,TOKENS_PER_SECOND",
+                        help="Speed of one model, e.g. mistral:7b=0.1,120")
+    args = parser.parse_args()
+
+    model_latency = {}
+    for setting in args.model_latency:
+        model, _, speed = setting.rpartition("=")
+        first_token_seconds, tokens_per_second = speed.split(",")
+        model_latency[model] = Latency(float(first_token_seconds), float(tokens_per_second))
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockLLMServer(load_script(args.script) if args.script else (), args.recordings,
+                           Latency(args.first_token_seconds, args.tokens_per_second), model_latency,
+                           args.upstream, args.upstream_api_key, args.host, args.port)
+    print(f"Serving OpenAI chat completions at {server.base_url} (set BASE_URL to it), Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
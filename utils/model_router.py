@@ -0,0 +1,74 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from config.financial_analysis_config import (
+    MODEL_ROUTING,
+    ROUTING_ANALYSIS_KEYWORDS,
+    ROUTING_LARGE_RESULT_TOKENS,
+    ROUTING_SMALL_MODEL,
+)
+from utils.tokens import estimate_tokens
+
+SELECT = "select"
+ANSWER = "answer"
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """The model serving one completion, the model to retry with if it fails, and why it was chosen."""
+    stage: str
+    model: str
+    fallback: Optional[str]
+    reason: str
+
+    @property
+    def models(self) -> List[str]:
+        """The models to try in order."""
+        return [self.model] + ([self.fallback] if self.fallback else [])
+
+class ModelRouter:
+    """
+    Splits a turn between two model slots.
+
+    The small model makes the first completion, which picks the tools and their arguments
+    or answers trivial messages directly, and writes short answers from tool results. The large
+    model is used only when needed: for every completion of a question asking for analysis (one
+    of `analysis_keywords` starts a word of it), which it may answer without tools, and for
+    answers from tool results exceeding `large_result_tokens`.
+    Each route falls back to the other model when its own cannot be reached. With routing
+    disabled, or when both slots hold the same model, the large model serves everything.
+    """
+
+    def __init__(self, large_model: str, small_model: str = ROUTING_SMALL_MODEL, enabled: bool = MODEL_ROUTING,
+                 analysis_keywords: Sequence[str] = ROUTING_ANALYSIS_KEYWORDS,
+                 large_result_tokens: int = ROUTING_LARGE_RESULT_TOKENS) -> None:
+        self.large_model = large_model
+        self.small_model = small_model
+        self.enabled = enabled and bool(small_model) and small_model != large_model
+        self._analysis = re.compile(r"\b(" + "|".join(re.escape(keyword.lower()) for keyword in analysis_keywords) + r")")
+        self.large_result_tokens = large_result_tokens
+
+    def _route(self, stage: str, small: bool, reason: str) -> ModelRoute:
+        if not self.enabled:
+            return ModelRoute(stage, self.large_model, None, "routing disabled")
+        if small:
+            return ModelRoute(stage, self.small_model, self.large_model, reason)
+        return ModelRoute(stage, self.large_model, self.small_model, reason)
+
+    def asks_for_analysis(self, question: str) -> bool:
+        return bool(self._analysis.search(question.lower()))
+
+    def for_selection(self, question: str) -> ModelRoute:
+        """Routes the first completion of a turn, which selects the tools or answers directly."""
+        if self.asks_for_analysis(question):
+            return self._route(SELECT, False, "analysis requested")
+        return self._route(SELECT, True, "tool selection")
+
+    def for_answer(self, question: str, results: Iterable[str]) -> ModelRoute:
+        """Routes a follow-up answering the question from the tool results of the turn."""
+        if self.asks_for_analysis(question):
+            return self._route(ANSWER, False, "analysis requested")
+        tokens = sum(estimate_tokens(result) for result in results if isinstance(result, str))
+        if tokens > self.large_result_tokens:
+            return self._route(ANSWER, False, f"{tokens} tokens of tool results")
+        return self._route(ANSWER, True, "short answer")
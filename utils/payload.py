@@ -0,0 +1,83 @@
+import json
+import math
+from typing import Dict, Optional
+
+import pandas as pd
+
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+OHLCV_AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+def _resample(frame: pd.DataFrame, rule: str) -> pd.DataFrame:
+    aggregation = {column: how for column, how in OHLCV_AGGREGATION.items() if column in frame.columns}
+    return frame.resample(rule).agg(aggregation).dropna(subset=["Close"])
+
+def downsample_history(frame: pd.DataFrame, row_budget: int, recent_days: int = 92) -> pd.DataFrame:
+    """
+    Fits an OHLCV frame into `row_budget` rows, keeping the most recent bars at full resolution.
+
+    Bars older than `recent_days` are aggregated to weekly bars, then to monthly bars if that
+    is not enough. If the recent daily bars alone exceed the budget, only the newest are kept.
+    """
+    if len(frame) <= row_budget:
+        return frame
+
+    cutoff = (frame.index[-1] - pd.Timedelta(days=recent_days)).normalize()
+    # End the older part on a Friday so weekly bars never overlap the daily ones
+    cutoff -= pd.Timedelta(days=(cutoff.dayofweek - 4) % 7)
+    cutoff += pd.Timedelta(days=1) - pd.Timedelta(1, unit="ns")
+    recent = frame[frame.index > cutoff]
+    older = frame[frame.index <= cutoff]
+    for rule in ["W-FRI", "MS"]:
+        if older.empty or len(recent) + len(older) <= row_budget:
+            break
+        older = _resample(older, rule)
+
+    combined = pd.concat([older, recent])
+    return combined.iloc[-row_budget:] if row_budget > 0 else combined.iloc[0:0]
+
+def to_columnar(frame: pd.DataFrame, decimals: int = 2) -> Dict:
+    """Converts an OHLCV frame to column arrays with rounded prices and integer volumes."""
+    columns = {"Date": [str(timestamp.date()) for timestamp in frame.index]}
+    for column in frame.columns:
+        values = frame[column]
+        if column == "Volume":
+            columns[column] = [int(value) for value in values.fillna(0)]
+        else:
+            columns[column] = [None if math.isnan(value) else round(float(value), decimals) for value in values]
+    return columns
+
+def compact_price_payload(frame: pd.DataFrame, row_budget: int = 120, token_budget: Optional[int] = None,
+                          recent_days: int = 92, decimals: int = 2) -> Dict:
+    """
+    Builds a compact, columnar price payload within a row and (estimated) token budget.
+
+    :param frame: OHLCV history indexed by timestamp
+    :param row_budget: Maximum number of bars to emit
+    :param token_budget: Maximum estimated tokens for the price arrays, None for no limit
+    :param recent_days: Bars newer than this many days are kept at daily resolution
+    :param decimals: Decimals kept on prices
+    :return: The column arrays plus a `compression` report
+    """
+    original_chars = len(json.dumps(
+        frame.reset_index().astype({frame.index.name or "index": str}).to_dict(orient="records"), default=str
+    ))
+    rows = max(int(row_budget), 1)
+    while True:
+        columns = to_columnar(downsample_history(frame, rows, recent_days), decimals)
+        chars = len(json.dumps(columns))
+        if token_budget is None or math.ceil(chars / CHARS_PER_TOKEN) <= token_budget or rows == 1:
+            break
+        # Shrink the row budget in proportion to the overshoot and try again
+        rows = max(1, min(rows - 1, int(rows * token_budget * CHARS_PER_TOKEN / chars)))
+
+    return {
+        "columns": columns,
+        "compression": {
+            "original_rows": len(frame),
+            "rows": len(columns["Date"]),
+            "original_tokens": math.ceil(original_chars / CHARS_PER_TOKEN),
+            "tokens": math.ceil(chars / CHARS_PER_TOKEN),
+            "ratio": round(original_chars / chars, 1) if chars else None,
+        },
+    }
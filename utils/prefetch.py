@@ -0,0 +1,38 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List, Optional
+
+from config.financial_analysis_config import PREFETCH_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_prefetch_pool: Optional[Executor] = None
+_prefetch_pool_lock = threading.Lock()
+
+def get_prefetch_pool() -> Executor:
+    """Returns the process-wide pool downloading prefetched data, apart from the tool pool."""
+    global _prefetch_pool
+    with _prefetch_pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+            atexit.register(_prefetch_pool.shutdown, wait=False, cancel_futures=True)
+        return _prefetch_pool
+
+def _prefetch_prices(tickers: List[str]) -> None:
+    # Imported here so that yfinance and DuckDB load on the pool, never in the caller's way
+    from utils.price_cache import price_cache
+
+    started = price_cache.prefetch(tickers, get_prefetch_pool())
+    if started:
+        logger.info(f"Prefetching the price history of {', '.join(started)}")
+
+def prefetch_prices(tickers: List[str]) -> None:
+    """
+    Starts warming the price history cache for the tickers in the background and returns at once,
+    e.g. while the model decides which tools to call. A tool asking for a history still being
+    downloaded waits for that download instead of starting its own.
+    """
+    if tickers:
+        get_prefetch_pool().submit(_prefetch_prices, list(tickers))
@@ -0,0 +1,194 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from config.financial_analysis_config import PRICE_CACHE_TTL_SECONDS, PRICE_CACHE_MAX_BYTES
+from database.price_store import get_price_store, period_start
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str]
+
+def _download_history(ticker: str, period: str, interval: str) -> pd.DataFrame:
+    """
+    Loads an OHLCV history frame, from the local price store when it can serve the request.
+
+    Daily bars over a fixed period come from the DuckDB store, which only downloads the bars
+    it is missing; intraday intervals and open-ended periods go to Yahoo Finance directly.
+    """
+    start = period_start(period)
+    if interval == '1d' and start is not None:
+        try:
+            return get_price_store().history(ticker, start)
+        except Exception as e:
+            logger.error(f"Price store unavailable, downloading {ticker} directly: {e}")
+    return yf.Ticker(ticker).history(period=period, interval=interval)
+
+def _frame_size(frame: pd.DataFrame) -> int:
+    """Returns the in-memory footprint of a frame in bytes."""
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+class PriceHistoryCache:
+    """
+    Process-wide OHLCV history cache keyed by (ticker, period, interval).
+
+    Entries expire after `ttl` seconds and the least recently used entries are
+    evicted once the summed frame size exceeds `max_bytes`. Cached frames are
+    shared between callers and must be treated as read-only. Concurrent misses
+    on the same key share one download.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PRICE_CACHE_TTL_SECONDS,
+        max_bytes: int = PRICE_CACHE_MAX_BYTES,
+        loader: Callable[[str, str, str], pd.DataFrame] = _download_history,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[CacheKey, Tuple[float, int, pd.DataFrame]]" = OrderedDict()
+        self._loading: Dict[CacheKey, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(ticker: str, period: str = '1y', interval: str = '1d') -> CacheKey:
+        """Normalizes the cache key so 'aapl' and 'AAPL' share an entry."""
+        return ticker.strip().upper(), period, interval
+
+    def get(self, ticker: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+        """Returns the cached history for the key, downloading it on a miss or after expiry."""
+        key = self.make_key(ticker, period, interval)
+        cached = self.peek(*key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() - entry[0] < self.ttl:
+                return entry[2]  # stored since the peek
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = Future()
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            # Another caller, e.g. a prefetch, is downloading this history already
+            return loading.result()
+
+        try:
+            frame = self.loader(key[0], period, interval)
+            if frame is not None and not frame.empty:
+                self.put(key, frame)
+            loading.set_result(frame)
+            return frame
+        except BaseException as e:
+            loading.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+
+    def peek(self, ticker: str, period: str = '1y', interval: str = '1d') -> Optional[pd.DataFrame]:
+        """Returns a fresh cached frame without downloading, counting the lookup as a hit or miss."""
+        key = self.make_key(ticker, period, interval)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, size, frame = entry
+                if self.clock() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return frame
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def prefetch(self, tickers: Iterable[str], executor: Executor, period: str = '1y', interval: str = '1d') -> List[str]:
+        """
+        Starts downloading, on `executor`, the histories that are neither cached nor already loading,
+        so that a later `get` finds them cached or waits for the download in flight.
+
+        :return: The tickers whose download was started
+        """
+        started = []
+        for ticker in tickers:
+            key = self.make_key(ticker, period, interval)
+            with self._lock:
+                entry = self._entries.get(key)
+                if key[0] in started or key in self._loading or (entry is not None and self.clock() - entry[0] < self.ttl):
+                    continue
+            executor.submit(self._prefetch_one, key)
+            started.append(key[0])
+        return started
+
+    def _prefetch_one(self, key: CacheKey) -> None:
+        started = time.perf_counter()
+        try:
+            self.get(*key)
+            logger.info(f"Prefetched {key[0]} history in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            logger.warning(f"Prefetching {key[0]} history failed: {e}")
+
+    def put(self, key: CacheKey, frame: pd.DataFrame) -> None:
+        """Stores a frame under the key and evicts least recently used entries over the memory cap."""
+        size = _frame_size(frame)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                logger.warning(f"History for {key} ({size} bytes) exceeds the cache cap, not caching it.")
+                return
+            self._entries[key] = (self.clock(), size, frame)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Drops every entry for a ticker, or the whole cache when no ticker is given."""
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            symbol = ticker.strip().upper()
+            for key in [key for key in self._entries if key[0] == symbol]:
+                self._remove(key)
+
+    def _remove(self, key: CacheKey) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, float]:
+        """Returns hit/miss counters and the current memory footprint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+price_cache = PriceHistoryCache()
+
+def get_history(ticker: str, period: str = '1y', interval: str = '1d') -> pd.DataFrame:
+    """Returns the OHLCV history for a ticker through the process-wide cache."""
+    return price_cache.get(ticker, period, interval)
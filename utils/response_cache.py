@@ -0,0 +1,195 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.financial_analysis_config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_SIMILARITY
+from utils.chat_history import SUMMARY_HEADER
+from utils.tool_router import canonical_terms
+
+EMBEDDING_DIMENSIONS = 512
+TRIGRAM_WEIGHT = 0.1
+
+# Words that do not change what a question asks for ("what's NVDA trading at right now")
+FILLER = {
+    "s", "t", "now", "right", "current", "currently", "today", "latest", "just", "quick", "quickly",
+    "know", "want", "like", "could", "would", "should", "will", "hey", "hi", "hello", "thank",
+    "thanks", "stock", "share", "company", "ticker", "symbol", "much", "some",
+}
+
+# Words and openings by which a question refers to the earlier conversation ("and its RSI?")
+REFERENCES = {
+    "it", "its", "it's", "that", "this", "those", "these", "them", "they", "their", "there", "same",
+    "also", "too", "else", "again", "instead", "above", "previous", "earlier", "former", "latter",
+}
+FOLLOW_UP_OPENINGS = ("and ", "but ", "so ", "then ", "what about", "how about")
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split()).rstrip("?!. ")
+
+def history_key(model: str, messages: List[Dict]) -> str:
+    """Hashes the model and the history, ignoring the case and spacing of user messages."""
+    normalized = [
+        {**message, "content": _normalize(message["content"])} if message["role"] == "user" else message
+        for message in messages
+    ]
+    return hashlib.sha256(json.dumps([model, normalized], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def is_self_contained(question: str) -> bool:
+    """Whether a question can be understood without the conversation before it."""
+    text = _normalize(question)
+    return not text.startswith(FOLLOW_UP_OPENINGS) and not REFERENCES & set(re.findall(r"[a-z']+", text))
+
+def key_terms(question: str) -> frozenset:
+    """The words a cached answer must share with a question: tickers, numbers and what is asked about."""
+    return frozenset(term for term in canonical_terms(question) if term not in FILLER)
+
+def embed(question: str) -> np.ndarray:
+    """
+    Embeds a question as a unit vector of hashed features, its key terms and character trigrams,
+    so that questions asking for the same thing are close without a model to load.
+    """
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    for term in key_terms(question):
+        vector[zlib.crc32(term.encode("utf-8")) % EMBEDDING_DIMENSIONS] += 1.0
+    # Trigrams weigh little: they only tell apart questions of equal key terms by their wording
+    text = f" {_normalize(question)} "
+    for start in range(len(text) - 2):
+        vector[zlib.crc32(text[start:start + 3].encode("utf-8")) % EMBEDDING_DIMENSIONS] += TRIGRAM_WEIGHT
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+@dataclass(eq=False)
+class CachedResponse:
+    """An answer that can be replayed while the data it was written from is fresh."""
+    answer: str
+    expires_at: float
+    seconds: float
+    exact_key: str
+    bucket: Tuple[str, str]
+    terms: frozenset
+    vector: np.ndarray
+
+class ResponseCache:
+    """
+    Caches final answers in front of the completion calls, shared by every session.
+
+    The exact layer matches the model and the whole history, user messages compared without
+    case and spacing. The semantic layer matches the last user question against recent questions
+    asked in the same context, by cosine similarity of their embeddings; a match must also have the
+    same key terms, so that an answer about NVDA is never served for AMD, nor one about the 50-day
+    SMA for the 200-day SMA. Each entry expires after the TTL it was stored with.
+
+    The context of a self-contained question ("What's NVDA trading at?") is only the system prompt:
+    its answer depends on the question and the data of the tools it calls, which the TTL keeps
+    fresh, so it is shared by every conversation, whatever was asked before. The trade-off is
+    that such an answer may have been worded for another conversation. A question referring to
+    the conversation ("and its RSI?") only matches after the same whole history.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, similarity: float = RESPONSE_CACHE_SIMILARITY,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.clock = clock
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, str], List[CachedResponse]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(model: str, messages: List[Dict]) -> Tuple[str, str]:
+        if messages and messages[-1]["role"] == "user" and is_self_contained(messages[-1]["content"]):
+            prompt = [
+                message for message in messages[:-1]
+                if message["role"] == "system" and not str(message["content"]).startswith(SUMMARY_HEADER)
+            ]
+            return model, history_key(model, prompt)
+        return model, history_key(model, messages[:-1])
+
+    def _remove(self, entry: CachedResponse) -> None:
+        self._entries.pop(entry.exact_key, None)
+        bucket = self._buckets.get(entry.bucket, [])
+        if entry in bucket:
+            bucket.remove(entry)
+        if not bucket:
+            self._buckets.pop(entry.bucket, None)
+
+    def get(self, model: str, messages: List[Dict]) -> Tuple[Optional[str], Optional[CachedResponse]]:
+        """
+        Looks up the answer to a history ending with the user's question.
+
+        :return: The layer that matched ("exact" or "semantic") and the entry, or (None, None)
+        """
+        now = self.clock()
+        exact_key = history_key(model, messages)
+        with self._lock:
+            entry = self._entries.get(exact_key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(entry)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(exact_key)
+                return "exact", entry
+
+            question = messages[-1]["content"] if messages and messages[-1]["role"] == "user" else None
+            candidates = self._buckets.get(self._bucket(model, messages), []) if question else []
+            for expired in [candidate for candidate in candidates if candidate.expires_at <= now]:
+                self._remove(expired)
+            candidates = self._buckets.get(self._bucket(model, messages), []) if question else []
+            if not candidates:
+                return None, None
+
+            terms = key_terms(question)
+            similarities = np.stack([candidate.vector for candidate in candidates]) @ embed(question)
+            for index in np.argsort(-similarities):
+                candidate = candidates[index]
+                if similarities[index] < self.similarity:
+                    break
+                if candidate.terms == terms:
+                    self._entries.move_to_end(candidate.exact_key)
+                    return "semantic", candidate
+        return None, None
+
+    def put(self, model: str, messages: List[Dict], answer: str, ttl: float, seconds: float) -> None:
+        """
+        Stores the answer to a history ending with the user's question.
+
+        :param ttl: Seconds the answer stays valid, i.e. the freshness of the data it was written from
+        :param seconds: How long producing the answer took, reported as saved on each hit
+        """
+        if self.max_entries <= 0 or ttl <= 0 or not messages or messages[-1]["role"] != "user":
+            return
+        question = messages[-1]["content"]
+        entry = CachedResponse(answer, self.clock() + ttl, seconds, history_key(model, messages),
+                               self._bucket(model, messages), key_terms(question), embed(question))
+        with self._lock:
+            previous = self._entries.get(entry.exact_key)
+            if previous is not None:
+                self._remove(previous)
+            self._entries[entry.exact_key] = entry
+            self._buckets.setdefault(entry.bucket, []).append(entry)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries.values())))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide response cache, shared by every session."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
@@ -0,0 +1,202 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from config.financial_analysis_config import INDICATOR_STATE_MAX_ENTRIES
+
+class EMAState:
+    """
+    Running exponential moving average (pandas `ewm(span=window, adjust=False)`).
+
+    `update` commits a bar in O(1); `peek` returns the value the indicator would
+    have if the bar were appended, without committing it. Peeking is what lets the
+    still-forming last bar of a session be revised on every poll.
+    """
+
+    __slots__ = ("window", "alpha", "value")
+
+    def __init__(self, window: int, value: Optional[float] = None) -> None:
+        self.window = int(window)
+        self.alpha = 2.0 / (self.window + 1)
+        self.value = value
+
+    def _step(self, close: float) -> float:
+        if self.value is None:
+            return close
+        return self.alpha * close + (1 - self.alpha) * self.value
+
+    def update(self, close: float) -> float:
+        self.value = self._step(float(close))
+        return self.value
+
+    def peek(self, close: float) -> float:
+        return self._step(float(close))
+
+    def to_dict(self) -> Dict:
+        return {"type": "EMA", "window": self.window, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "EMAState":
+        return cls(data["window"], data["value"])
+
+class RSIState:
+    """Running Wilder RSI (pandas `ewm(com=window-1, adjust=False)` over gains and losses)."""
+
+    __slots__ = ("window", "prev_close", "avg_up", "avg_down")
+
+    def __init__(self, window: int = 14, prev_close: Optional[float] = None,
+                 avg_up: Optional[float] = None, avg_down: Optional[float] = None) -> None:
+        self.window = int(window)
+        self.prev_close = prev_close
+        self.avg_up = avg_up
+        self.avg_down = avg_down
+
+    def _step(self, close: float) -> Tuple[float, Optional[float], Optional[float]]:
+        if self.prev_close is None:
+            return close, None, None
+        delta = close - self.prev_close
+        up, down = max(delta, 0.0), max(-delta, 0.0)
+        if self.avg_up is None:
+            return close, up, down
+        alpha = 1.0 / self.window
+        return close, alpha * up + (1 - alpha) * self.avg_up, alpha * down + (1 - alpha) * self.avg_down
+
+    @staticmethod
+    def _rsi(avg_up: Optional[float], avg_down: Optional[float]) -> float:
+        if avg_up is None:
+            return math.nan
+        if avg_down == 0:
+            return 100.0 if avg_up > 0 else math.nan
+        return 100 - (100 / (1 + avg_up / avg_down))
+
+    @property
+    def value(self) -> float:
+        return self._rsi(self.avg_up, self.avg_down)
+
+    def update(self, close: float) -> float:
+        self.prev_close, self.avg_up, self.avg_down = self._step(float(close))
+        return self.value
+
+    def peek(self, close: float) -> float:
+        _, avg_up, avg_down = self._step(float(close))
+        return self._rsi(avg_up, avg_down)
+
+    def to_dict(self) -> Dict:
+        return {"type": "RSI", "window": self.window, "prev_close": self.prev_close,
+                "avg_up": self.avg_up, "avg_down": self.avg_down}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RSIState":
+        return cls(data["window"], data["prev_close"], data["avg_up"], data["avg_down"])
+
+class MACDState:
+    """Running MACD line, signal line and histogram built from three EMA states."""
+
+    __slots__ = ("fast", "slow", "signal")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        if self.signal.value is None:
+            return math.nan, math.nan, math.nan
+        macd = self.fast.value - self.slow.value
+        return macd, self.signal.value, macd - self.signal.value
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.update(close) - self.slow.update(close)
+        self.signal.update(macd)
+        return self.value
+
+    def peek(self, close: float) -> Tuple[float, float, float]:
+        macd = self.fast.peek(close) - self.slow.peek(close)
+        signal = self.signal.peek(macd)
+        return macd, signal, macd - signal
+
+    def to_dict(self) -> Dict:
+        return {"type": "MACD", "fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MACDState":
+        state = cls()
+        state.fast = EMAState.from_dict(data["fast"])
+        state.slow = EMAState.from_dict(data["slow"])
+        state.signal = EMAState.from_dict(data["signal"])
+        return state
+
+STATE_TYPES = {"EMA": EMAState, "RSI": RSIState, "MACD": MACDState}
+
+class IndicatorStateStore:
+    """
+    Process-wide store of incremental indicator states keyed by (ticker, indicator, params).
+
+    Each entry remembers the timestamp and the close of the last committed bar. Refreshing an
+    entry against a history frame commits only the bars that arrived since then, every bar
+    but the last one: the last bar may still be forming, so it is evaluated with `peek`.
+    When the frame's close at the anchor bar differs from the remembered one, the history was
+    re-adjusted (a split or a dividend rescales every auto-adjusted bar) and the state is rebuilt.
+    The least recently used entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_STATE_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._states: "OrderedDict[Tuple, Tuple[object, Optional[pd.Timestamp], Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(self, key: Tuple, entry: Tuple[object, Optional[pd.Timestamp], Optional[float]]) -> None:
+        self._states[key] = entry
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_entries:
+            self._states.popitem(last=False)
+
+    def evaluate(self, key: Tuple, factory, close: pd.Series):
+        """Brings the state for `key` up to date with `close` and returns the indicator value at its last bar."""
+        with self._lock:
+            state, committed_at, anchor_close = self._states.get(key, (None, None, None))
+            start = close.index.get_loc(committed_at) + 1 if committed_at in close.index else None
+            if start is not None and not math.isclose(float(close.iloc[start - 1]), anchor_close or math.nan, rel_tol=1e-9):
+                # The anchor bar was re-adjusted since it was committed: earlier bars were too
+                start = None
+            if state is None or start is None or start >= len(close):
+                # Unknown key, or the frame no longer lines up with our anchor bar: rebuild from scratch
+                state, start = factory(), 0
+                committed_at = anchor_close = None
+
+            for price in close.iloc[start:-1].to_numpy():
+                state.update(price)
+            if len(close) > 1:
+                committed_at, anchor_close = close.index[-2], float(close.iloc[-2])
+            self._store(key, (state, committed_at, anchor_close))
+            return state.peek(close.iloc[-1])
+
+    def dump(self) -> Dict[str, Dict]:
+        """Serializes every state to a JSON friendly dict so it can be stored and resumed."""
+        with self._lock:
+            return {
+                "|".join(map(str, key)): {"state": state.to_dict(), "committed_at": None if ts is None else ts.isoformat(),
+                                          "anchor_close": anchor_close}
+                for key, (state, ts, anchor_close) in self._states.items()
+            }
+
+    def load(self, data: Dict[str, Dict]) -> None:
+        """Restores states produced by `dump`."""
+        with self._lock:
+            for raw_key, entry in data.items():
+                ticker, name, *params = raw_key.split("|")
+                key = (ticker, name, *(int(param) for param in params))
+                state = STATE_TYPES[entry["state"]["type"]].from_dict(entry["state"])
+                committed_at = entry["committed_at"] and pd.Timestamp(entry["committed_at"])
+                # States dumped without their anchor close are rebuilt on first use
+                self._store(key, (state, committed_at, entry.get("anchor_close")))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+indicator_states = IndicatorStateStore()
@@ -0,0 +1,97 @@
+import re
+from typing import Dict, List, Tuple
+
+# Symbols users ask about most, with the company names and nicknames they use for them
+SYMBOLS: Dict[str, Tuple[str, ...]] = {
+    "AAPL": ("apple",),
+    "MSFT": ("microsoft",),
+    "NVDA": ("nvidia",),
+    "GOOGL": ("google", "alphabet"),
+    "GOOG": (),
+    "AMZN": ("amazon",),
+    "META": ("facebook", "meta platforms"),
+    "TSLA": ("tesla",),
+    "BRK-B": ("berkshire", "berkshire hathaway"),
+    "AVGO": ("broadcom",),
+    "AMD": ("advanced micro devices",),
+    "INTC": ("intel",),
+    "QCOM": ("qualcomm",),
+    "TSM": ("tsmc", "taiwan semiconductor"),
+    "ASML": (),
+    "ORCL": ("oracle",),
+    "CRM": ("salesforce",),
+    "ADBE": ("adobe",),
+    "NFLX": ("netflix",),
+    "DIS": ("disney",),
+    "IBM": (),
+    "CSCO": ("cisco",),
+    "PLTR": ("palantir",),
+    "UBER": (),
+    "SHOP": ("shopify",),
+    "PYPL": ("paypal",),
+    "V": ("visa",),
+    "MA": ("mastercard",),
+    "JPM": ("jpmorgan", "jp morgan", "chase"),
+    "BAC": ("bank of america",),
+    "WFC": ("wells fargo",),
+    "GS": ("goldman", "goldman sachs"),
+    "MS": ("morgan stanley",),
+    "C": ("citigroup", "citi"),
+    "XOM": ("exxon", "exxonmobil"),
+    "CVX": ("chevron",),
+    "JNJ": ("johnson & johnson", "johnson and johnson"),
+    "PFE": ("pfizer",),
+    "LLY": ("eli lilly", "lilly"),
+    "UNH": ("unitedhealth",),
+    "MRK": ("merck",),
+    "ABBV": ("abbvie",),
+    "WMT": ("walmart",),
+    "COST": ("costco",),
+    "KO": ("coca-cola", "coca cola", "coke"),
+    "PEP": ("pepsi", "pepsico"),
+    "MCD": ("mcdonald's", "mcdonalds"),
+    "NKE": ("nike",),
+    "SBUX": ("starbucks",),
+    "BA": ("boeing",),
+    "CAT": ("caterpillar",),
+    "GE": ("general electric",),
+    "F": ("ford",),
+    "GM": ("general motors",),
+    "T": ("at&t",),
+    "VZ": ("verizon",),
+    "SPY": ("s&p 500", "s&p", "sp500"),
+    "QQQ": ("nasdaq 100", "nasdaq"),
+}
+
+# Symbols that are also common words or letters, only taken when written in upper case
+_AMBIGUOUS = {symbol for symbol in SYMBOLS if len(symbol) <= 2} | {"META", "COST", "SHOP", "CAT", "UBER", "DIS"}
+
+_ALIASES = sorted(
+    ((alias, symbol) for symbol, aliases in SYMBOLS.items() for alias in aliases),
+    key=lambda item: -len(item[0]),
+)
+_ALIAS_PATTERN = re.compile(
+    r"(?<![\w&])(" + "|".join(re.escape(alias) for alias, _ in _ALIASES) + r")(?:'s)?(?![\w&])", re.IGNORECASE
+)
+_ALIAS_SYMBOLS = {alias: symbol for alias, symbol in _ALIASES}
+_WORD_PATTERN = re.compile(r"(\$)?\b([A-Za-z]{1,5}(?:[.-][A-Za-z])?)\b")
+
+def extract_tickers(text: str, limit: int = 5) -> List[str]:
+    """
+    Returns the ticker symbols a message mentions, in order of first mention: known symbols in any
+    case ("nvda"), company names and nicknames ("Apple", "goldman sachs") and cashtags ("$SNOW").
+    Ambiguous symbols such as "F" or "META" only count in upper case. Other upper-case words are
+    not taken, as most are words or acronyms ("BUY", "CEO"): symbols outside `SYMBOLS` need a cashtag.
+    """
+    found: Dict[str, int] = {}
+
+    for match in _ALIAS_PATTERN.finditer(text):
+        found.setdefault(_ALIAS_SYMBOLS[match.group(1).lower()], match.start())
+
+    for match in _WORD_PATTERN.finditer(text):
+        cashtag, word = match.groups()
+        symbol = word.upper().replace(".", "-")
+        if cashtag or (symbol in SYMBOLS and (word.isupper() or symbol not in _AMBIGUOUS)):
+            found.setdefault(symbol, match.start())
+
+    return sorted(found, key=found.get)[:limit]
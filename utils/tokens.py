@@ -0,0 +1,8 @@
+import math
+
+# Rough chars-per-token ratio of BPE tokenizers on JSON payloads
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of LLM tokens of a text without loading a tokenizer."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from inspect import signature
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.function_metadata import CachePolicy
+
+def canonical_arguments(func: Callable, arguments: Dict, policy: CachePolicy) -> str:
+    """
+    Returns the arguments as canonical JSON: bound to the signature with defaults applied,
+    restricted to the policy's key parameters, with sorted keys.
+
+    `{"ticker": "AAPL"}` and `{"ticker": "AAPL", "windows": null}` therefore share a key.
+    """
+    try:
+        bound = signature(func).bind(**arguments)
+        bound.apply_defaults()
+        values = dict(bound.arguments)
+    except TypeError:
+        values = dict(arguments)
+    if policy.key_params is not None:
+        values = {param: values.get(param) for param in policy.key_params}
+    return json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+
+class ToolResultCache:
+    """
+    Tool results keyed by (tool name, canonical JSON arguments), expiring after the tool's TTL.
+
+    Every tool has its own LRU bounded by its policy's `max_entries`, plus hit/miss counters.
+    Cached results are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self._entries: Dict[str, "OrderedDict[Hashable, Tuple[float, Any]]"] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, outcome: str) -> None:
+        counts = self._counts.setdefault(name, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, name: str, key: Hashable, policy: CachePolicy) -> Tuple[bool, Optional[Any]]:
+        """Returns (hit, result) for a key, counting the lookup as a hit or miss of the tool."""
+        with self._lock:
+            entries = self._entries.get(name)
+            entry = entries.get(key) if entries is not None else None
+            if entry is not None:
+                stored_at, result = entry
+                if self.clock() - stored_at < policy.ttl:
+                    entries.move_to_end(key)
+                    self._count(name, "hits")
+                    return True, result
+                del entries[key]
+            self._count(name, "misses")
+            return False, None
+
+    def put(self, name: str, key: Hashable, result: Any, policy: CachePolicy) -> None:
+        with self._lock:
+            entries = self._entries.setdefault(name, OrderedDict())
+            entries.pop(key, None)
+            entries[key] = (self.clock(), result)
+            while len(entries) > policy.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drops the results of one tool, or of every tool when no name is given."""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the hit/miss counts, hit rate and number of cached results per tool."""
+        with self._lock:
+            stats = {}
+            for name, counts in self._counts.items():
+                lookups = counts["hits"] + counts["misses"]
+                stats[name] = {
+                    **counts,
+                    "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+                    "entries": len(self._entries.get(name, ())),
+                }
+            return stats
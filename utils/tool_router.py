@@ -0,0 +1,107 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+# Words of user messages that say which tool is wanted without appearing in its schema
+SYNONYMS = {
+    "chart": "plot", "graph": "plot", "draw": "plot", "visualize": "plot",
+    "quote": "price", "cost": "price", "worth": "price", "trading": "price",
+    "oversold": "rsi", "overbought": "rsi", "strength": "rsi",
+    "momentum": "macd rsi", "crossover": "macd",
+    "ma": "moving average", "sma": "simple moving average", "ema": "exponential moving average",
+    "trend": "moving average", "technical": "indicator",
+    "filter": "screen", "scan": "screen", "below": "threshold", "above": "threshold", "which": "find",
+    "compare": "list", "portfolio": "list", "several": "list",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "get", "give",
+    "how", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "please", "tell", "that", "the",
+    "their", "this", "to", "was", "what", "whats", "with", "you", "your",
+}
+
+def _stem(word: str) -> str:
+    """Folds the plural and verb forms the schemas and messages mix ("averages", "plotting")."""
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Splits text, identifiers included (`calculate_SMA`, `StockAnalyzer`), into stemmed lowercase words."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.lower()) if word not in STOPWORDS]
+
+def schema_text(schema: Dict) -> str:
+    """
+    Returns the searchable text of a tool schema: its name twice, description and parameters.
+    Parenthesized examples and defaults of parameters are left out, so that a ticker mentioned
+    as an example does not match every message about that ticker.
+    """
+    name = schema["name"].split(".")[-1]
+    parameters = schema.get("parameters", {}).get("properties", {})
+    return " ".join([name, name, schema.get("description", "")] + [
+        f"{parameter} {re.sub(r'[(][^)]*[)]', '', spec.get('description', ''))}" for parameter, spec in parameters.items()
+    ])
+
+_STEMMED_SYNONYMS = {_stem(word): tokenize(expansion) for word, expansion in SYNONYMS.items()}
+
+def canonical_terms(text: str) -> List[str]:
+    """Returns the words of a message with each synonym replaced by the schema words it stands for."""
+    terms = []
+    for word in tokenize(text):
+        terms.extend(_STEMMED_SYNONYMS.get(word, [word]))
+    return terms
+
+class ToolRouter:
+    """
+    Picks the tools relevant to a user message with BM25 over the text of their schemas.
+
+    The index is built once from the schemas, so routing a message costs a few dictionary
+    lookups per word. Message words are expanded with `SYNONYMS` before scoring.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, schemas: Dict[str, Dict]) -> None:
+        self.names = list(schemas)
+        documents = [Counter(tokenize(schema_text(schema))) for schema in schemas.values()]
+        lengths = [sum(document.values()) for document in documents]
+        average_length = sum(lengths) / len(lengths) if lengths else 0.0
+
+        document_frequency = Counter(term for document in documents for term in document)
+        count = len(documents)
+        # term -> [(tool index, BM25 weight)], the inverted index scored at build time
+        self.postings: Dict[str, List] = {}
+        for index, (document, length) in enumerate(zip(documents, lengths)):
+            norm = self.K1 * (1 - self.B + self.B * length / average_length)
+            for term, frequency in document.items():
+                idf = math.log(1 + (count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                weight = idf * frequency * (self.K1 + 1) / (frequency + norm)
+                self.postings.setdefault(term, []).append((index, weight))
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """Returns the score of every tool sharing a word with the message."""
+        terms = set()
+        for word in tokenize(query):
+            terms.add(word)
+            terms.update(_STEMMED_SYNONYMS.get(word, ()))
+
+        totals: Dict[int, float] = {}
+        for term in terms:
+            for index, weight in self.postings.get(term, ()):
+                totals[index] = totals.get(index, 0.0) + weight
+        return {self.names[index]: score for index, score in totals.items()}
+
+    def select(self, query: str, k: int) -> List[str]:
+        """
+        Returns the names of the `k` best scoring tools for the message, best first. When no tool
+        shares a word with the message (e.g. "and for MSFT?"), every tool is returned, since
+        the message then refers to earlier turns the router does not see.
+        """
+        scores = self.scores(query)
+        if not scores:
+            return list(self.names)
+        return sorted(scores, key=lambda name: (-scores[name], name))[:k]
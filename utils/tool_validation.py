@@ -0,0 +1,115 @@
+import json
+from typing import Any, Dict, List
+
+from jsonschema.validators import validator_for
+
+_TRUE = {"true", "yes", "1"}
+_FALSE = {"false", "no", "0"}
+
+class ToolArgumentError(ValueError):
+    """Raised when tool call arguments do not match the tool's schema, before anything runs."""
+
+    def __init__(self, function_name: str, errors: List[Dict[str, str]], parameters: Dict) -> None:
+        self.function_name = function_name
+        self.errors = errors
+        self.parameters = parameters
+        super().__init__(f"Invalid arguments for {function_name}: " + "; ".join(
+            f"{error['argument']}: {error['message']}" for error in errors
+        ))
+
+    def to_json(self) -> str:
+        """Returns the error as the content of the tool message, so the model can correct its call."""
+        return json.dumps({
+            "error": "invalid_arguments",
+            "function": self.function_name,
+            "details": self.errors,
+            "expected": self.parameters,
+        })
+
+def coerce(value: Any, schema: Dict) -> Any:
+    """
+    Converts a value to the JSON type its schema expects when the conversion is lossless,
+    e.g. "20" to 20 for an integer or "AAPL, MSFT" to ["AAPL", "MSFT"] for an array.
+    Values that cannot be converted are returned unchanged for the validator to report.
+    """
+    expected = schema.get("type")
+    if expected == "integer":
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str):
+            try:
+                number = float(value.strip())
+            except ValueError:
+                return value
+            return int(number) if number.is_integer() else value
+    elif expected == "number":
+        if isinstance(value, str):
+            try:
+                return float(value.strip())
+            except ValueError:
+                return value
+    elif expected == "boolean":
+        if isinstance(value, str) and value.strip().lower() in _TRUE | _FALSE:
+            return value.strip().lower() in _TRUE
+    elif expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+    elif expected == "array":
+        if isinstance(value, str):
+            try:
+                parsed = json.loads(value)
+            except ValueError:
+                parsed = [item.strip() for item in value.split(",") if item.strip()]
+            value = parsed if isinstance(parsed, list) else [parsed]
+        elif not isinstance(value, (list, tuple)):
+            value = [value]
+        items = schema.get("items")
+        return [coerce(item, items) for item in value] if items else list(value)
+    return value
+
+class ArgumentValidator:
+    """
+    Validates and coerces the arguments of one tool, compiled once from its JSON schema.
+
+    Coercion runs first so that the common slips of LLMs (numbers as strings, a single value
+    for a list, null for an optional argument) are fixed instead of rejected. Unknown and
+    missing arguments and values of the wrong type are reported all at once.
+    """
+
+    def __init__(self, schema: Dict) -> None:
+        self.name = schema["name"]
+        self.parameters = schema.get("parameters", {"type": "object", "properties": {}})
+        self.properties = self.parameters.get("properties", {})
+        self.required = set(self.parameters.get("required", []))
+        self._validator = validator_for(self.parameters)(self.parameters)
+
+    def __call__(self, arguments: Any) -> Dict:
+        """
+        :return: The coerced arguments
+        :raises ToolArgumentError: If the arguments cannot be made to match the schema
+        """
+        if arguments is None:
+            arguments = {}
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(self.name, [{"argument": "", "message": "arguments must be a JSON object"}], self.parameters)
+
+        errors = []
+        coerced = {}
+        for name, value in arguments.items():
+            schema = self.properties.get(name)
+            if schema is None:
+                errors.append({"argument": name, "message": f"unknown argument, expected one of {', '.join(self.properties)}"})
+            elif value is None and name not in self.required:
+                continue  # let the function apply its default
+            else:
+                coerced[name] = coerce(value, schema)
+
+        for error in self._validator.iter_errors(coerced):
+            path = "/".join(str(part) for part in error.absolute_path)
+            if error.validator == "required":
+                path = error.message.split("'")[1]
+            errors.append({"argument": path, "message": error.message})
+
+        if errors:
+            raise ToolArgumentError(self.name, errors, self.parameters)
+        return coerced